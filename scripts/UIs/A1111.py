@@ -11,10 +11,7 @@ License: MIT
 import asyncio
 import logging
 import os
-import ssl
-import subprocess
 import sys
-import urllib.request
 import zipfile
 from pathlib import Path
 from typing import List, Tuple, Optional
@@ -40,8 +37,10 @@ for path in [PROJECT_ROOT, SCRIPTS_DIR]:
 
 # Import Trinity modules
 try:
-    from modules.Manager import download_url_to_path
     import modules.json_utils as json_utils
+    from scripts.http_client import get_http_client
+    from scripts.io_engine import run_io
+    from scripts.extension_fetcher import fetch_repos
 except ImportError as e:
     logger.error(f"Failed to import Trinity modules: {e}")
     sys.exit(1)
@@ -92,7 +91,7 @@ if HOME_PATH.exists():
 
 async def download_file(url: str, directory: Path, filename: str) -> bool:
     """
-    Cross-platform file download using urllib.
+    Cross-platform file download through the shared Trinity HTTP client.
     
     Args:
         url: The URL to download from
@@ -114,13 +113,8 @@ async def download_file(url: str, directory: Path, filename: str) -> bool:
             logger.warning(f"Could not remove existing file {file_path}: {e}")
     
     try:
-        # Create SSL context for compatibility
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
         logger.info(f"Downloading {url} to {file_path}")
-        urllib.request.urlretrieve(url, file_path)
+        await run_io(get_http_client().download_to_path, url, file_path)
         logger.info(f"Successfully downloaded {filename}")
         return True
         
@@ -175,13 +169,13 @@ async def download_configuration() -> bool:
         f"{url_config_base}/gradio-tunneling.py,{VENV_PATH}/lib/python3.10/site-packages/gradio_tunneling,main.py"
     ]
     
-    # Download configuration files
-    config_results = await download_files_batch(config_files)
+    # Download configuration files and clone extensions at the same time
+    config_results, extensions_success = await asyncio.gather(
+        download_files_batch(config_files),
+        clone_extensions()
+    )
     config_success = all(result is True for result in config_results if not isinstance(result, Exception))
     
-    # Clone extensions
-    extensions_success = await clone_extensions()
-    
     return config_success and extensions_success
 
 async def clone_extensions() -> bool:
@@ -208,13 +202,11 @@ async def clone_extensions() -> bool:
         extensions_list.append('https://github.com/anxety-solo/sd-encrypt-image Encrypt-Image')
 
     EXTENSIONS_PATH.mkdir(parents=True, exist_ok=True)
-    original_cwd = Path.cwd()
     
     try:
-        os.chdir(EXTENSIONS_PATH)
         logger.info(f"Cloning extensions into {EXTENSIONS_PATH}")
         
-        processes = []
+        repos = []
         for extension_command in extensions_list:
             # Parse repository name
             parts = extension_command.split()
@@ -229,34 +221,22 @@ async def clone_extensions() -> bool:
                 logger.info(f"Extension '{repo_name}' already exists. Skipping clone.")
                 continue
 
-            # Create subprocess for git clone
-            try:
-                logger.info(f"Cloning '{repo_name}' from {repo_url}")
-                process = await asyncio.create_subprocess_shell(
-                    f"git clone --depth 1 {repo_url} {repo_name}",
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
-                processes.append((process, repo_name))
-            except Exception as e:
-                logger.error(f"Failed to start git clone for {repo_name}: {e}")
+            logger.info(f"Cloning '{repo_name}' from {repo_url}")
+            repos.append((repo_url, repo_name))
 
-        # Wait for all clones to complete
-        results = await asyncio.gather(
-            *[process.communicate() for process, _ in processes],
-            return_exceptions=True
-        )
+        # Clone (or fetch tarballs, per TRINITY_EXTENSION_FETCH) with bounded concurrency
+        results = await fetch_repos(repos, EXTENSIONS_PATH)
 
         # Check results
         success = True
-        for i, (stdout, stderr) in enumerate(results):
-            if isinstance(results[i], Exception):
-                logger.error(f"Exception during git clone: {results[i]}")
+        for (repo_url, repo_name), result in zip(repos, results):
+            if isinstance(result, Exception):
+                logger.error(f"Exception during git clone of '{repo_name}': {result}")
                 success = False
                 continue
                 
-            process, repo_name = processes[i]
-            if process.returncode != 0:
+            returncode, stdout, stderr = result
+            if returncode != 0:
                 stderr_str = stderr.decode().strip() if stderr else 'No stderr output'
                 logger.error(f"Failed to clone extension '{repo_name}': {stderr_str}")
                 if stdout and stdout.decode().strip():
@@ -270,8 +250,6 @@ async def clone_extensions() -> bool:
     except Exception as e:
         logger.error(f"Error during extension cloning: {e}")
         return False
-    finally:
-        os.chdir(original_cwd)
 
 def install_webui() -> bool:
     """
@@ -284,14 +262,10 @@ def install_webui() -> bool:
     logger.info(f"Downloading WebUI from {WEBUI_REPO_URL}")
     
     # Download the WebUI zip file
-    download_successful = download_url_to_path(
-        url=WEBUI_REPO_URL, 
-        target_full_path=str(zip_path), 
-        log=True
-    )
-    
-    if not download_successful:
-        logger.error(f"Download failed for {WEBUI_REPO_URL}. Cannot proceed with A1111 setup.")
+    try:
+        get_http_client().download_to_path(WEBUI_REPO_URL, zip_path)
+    except Exception as e:
+        logger.error(f"Download failed for {WEBUI_REPO_URL}: {e}. Cannot proceed with A1111 setup.")
         return False
 
     logger.info(f"Extracting {zip_path} to {WEBUI_PATH}")
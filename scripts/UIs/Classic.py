@@ -11,10 +11,7 @@ License: MIT
 import asyncio
 import logging
 import os
-import ssl
-import subprocess
 import sys
-import urllib.request
 import zipfile
 from pathlib import Path
 from typing import List
@@ -34,8 +31,10 @@ for path in [PROJECT_ROOT, SCRIPTS_DIR]:
 
 # Import Trinity modules
 try:
-    from modules.Manager import m_download
     import modules.json_utils as json_utils
+    from scripts.http_client import get_http_client
+    from scripts.io_engine import run_io
+    from scripts.extension_fetcher import fetch_repos
 except ImportError as e:
     logger.error(f"Failed to import Trinity modules: {e}")
     sys.exit(1)
@@ -92,7 +91,7 @@ if HOME.exists():
 # ==================== WEBUI OPERATIONS ====================
 
 async def _download_file(url: str, directory: Path, filename: str) -> None:
-    """Cross-platform file download using urllib."""
+    """Cross-platform file download through the shared Trinity HTTP client."""
     directory = Path(directory)
     directory.mkdir(parents=True, exist_ok=True)
     file_path = directory / filename
@@ -101,13 +100,8 @@ async def _download_file(url: str, directory: Path, filename: str) -> None:
         file_path.unlink()
     
     try:
-        # Create SSL context that doesn't verify certificates for compatibility
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
         logger.info(f"Downloading {url} to {file_path}")
-        urllib.request.urlretrieve(url, file_path)
+        await run_io(get_http_client().download_to_path, url, file_path)
         logger.info(f"Successfully downloaded {filename}")
     except Exception as e:
         logger.error(f"Error downloading {url}: {e}")
@@ -137,7 +131,6 @@ async def download_configuration() -> None:
         f"{url_cfg}/notification.mp3",
         f"{url_cfg}/gradio-tunneling.py,{VENV}/lib/python3.11/site-packages/gradio_tunneling,main.py"
     ]
-    await download_files(configs)
 
     # Extension repositories
     extensions_list = [
@@ -156,37 +149,30 @@ async def download_configuration() -> None:
 
     EXTS.mkdir(parents=True, exist_ok=True)
     
-    original_cwd = Path.cwd()
-    try:
-        change_directory(EXTS)
-        tasks = []
+    repos = []
+    for command in extensions_list:
+        repo_name = command.split('/')[-1].split()[0].replace('.git', '')
+        if len(command.split()) > 1:
+            repo_name = command.split()[-1]
         
-        for command in extensions_list:
-            repo_name = command.split('/')[-1].split()[0].replace('.git', '')
-            if len(command.split()) > 1:
-                repo_name = command.split()[-1]
-            
-            if (EXTS / repo_name).exists():
-                logger.info(f"Extension '{repo_name}' already exists. Skipping clone.")
-                continue
-            
-            process = await asyncio.create_subprocess_shell(
-                f"git clone --depth 1 {command}",
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE
-            )
-            tasks.append(process)
-
-        # Gather all process results
-        results = await asyncio.gather(*[p.communicate() for p in tasks])
-
-        # Check results after they are all gathered
-        for i, (stdout, stderr) in enumerate(results):
-            if tasks[i].returncode != 0:
-                logger.error(f"Error cloning extension. Git stderr: {stderr.decode() if stderr else 'No stderr'}")
-
-    finally:
-        change_directory(original_cwd)
+        if (EXTS / repo_name).exists():
+            logger.info(f"Extension '{repo_name}' already exists. Skipping clone.")
+            continue
+        repos.append((command.split()[0], repo_name))
+
+    # Config files and extension clones run side by side
+    _, results = await asyncio.gather(
+        download_files(configs),
+        fetch_repos(repos, EXTS)
+    )
+
+    # Check results after they are all gathered
+    for (repo_url, repo_name), result in zip(repos, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error cloning extension '{repo_name}': {result}")
+        elif result[0] != 0:
+            stderr = result[2]
+            logger.error(f"Error cloning extension '{repo_name}'. Git stderr: {stderr.decode() if stderr else 'No stderr'}")
 
 
 def unpack_webui() -> None:
@@ -194,7 +180,11 @@ def unpack_webui() -> None:
     zip_path = HOME / f"{UI_NAME}.zip"
     logger.info(f"Step 1: Downloading WebUI from {WEBUI_REPO_URL}")
     
-    m_download(f"{WEBUI_REPO_URL} {str(HOME)} {UI_NAME}.zip", log=True)
+    try:
+        get_http_client().download_to_path(WEBUI_REPO_URL, zip_path)
+    except Exception as e:
+        logger.error(f"Download of {WEBUI_REPO_URL} failed: {e}")
+        sys.exit(1)
     
     logger.info(f"Step 2: Unzipping {zip_path} to {WEBUI}")
     try:
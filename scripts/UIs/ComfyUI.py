@@ -33,8 +33,10 @@ for path in [PROJECT_ROOT, SCRIPTS_DIR]:
 
 # Import Trinity modules
 try:
-    from modules.Manager import download_url_to_path
     import modules.json_utils as json_utils
+    from scripts.http_client import get_http_client
+    from scripts.io_engine import run_io
+    from scripts.extension_fetcher import fetch_repos
 except ImportError as e:
     logger.error(f"Failed to import Trinity modules: {e}")
     sys.exit(1)
@@ -103,10 +105,12 @@ async def _download_file(url: str, directory: Path, filename: str) -> bool:
             logger.warning(f"Could not delete existing file {file_path}: {e}")
 
     logger.info(f"Downloading {url} to {file_path}")
-    success = download_url_to_path(url=url, target_full_path=str(file_path), log=True)
-    if not success:
-        logger.error(f"Error downloading {url} using download_url_to_path")
-    return success
+    try:
+        await run_io(get_http_client().download_to_path, url, file_path)
+        return True
+    except Exception as e:
+        logger.error(f"Error downloading {url}: {e}")
+        return False
 
 
 async def download_files(file_list: List[str]) -> None:
@@ -148,8 +152,6 @@ async def download_configuration() -> None:
         parts = file_info.split(',')
         directory = Path(parts[1].strip()) if len(parts) > 1 else WEBUI
         directory.mkdir(parents=True, exist_ok=True)
-        
-    await download_files(files_to_download)
 
     # Clone custom nodes
     extensions_list = [
@@ -167,44 +169,37 @@ async def download_configuration() -> None:
     ]
 
     CUSTOM_NODES_PATH.mkdir(parents=True, exist_ok=True)
-    original_cwd = Path.cwd()
+    logger.info(f"Cloning custom nodes into {CUSTOM_NODES_PATH}")
     
-    try:
-        change_directory(CUSTOM_NODES_PATH)
-        logger.info(f"Cloning custom nodes into {CUSTOM_NODES_PATH}")
-        
-        procs = []
-        for command_str in extensions_list:
-            parts = command_str.split()
-            repo_url = parts[0]
-            repo_name_git = repo_url.split('/')[-1]
-            if repo_name_git.endswith('.git'):
-                repo_name_git = repo_name_git[:-4]
-            repo_name = parts[1] if len(parts) > 1 else repo_name_git
-
-            if (CUSTOM_NODES_PATH / repo_name).exists():
-                logger.info(f"Custom node '{repo_name}' already exists. Skipping clone.")
-                continue
-            
-            process = await asyncio.create_subprocess_shell(
-                f"git clone --depth 1 {repo_url} {repo_name}",
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            procs.append(process)
-        
-        results = await asyncio.gather(*[p.communicate() for p in procs], return_exceptions=True)
-
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Error cloning custom node (exception): {result}")
-            elif procs[i].returncode != 0:
-                stdout, stderr = result
-                repo_name_failed = extensions_list[i].split('/')[-1].split()[0].replace('.git', '')
-                logger.error(f"Error cloning custom node '{repo_name_failed}'. Git stderr: {stderr.decode() if stderr else 'No stderr'}")
-                if stdout:
-                    logger.error(f"Git stdout: {stdout.decode()}")
-    finally:
-        change_directory(original_cwd)
+    repos = []
+    for command_str in extensions_list:
+        parts = command_str.split()
+        repo_url = parts[0]
+        repo_name_git = repo_url.split('/')[-1]
+        if repo_name_git.endswith('.git'):
+            repo_name_git = repo_name_git[:-4]
+        repo_name = parts[1] if len(parts) > 1 else repo_name_git
+
+        if (CUSTOM_NODES_PATH / repo_name).exists():
+            logger.info(f"Custom node '{repo_name}' already exists. Skipping clone.")
+            continue
+        repos.append((repo_url, repo_name))
+    
+    # Config files and custom node clones run side by side
+    _, results = await asyncio.gather(
+        download_files(files_to_download),
+        fetch_repos(repos, CUSTOM_NODES_PATH)
+    )
+
+    for (repo_url, repo_name), result in zip(repos, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error cloning custom node '{repo_name}' (exception): {result}")
+            continue
+        returncode, stdout, stderr = result
+        if returncode != 0:
+            logger.error(f"Error cloning custom node '{repo_name}'. Git stderr: {stderr.decode() if stderr else 'No stderr'}")
+            if stdout:
+                logger.error(f"Git stdout: {stdout.decode()}")
 
     # Run install dependencies script
     install_deps_script = WEBUI / "install-deps.py"
@@ -253,9 +248,10 @@ def unpack_webui() -> None:
     zip_path = HOME / f"{UI_NAME}.zip"
     logger.info(f"Step 1: Downloading WebUI from {WEBUI_REPO_URL}")
     
-    download_successful = download_url_to_path(url=WEBUI_REPO_URL, target_full_path=str(zip_path), log=True)
-    if not download_successful:
-        logger.error(f"Download of {WEBUI_REPO_URL} failed. Cannot proceed.")
+    try:
+        get_http_client().download_to_path(WEBUI_REPO_URL, zip_path)
+    except Exception as e:
+        logger.error(f"Download of {WEBUI_REPO_URL} failed: {e}. Cannot proceed.")
         sys.exit(1)
     
     logger.info(f"Step 2: Unzipping {zip_path} to {WEBUI}")
@@ -11,10 +11,8 @@ License: MIT
 import asyncio
 import logging
 import os
-import ssl
 import subprocess
 import sys
-import urllib.request
 from pathlib import Path
 from typing import List
 
@@ -34,6 +32,9 @@ for path in [PROJECT_ROOT, SCRIPTS_DIR]:
 # Import Trinity modules
 try:
     import modules.json_utils as json_utils
+    from scripts.http_client import get_http_client
+    from scripts.io_engine import run_io
+    from scripts.extension_fetcher import fetch_repos
 except ImportError as e:
     logger.error(f"Failed to import Trinity modules: {e}")
     sys.exit(1)
@@ -90,7 +91,7 @@ if HOME.exists():
 # ==================== WEBUI OPERATIONS ====================
 
 async def _download_file(url: str, directory: Path, filename: str) -> None:
-    """Cross-platform file download using urllib."""
+    """Cross-platform file download through the shared Trinity HTTP client."""
     directory = Path(directory)
     directory.mkdir(parents=True, exist_ok=True)
     file_path = directory / filename
@@ -99,13 +100,8 @@ async def _download_file(url: str, directory: Path, filename: str) -> None:
         file_path.unlink()  # Ensure fresh download for config files
     
     try:
-        # Create SSL context that doesn't verify certificates for compatibility
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
         logger.info(f"Downloading {url} to {file_path}")
-        urllib.request.urlretrieve(url, file_path)
+        await run_io(get_http_client().download_to_path, url, file_path)
         logger.info(f"Successfully downloaded {filename}")
     except Exception as e:
         logger.error(f"Error downloading {url}: {e}")
@@ -142,7 +138,6 @@ async def download_configuration() -> None:
         parts = file_info.split(',')
         directory = Path(parts[1].strip()) if len(parts) > 1 else WEBUI
         directory.mkdir(parents=True, exist_ok=True)
-    await download_files(configs_to_download)
 
     # Extension repositories (note: Forge has built-in ADetailer)
     extensions_list = [
@@ -156,44 +151,37 @@ async def download_configuration() -> None:
     ]
 
     FORGE_EXTENSIONS_PATH.mkdir(parents=True, exist_ok=True)
-    original_cwd = Path.cwd()
+    logger.info(f"Cloning extensions into {FORGE_EXTENSIONS_PATH}")
     
-    try:
-        change_directory(FORGE_EXTENSIONS_PATH)
-        logger.info(f"Cloning extensions into {FORGE_EXTENSIONS_PATH}")
+    repos = []
+    for command_str in extensions_list:
+        parts = command_str.split()
+        repo_url = parts[0]
+        repo_name_git = repo_url.split('/')[-1]
+        if repo_name_git.endswith('.git'):
+            repo_name_git = repo_name_git[:-4]
+        repo_name = parts[1] if len(parts) > 1 else repo_name_git
         
-        procs = []
-        for command_str in extensions_list:
-            parts = command_str.split()
-            repo_url = parts[0]
-            repo_name_git = repo_url.split('/')[-1]
-            if repo_name_git.endswith('.git'):
-                repo_name_git = repo_name_git[:-4]
-            repo_name = parts[1] if len(parts) > 1 else repo_name_git
-            
-            if (FORGE_EXTENSIONS_PATH / repo_name).exists():
-                logger.info(f"Extension '{repo_name}' already exists. Skipping clone.")
-                continue
-
-            process = await asyncio.create_subprocess_shell(
-                f"git clone --depth 1 {repo_url} {repo_name}",
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            procs.append(process)
-
-        results = await asyncio.gather(*[p.communicate() for p in procs], return_exceptions=True)
-
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"Error cloning extension (exception): {result}")
-            elif procs[i].returncode != 0:
-                stdout, stderr = result
-                repo_name_failed = extensions_list[i].split('/')[-1].split()[0].replace('.git', '')
-                logger.error(f"Error cloning extension '{repo_name_failed}'. Git stderr: {stderr.decode() if stderr else 'No stderr'}")
-                if stdout:
-                    logger.error(f"Git stdout: {stdout.decode()}")
-    finally:
-        change_directory(original_cwd)
+        if (FORGE_EXTENSIONS_PATH / repo_name).exists():
+            logger.info(f"Extension '{repo_name}' already exists. Skipping clone.")
+            continue
+        repos.append((repo_url, repo_name))
+
+    # Config files and extension clones run side by side
+    _, results = await asyncio.gather(
+        download_files(configs_to_download),
+        fetch_repos(repos, FORGE_EXTENSIONS_PATH)
+    )
+
+    for (repo_url, repo_name), result in zip(repos, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error cloning extension '{repo_name}' (exception): {result}")
+            continue
+        returncode, stdout, stderr = result
+        if returncode != 0:
+            logger.error(f"Error cloning extension '{repo_name}'. Git stderr: {stderr.decode() if stderr else 'No stderr'}")
+            if stdout:
+                logger.error(f"Git stdout: {stdout.decode()}")
 
 
 def install_webui() -> None:
@@ -11,16 +11,16 @@ License: MIT
 import asyncio
 import logging
 import os
-import ssl
 import subprocess
 import sys
-import urllib.request
 from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional, Tuple, Iterator
 from urllib.parse import urlparse
 
+import requests
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
@@ -38,6 +38,9 @@ for path in [PROJECT_ROOT, SCRIPTS_DIR]:
 try:
     from modules.Manager import m_download
     import modules.json_utils as json_utils
+    from scripts.http_client import get_http_client
+    from scripts.io_engine import run_io
+    from scripts.extension_fetcher import fetch_repos
 except ImportError as e:
     logger.error(f"Failed to import Trinity modules: {e}")
     sys.exit(1)
@@ -184,7 +187,7 @@ else:
 
 async def download_file(url: str, directory: Path, filename: str) -> bool:
     """
-    Cross-platform file download using urllib with comprehensive error handling.
+    Cross-platform file download through the shared HTTP client with comprehensive error handling.
     
     Args:
         url: The URL to download from
@@ -217,26 +220,15 @@ async def download_file(url: str, directory: Path, filename: str) -> bool:
             logger.warning(f"Could not remove existing file {file_path}: {e}")
     
     try:
-        # Create SSL context for compatibility
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
         logger.info(f"Downloading {url} to {file_path}")
-        
-        # Use urllib with SSL context
-        request = urllib.request.Request(url)
-        with urllib.request.urlopen(request, context=ssl_context) as response:
-            with open(file_path, 'wb') as f:
-                f.write(response.read())
-        
+        await run_io(get_http_client().download_to_path, url, file_path)
         logger.info(f"Successfully downloaded {filename}")
         return True
         
-    except urllib.error.URLError as e:
+    except requests.HTTPError as e:
+        raise DownloadError(f"HTTP error {e.response.status_code} downloading {url}: {e}") from e
+    except requests.RequestException as e:
         raise DownloadError(f"Network error downloading {url}: {e}") from e
-    except urllib.error.HTTPError as e:
-        raise DownloadError(f"HTTP error {e.code} downloading {url}: {e}") from e
     except OSError as e:
         raise DownloadError(f"File system error saving {filename}: {e}") from e
     except Exception as e:
@@ -334,16 +326,16 @@ async def download_configuration() -> bool:
             f"{url_config_base}/gradio-tunneling.py,{VENV_PATH}/lib/python{config.python_version}/site-packages/gradio_tunneling,main.py"
         ]
         
-        # Download configuration files
-        config_results = await download_files_batch(config_files)
+        # Download configuration files and clone extensions concurrently
+        config_results, extensions_success = await asyncio.gather(
+            download_files_batch(config_files),
+            clone_extensions()
+        )
         config_success = sum(config_results) > 0  # At least some files should succeed
         
         if not config_success:
             logger.warning("No configuration files downloaded successfully")
         
-        # Clone extensions
-        extensions_success = await clone_extensions()
-        
         overall_success = config_success and extensions_success
         if overall_success:
             logger.info("Configuration download completed successfully")
@@ -386,8 +378,7 @@ async def clone_extensions() -> bool:
         logger.info(f"Cloning extensions into {EXTENSIONS_PATH} (review for ReForge compatibility)")
         
         with change_directory(EXTENSIONS_PATH):
-            processes = []
-            valid_extensions = []
+            repos = []
             
             for extension_command in extensions_list:
                 try:
@@ -406,51 +397,39 @@ async def clone_extensions() -> bool:
                         logger.info(f"Extension '{repo_name}' already exists. Skipping clone.")
                         continue
 
-                    # Create subprocess for git clone
-                    process = await asyncio.create_subprocess_shell(
-                        f"git clone --depth 1 {repo_url} {repo_name}",
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.PIPE
-                    )
-                    processes.append((process, repo_name, repo_url))
-                    valid_extensions.append(extension_command)
+                    repos.append((repo_url, repo_name))
                     
                 except Exception as e:
-                    logger.error(f"Failed to start git clone for {extension_command}: {e}")
+                    logger.error(f"Failed to prepare git clone for {extension_command}: {e}")
                     continue
 
-            if not processes:
+            if not repos:
                 logger.warning("No extension cloning processes started")
                 return True  # No extensions to clone is not a failure
 
-            # Wait for all clones to complete
+            # Wait for all clones to complete, with a bounded number of git processes
             try:
-                results = await asyncio.gather(
-                    *[process.communicate() for process, _, _ in processes],
-                    return_exceptions=True
-                )
+                results = await fetch_repos(repos, EXTENSIONS_PATH)
             except Exception as e:
                 raise GitOperationError(f"Failed to complete extension cloning: {e}") from e
 
             # Check results and provide detailed feedback
             success_count = 0
-            for i, result in enumerate(results):
+            for (repo_url, repo_name), result in zip(repos, results):
                 if isinstance(result, Exception):
-                    _, repo_name, repo_url = processes[i]
                     logger.error(f"Exception during git clone of '{repo_name}': {result}")
                     continue
                     
-                process, repo_name, repo_url = processes[i]
-                stdout, stderr = result
+                returncode, stdout, stderr = result
                 
-                if process.returncode == 0:
+                if returncode == 0:
                     logger.info(f"Successfully cloned extension '{repo_name}'")
                     success_count += 1
                 else:
                     error_msg = stderr.decode() if stderr else 'No stderr output'
                     logger.error(f"Failed to clone extension '{repo_name}' from {repo_url}: {error_msg}")
 
-            logger.info(f"Extension cloning completed: {success_count}/{len(processes)} successful")
+            logger.info(f"Extension cloning completed: {success_count}/{len(repos)} successful")
             return success_count > 0  # At least one extension should succeed
             
     except OSError as e:
@@ -12,10 +12,8 @@ License: MIT
 import asyncio
 import logging
 import os
-import ssl
 import subprocess
 import sys
-import urllib.request
 import zipfile
 from pathlib import Path
 from typing import List
@@ -35,8 +33,9 @@ for path in [PROJECT_ROOT, SCRIPTS_DIR]:
 
 # Import Trinity modules
 try:
-    from modules.Manager import m_download
     import modules.json_utils as json_utils
+    from scripts.http_client import get_http_client
+    from scripts.io_engine import run_io
 except ImportError as e:
     logger.error(f"Failed to import Trinity modules: {e}")
     sys.exit(1)
@@ -93,7 +92,7 @@ if HOME.exists():
 # ==================== WEBUI OPERATIONS ====================
 
 async def _download_file(url: str, directory: Path, filename: str) -> None:
-    """Cross-platform file download using urllib."""
+    """Cross-platform file download through the shared Trinity HTTP client."""
     directory = Path(directory)
     directory.mkdir(parents=True, exist_ok=True)
     file_path = directory / filename
@@ -102,13 +101,8 @@ async def _download_file(url: str, directory: Path, filename: str) -> None:
         file_path.unlink()
     
     try:
-        # Create SSL context that doesn't verify certificates for compatibility
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
         logger.info(f"Downloading {url} to {file_path}")
-        urllib.request.urlretrieve(url, file_path)
+        await run_io(get_http_client().download_to_path, url, file_path)
         logger.info(f"Successfully downloaded {filename}")
     except Exception as e:
         logger.error(f"Error downloading {url}: {e}")
@@ -147,7 +141,11 @@ def unpack_webui() -> None:
     zip_path = HOME / f"{UI_NAME}.zip"
     logger.info(f"Step 1: Downloading WebUI from {WEBUI_REPO_URL} (assuming zip archive)")
     
-    m_download(f"{WEBUI_REPO_URL} {str(HOME)} {UI_NAME}.zip", log=True)
+    try:
+        get_http_client().download_to_path(WEBUI_REPO_URL, zip_path)
+    except Exception as e:
+        logger.error(f"Download of {WEBUI_REPO_URL} failed: {e}")
+        sys.exit(1)
     
     logger.info(f"Step 2: Unzipping {zip_path} to {WEBUI}")
     WEBUI.mkdir(parents=True, exist_ok=True)
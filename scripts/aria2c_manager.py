@@ -3,16 +3,31 @@ TrinityUI Aria2c Download Manager
 Handles high-speed downloads with aria2c acceleration
 """
 import os
+import re
+import secrets
 import subprocess
 import json
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional
+from .negative_cache import NegativeURLCache, classify_aria2c_failure
+from .bandwidth_budget import get_bandwidth_budget, PRIORITY_CRITICAL, PRIORITY_NORMAL
+from .download_staging import staging_path, verify_download, commit_staged, discard_staged
+from .page_cache import drop_file_cache
+
+# Selections with more files than this go through download_batch: one aria2c process per chunk, not per file
+BATCH_MIN_FILES = 16
+BATCH_CHUNK_SIZE = 500
+BATCH_CONCURRENT_DOWNLOADS = 16
+# aria2c's "Download Results" table: the first six hex digits of each gid and its status
+BATCH_RESULT_RE = re.compile(r'^([0-9a-f]{6})\|(OK|ERR|INPR|RM)\s*\|', re.MULTILINE)
+BATCH_ERROR_RE = re.compile(r'errorCode=(\d+) URI=(\S+)')
 
 class Aria2cManager:
     def __init__(self, cache_dir: Path = None):
         self.cache_dir = cache_dir or Path('/tmp/trinity_cache')
         self.cache_dir.mkdir(exist_ok=True)
         self.config_file = self.setup_aria2c_config()
+        self.negative_cache = NegativeURLCache()
     
     def setup_aria2c_config(self) -> str:
         """Setup aria2c configuration for optimal performance"""
@@ -37,32 +52,130 @@ class Aria2cManager:
         
         return str(config_file)
     
-    def download_file(self, url: str, output_path: Path, filename: str) -> Tuple[bool, str]:
-        """Download a single file with aria2c"""
+    def download_file(self, url: str, output_path: Path, filename: str, checksum: Optional[str] = None,
+                      priority: int = PRIORITY_NORMAL, expected_size: Optional[int] = None) -> Tuple[bool, str]:
+        """Download a single file with aria2c into a `.part` file and publish it once verified"""
         try:
             output_path.mkdir(parents=True, exist_ok=True)
+            file_path = output_path / filename
+            part_path = staging_path(file_path)
             
-            cmd = [
-                'aria2c',
-                f'--conf-path={self.config_file}',
-                '--dir', str(output_path),
-                '--out', filename,
-                url
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            with get_bandwidth_budget().lease(f"asset:{filename}", priority) as lease:
+                # Command-line options override the shared config's connection counts
+                cmd = [
+                    'aria2c',
+                    f'--conf-path={self.config_file}',
+                    *lease.aria2c_args(),
+                    '--dir', str(output_path),
+                    '--out', part_path.name
+                ]
+                if checksum:
+                    cmd.append(f'--checksum=sha-256={checksum}')
+                cmd.append(url)
+                
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
             
-            file_path = output_path / filename
-            if result.returncode == 0 and file_path.exists() and file_path.stat().st_size > 0:
+            if result.returncode == 0 and part_path.exists():
+                # aria2c already checked the hash when one was passed
+                error = verify_download(part_path, filename, {'sha256': checksum, 'size': expected_size},
+                                        hash_verified=bool(checksum))
+                if error:
+                    discard_staged(part_path)
+                    return False, f"Verification failed for {filename}: {error}"
+                commit_staged(part_path, file_path)
+                drop_file_cache(file_path)
+                self.negative_cache.clear(url)
                 return True, f"Downloaded {filename} successfully"
             else:
+                failure = classify_aria2c_failure(result.returncode, result.stdout + result.stderr)
+                if failure:
+                    self.negative_cache.record_failure(url, failure, result.stderr or result.stdout)
                 return False, f"Download failed: {result.stderr[:200] if result.stderr else 'Unknown error'}"
                 
         except subprocess.TimeoutExpired:
+            self.negative_cache.record_failure(url, 'timeout', 'aria2c did not finish within 600s')
             return False, f"Download timed out for {filename}"
         except Exception as e:
             return False, f"Download error for {filename}: {e}"
     
+    def download_batch(self, files: List[Dict[str, Any]], priority: int = PRIORITY_NORMAL,
+                       progress_callback: Optional[Callable[[int, int, int], None]] = None) -> List[Dict[str, Any]]:
+        """Download [{'url', 'file_path', 'expected'}] (at most BATCH_CHUNK_SIZE) with a single aria2c process.
+
+        Spawning aria2c and taking a bandwidth lease costs tens of milliseconds, paid here once per chunk
+        instead of once per file. Returns one {'ok', 'message', 'sha256', 'failure'} per input file;
+        recording failures is left to the caller, as with ProcessPoolDownloader. progress_callback gets
+        (index, done, total) for files that are downloading.
+        """
+        if not files:
+            return []
+        lines = []
+        created_dirs = set()
+        for index, item in enumerate(files):
+            file_path = Path(item['file_path'])
+            if file_path.parent not in created_dirs:
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(file_path.parent)
+            # The index leads the gid because the results table prints only its first six digits
+            lines += [item['url'], f" gid={index:06x}{secrets.token_hex(5)}",
+                      f" dir={file_path.parent}", f" out={staging_path(file_path).name}"]
+            expected_sha256 = (item.get('expected') or {}).get('sha256')
+            if expected_sha256:
+                lines.append(f" checksum=sha-256={expected_sha256}")
+
+        input_file = self.cache_dir / f"batch_{os.getpid()}_{secrets.token_hex(4)}.txt"
+        input_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        indexes = {str(staging_path(Path(item['file_path']))): index for index, item in enumerate(files)}
+
+        def report(path, done, total):
+            if path in indexes:
+                progress_callback(indexes[path], done, total)
+
+        try:
+            with get_bandwidth_budget().lease(f"asset-batch:{len(files)}", priority) as lease:
+                cmd = [
+                    'aria2c',
+                    f'--conf-path={self.config_file}',
+                    *lease.aria2c_args(concurrent_downloads=BATCH_CONCURRENT_DOWNLOADS,
+                                       progress_callback=report if progress_callback else None),
+                    '--console-log-level=error',
+                    '--summary-interval=0',
+                    f'--input-file={input_file}'
+                ]
+                result = subprocess.run(cmd, capture_output=True, text=True)
+        finally:
+            input_file.unlink(missing_ok=True)
+
+        output = result.stdout + result.stderr
+        statuses = dict(BATCH_RESULT_RE.findall(output))
+        error_codes = {uri: int(code) for code, uri in BATCH_ERROR_RE.findall(output)}
+        return [self._finish_batch_item(item, statuses.get(f"{index:06x}"), error_codes)
+                for index, item in enumerate(files)]
+
+    def _finish_batch_item(self, item: Dict[str, Any], status: Optional[str],
+                           error_codes: Dict[str, int]) -> Dict[str, Any]:
+        file_path = Path(item['file_path'])
+        part_path = staging_path(file_path)
+        expected = item.get('expected') or {}
+        control_file = Path(str(part_path) + '.aria2')
+        # Without a results row, a staged file with no control file left behind still counts as complete
+        if status != 'OK' and (status is not None or not part_path.exists() or control_file.exists()):
+            code = error_codes.get(item['url'])
+            failure = classify_aria2c_failure(code) if code is not None else None
+            return {'ok': False, 'message': f"Download failed for {file_path.name} (aria2c status {status or 'unknown'})",
+                    'sha256': None, 'failure': failure}
+        # aria2c checked the hash of entries that carried one, but only a reported OK proves it
+        error = verify_download(part_path, file_path.name, expected,
+                                hash_verified=status == 'OK' and bool(expected.get('sha256')))
+        if error:
+            discard_staged(part_path)
+            return {'ok': False, 'message': f"Verification failed for {file_path.name}: {error}",
+                    'sha256': None, 'failure': None}
+        commit_staged(part_path, file_path)
+        drop_file_cache(file_path)
+        return {'ok': True, 'message': f"Downloaded {file_path.name} successfully",
+                'sha256': expected.get('sha256'), 'failure': None}
+    
     def batch_download_pytorch_wheels(self) -> bool:
         """Pre-download PyTorch wheels for faster installation"""
         wheels = {
@@ -84,8 +197,10 @@ class Aria2cManager:
                 f.write(f" dir={pytorch_cache}\n")
                 f.write(f" out={name}.whl\n\n")
         
-        # Download with aria2c
-        cmd = f"aria2c --conf-path={self.config_file} --input-file={download_file}"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        # Download with aria2c; torch is the critical path of every install
+        with get_bandwidth_budget().lease("pytorch-wheels", PRIORITY_CRITICAL) as lease:
+            budget_args = ' '.join(lease.aria2c_args(concurrent_downloads=len(wheels)))
+            cmd = f"aria2c --conf-path={self.config_file} {budget_args} --input-file={download_file}"
+            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
         
         return result.returncode == 0
@@ -6,7 +6,13 @@ import json
 import ast
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
-from .aria2c_manager import Aria2cManager
+from .aria2c_manager import Aria2cManager, BATCH_MIN_FILES, BATCH_CHUNK_SIZE
+from .asset_metadata import AssetMetadataResolver, LocalHashIndex, check_existing_asset, link_duplicate
+from .negative_cache import SKIP_CLASSES, partition_known_bad
+from .bandwidth_budget import PRIORITY_CRITICAL
+from .page_cache import mark_load_next
+from .download_tasks import DownloadTask
+from .pack_extractor import PackExtractor, pack_installed
 
 class AssetDownloader:
     def __init__(self, project_root: Path):
@@ -112,45 +118,142 @@ class AssetDownloader:
                         url = item.get('url', '')
                         filename = item.get('name', url.split('/')[-1])
                         if url and filename:
-                            download_tasks.append({
-                                'url': url,
-                                'path': target_dir,
-                                'filename': filename,
-                                'type': asset_type,
-                                'selection': item_name
-                            })
+                            download_tasks.append(DownloadTask(url, target_dir, filename, asset_type, item_name,
+                                                               pack=item if item.get('type') == 'pack' else None))
         
         if not download_tasks:
             print("❌ No valid download URLs found for selections")
             return False
         
+        # Drop URLs already known to be dead before anything is queued
+        negative_cache = self.aria2c.negative_cache
+        has_token = bool(config.get('civitai_token'))
+        download_tasks, skipped_tasks = partition_known_bad(download_tasks, negative_cache, has_token)
+        for task, entry in skipped_tasks:
+            print(f"⏭️ Skipping {task.filename}: URL is known to fail ({entry['failure']}): {task.url}")
+        for task in download_tasks:
+            if task.recent_failure:
+                print(f"⚠️ {task.filename} failed recently ({task.recent_failure['failure']}), trying again")
+        
+        # Discover expected hashes and sizes (one tree listing per Hugging Face repo, else one HEAD / API call per asset)
+        resolver = AssetMetadataResolver(civitai_token=config.get('civitai_token') or None)
+        metadata = resolver.resolve_many(task.url for task in download_tasks)
+        for task in download_tasks:
+            task.expected = metadata.get(task.url, {})
+        
+        # A 404/401 seen while resolving never enters the download queue
+        kept_tasks = []
+        for task in download_tasks:
+            failure = task.expected.get('failure')
+            if failure:
+                negative_cache.record_failure(task.url, failure, task.expected.get('error', ''), has_token)
+            if failure in SKIP_CLASSES:
+                print(f"⏭️ Skipping {task.filename}: metadata lookup failed ({failure}): {task.url}")
+            else:
+                kept_tasks.append(task)
+        download_tasks = kept_tasks
+        negative_cache.save()
+        # The first selected checkpoint is what the WebUI loads at startup, so it stays in the page cache
+        first_model = next((task for task in download_tasks if task.type == 'Model' and task.pack is None), None)
+        if first_model:
+            mark_load_next([first_model.file_path])
+        known_hashes = sum(1 for task in download_tasks if task.expected.get('sha256'))
+        print(f"🔎 Expected SHA-256 known for {known_hashes}/{len(download_tasks)} assets")
+        hash_index = LocalHashIndex()
+        
         print(f"\n📥 Starting high-speed download of {len(download_tasks)} files...")
         
         # Download with aria2c acceleration
         success_count = 0
         total_count = len(download_tasks)
+        # Large selections pay aria2c's startup once per chunk; the checkpoint still gets its own process
+        batch_mode = total_count > BATCH_MIN_FILES
+        batch_tasks = []
+        pack_tasks = []
         
         for i, task in enumerate(download_tasks, 1):
-            print(f"🔄 [{i}/{total_count}] Downloading {task['type']} from '{task['selection']}': {task['filename']}")
+            print(f"🔄 [{i}/{total_count}] Downloading {task.type} from '{task.selection}': {task.filename}")
             
-            # Check if file already exists
-            file_path = task['path'] / task['filename']
-            if file_path.exists() and file_path.stat().st_size > 1024*1024:  # > 1MB
-                print(f"   ✅ Already exists: {task['filename']}")
+            # Packs are archives that never land on disk; their members are checked against the pack manifest
+            if task.pack is not None:
+                pack_tasks.append(task)
+                continue
+            
+            # Check if file already exists, using the expected hash/size when known
+            file_path = task.file_path
+            expected_sha256 = task.expected.get('sha256')
+            reason = check_existing_asset(file_path, task.expected, hash_index)
+            if reason:
+                print(f"   ✅ Already exists ({reason}): {task.filename}")
                 success_count += 1
                 continue
             
+            if expected_sha256:
+                source = link_duplicate(expected_sha256, file_path, hash_index)
+                if source:
+                    print(f"   ✅ Reused identical file {source}")
+                    success_count += 1
+                    continue
+            
+            if batch_mode and task.priority != PRIORITY_CRITICAL:
+                batch_tasks.append(task)
+                continue
+            
             success, message = self.aria2c.download_file(
-                task['url'], 
-                task['path'], 
-                task['filename']
+                task.url, 
+                task.path, 
+                task.filename,
+                checksum=expected_sha256,
+                priority=task.priority,
+                expected_size=task.expected.get('size')
             )
             
             if success:
+                if expected_sha256:
+                    hash_index.record(file_path, expected_sha256)
                 success_count += 1
                 print(f"   ✅ {message}")
             else:
                 print(f"   ❌ {message}")
         
+        for start in range(0, len(batch_tasks), BATCH_CHUNK_SIZE):
+            chunk = batch_tasks[start:start + BATCH_CHUNK_SIZE]
+            print(f"📦 Downloading files {start + 1}-{start + len(chunk)} of {len(batch_tasks)} in one aria2c batch")
+            results = self.aria2c.download_batch([task.transfer() for task in chunk],
+                                                 priority=max(task.priority for task in chunk))
+            for task, result in zip(chunk, results):
+                if result['ok']:
+                    if result['sha256']:
+                        hash_index.record(task.file_path, result['sha256'])
+                    negative_cache.clear(task.url)
+                    success_count += 1
+                else:
+                    if result['failure']:
+                        negative_cache.record_failure(task.url, result['failure'], result['message'], has_token)
+                    print(f"   ❌ {result['message']}")
+        
+        extractor = PackExtractor()
+        for task in pack_tasks:
+            if pack_installed(task.path, task.filename, task.url):
+                print(f"   ✅ Already extracted (pack manifest): {task.filename}")
+                success_count += 1
+                continue
+            print(f"📦 Extracting pack {task.filename} into {task.path}")
+            result = extractor.extract(task.url, task.path, task.filename, task.pack, task.expected)
+            for skipped in result['skipped']:
+                print(f"   ⏭️ Skipped {skipped['name']}: {skipped['reason']}")
+            if result['ok']:
+                for member in result['members']:
+                    hash_index.record(task.path / member['path'], member['sha256'])
+                negative_cache.clear(task.url)
+                success_count += 1
+                print(f"   ✅ {result['message']}")
+            else:
+                if result['failure']:
+                    negative_cache.record_failure(task.url, result['failure'], result['message'], has_token)
+                print(f"   ❌ {result['message']}")
+        
+        hash_index.save()
+        negative_cache.save()
         print(f"\n📊 Download Summary: {success_count}/{total_count} assets downloaded successfully")
         return success_count > 0
@@ -0,0 +1,340 @@
+"""
+TrinityUI Asset Metadata Resolver
+Discovers expected SHA-256 hashes and sizes for catalog assets from Hugging Face and Civitai
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+from scripts.http_client import get_http_client, TrinityHTTPClient
+from scripts.negative_cache import classify_exception
+from scripts.download_staging import check_header, sha256_file
+from scripts.page_cache import copy_file_uncached
+
+CACHE_DIR = Path('/tmp/trinity_cache')
+METADATA_CACHE_FILE = CACHE_DIR / 'asset_metadata.json'
+HASH_INDEX_FILE = CACHE_DIR / 'asset_hashes.json'
+
+# Hugging Face `resolve/main` can move to a new revision, so metadata is re-resolved daily
+METADATA_CACHE_TTL = 24 * 3600
+RESOLVER_WORKERS = 8
+
+HUGGINGFACE_RESOLVE_RE = re.compile(r'^https?://huggingface\.co/.+/resolve/')
+CIVITAI_DOWNLOAD_RE = re.compile(r'^https?://civitai\.com/api/download/models/(\d+)')
+# (repo kind, repo id, revision, file path) of a Hugging Face resolve URL
+HUGGINGFACE_FILE_RE = re.compile(
+    r'^https?://huggingface\.co/(?:(datasets|spaces)/)?([^/]+/[^/]+)/resolve/([^/]+)/([^?#]+)')
+HUGGINGFACE_TREE_API = "https://huggingface.co/api/{kind}/{repo}/tree/{revision}"
+# Repos with at least this many unresolved files are listed once instead of one HEAD per file
+TREE_LISTING_MIN_FILES = 4
+CIVITAI_VERSION_API = "https://civitai.com/api/v1/model-versions/{version_id}"
+
+
+def _load_json(path: Path) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path: Path, data: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+class AssetMetadataResolver:
+    def __init__(self, cache_file: Path = METADATA_CACHE_FILE, client: Optional[TrinityHTTPClient] = None,
+                 civitai_token: Optional[str] = None, max_workers: int = RESOLVER_WORKERS):
+        self.cache_file = cache_file
+        self.client = client or get_http_client()
+        self.civitai_token = civitai_token
+        self.max_workers = max_workers
+        self.cache = _load_json(cache_file)
+        self._lock = threading.Lock()
+
+    def _cached(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self.cache.get(url)
+        if cached and time.time() - cached.get('resolved_at', 0) < METADATA_CACHE_TTL:
+            return cached
+        return None
+
+    def resolve(self, url: str) -> Dict[str, Any]:
+        """Return {'sha256', 'size', 'etag', 'last_modified', 'source'} for a URL (values may be None)"""
+        cached = self._cached(url)
+        if cached:
+            return cached
+
+        try:
+            if HUGGINGFACE_RESOLVE_RE.match(url):
+                metadata = self._resolve_huggingface(url)
+            elif CIVITAI_DOWNLOAD_RE.match(url):
+                metadata = self._resolve_civitai(url)
+            else:
+                metadata = self._resolve_generic(url)
+        except Exception as e:
+            return {'sha256': None, 'size': None, 'source': 'error', 'error': str(e), 'failure': classify_exception(e)}
+
+        metadata['resolved_at'] = time.time()
+        with self._lock:
+            self.cache[url] = metadata
+        return metadata
+
+    def remember(self, url: str, metadata: Dict[str, Any]):
+        """Replace the cached record for url with freshly observed metadata"""
+        metadata = dict(metadata, resolved_at=time.time())
+        with self._lock:
+            self.cache[url] = metadata
+
+    def resolve_many(self, urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Resolve several URLs concurrently and persist the cache.
+
+        Files from the same Hugging Face repo and revision share one tree listing; everything else
+        costs one HEAD or API call.
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+        results = {}
+        pending = []
+        repos: Dict[Tuple[str, str, str], List[Tuple[str, str]]] = {}
+        for url in unique_urls:
+            cached = self._cached(url)
+            if cached:
+                results[url] = cached
+                continue
+            match = HUGGINGFACE_FILE_RE.match(url)
+            if match:
+                kind, repo, revision, path = match.groups()
+                repos.setdefault((kind or 'models', repo, revision), []).append((url, unquote(path)))
+            else:
+                pending.append(url)
+        listings = []
+        for key, files in repos.items():
+            if len(files) >= TREE_LISTING_MIN_FILES:
+                listings.append((key, files))
+            else:
+                pending.extend(url for url, _ in files)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="TrinityMeta") as pool:
+            for listed, unlisted in pool.map(self._resolve_listing, listings):
+                results.update(listed)
+                pending.extend(unlisted)
+            results.update(zip(pending, pool.map(self.resolve, pending)))
+        self.save()
+        return results
+
+    def _resolve_listing(self, listing: Tuple[Tuple[str, str, str], List[Tuple[str, str]]]
+                         ) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Resolve a repo's files from one tree listing; returns (resolved, urls left for per-file HEADs)"""
+        (kind, repo, revision), files = listing
+        try:
+            tree = self._list_huggingface_tree(kind, repo, revision)
+        except Exception:
+            # Gated/private repos and API hiccups fall back to the per-file path, which classifies failures
+            return {}, [url for url, _ in files]
+        resolved, unlisted = {}, []
+        now = time.time()
+        for url, path in files:
+            entry = tree.get(path)
+            if entry is None:
+                unlisted.append(url)
+                continue
+            lfs = entry.get('lfs') or {}
+            sha256 = lfs.get('oid') or lfs.get('sha256')
+            metadata = {
+                'sha256': sha256.lower() if sha256 and re.fullmatch(r'[0-9a-fA-F]{64}', sha256) else None,
+                'size': lfs.get('size', entry.get('size')),
+                'etag': None,
+                'last_modified': None,
+                'source': 'huggingface',
+                'resolved_at': now
+            }
+            resolved[url] = metadata
+        with self._lock:
+            self.cache.update(resolved)
+        return resolved, unlisted
+
+    def _list_huggingface_tree(self, kind: str, repo: str, revision: str) -> Dict[str, Dict[str, Any]]:
+        """All files of a repo revision by path, following the API's Link pagination"""
+        url = HUGGINGFACE_TREE_API.format(kind=kind, repo=repo, revision=revision)
+        params = {'recursive': 'true'}
+        files = {}
+        while url:
+            response = self.client.get(url, params=params)
+            response.raise_for_status()
+            for entry in response.json():
+                if entry.get('type') == 'file':
+                    files[entry['path']] = entry
+            url = response.links.get('next', {}).get('url')
+            params = None  # the next link carries the cursor and the original query
+        return files
+
+    def save(self):
+        with self._lock:
+            snapshot = dict(self.cache)
+        try:
+            _save_json(self.cache_file, snapshot)
+        except OSError:
+            pass
+
+    def _resolve_huggingface(self, url: str) -> Dict[str, Any]:
+        """LFS files expose their SHA-256 in X-Linked-Etag on the (unfollowed) resolve redirect"""
+        response = self.client.head(url, allow_redirects=False)
+        if response.status_code >= 400:
+            response.raise_for_status()
+        headers = response.headers
+        linked_etag = headers.get('X-Linked-Etag', '').strip('"')
+        # Content-Length of an unfollowed redirect is the redirect body, not the file
+        size = headers.get('X-Linked-Size') or (headers.get('Content-Length') if response.status_code == 200 else None)
+        return {
+            'sha256': linked_etag.lower() if re.fullmatch(r'[0-9a-fA-F]{64}', linked_etag) else None,
+            'size': int(size) if size and size.isdigit() else None,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'source': 'huggingface'
+        }
+
+    def _resolve_civitai(self, url: str) -> Dict[str, Any]:
+        """The model-version API lists every file of the version with its hashes"""
+        version_id = CIVITAI_DOWNLOAD_RE.match(url).group(1)
+        headers = {'Authorization': f'Bearer {self.civitai_token}'} if self.civitai_token else {}
+        response = self.client.get(CIVITAI_VERSION_API.format(version_id=version_id), headers=headers)
+        response.raise_for_status()
+        files = response.json().get('files', [])
+        # /api/download/models/<id> serves the primary file unless a type/format is requested
+        chosen = next((f for f in files if f.get('primary')), files[0] if files else {})
+        sha256 = (chosen.get('hashes') or {}).get('SHA256')
+        return {
+            'sha256': sha256.lower() if sha256 else None,
+            'size': None,  # Civitai only publishes an approximate sizeKB
+            'size_kb': chosen.get('sizeKB'),
+            'etag': None,
+            'last_modified': None,
+            'source': 'civitai'
+        }
+
+    def _resolve_generic(self, url: str) -> Dict[str, Any]:
+        response = self.client.head(url)
+        response.raise_for_status()
+        size = response.headers.get('Content-Length')
+        return {
+            'sha256': None,
+            'size': int(size) if size and size.isdigit() else None,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'source': 'http'
+        }
+
+
+class LocalHashIndex:
+    """Remembers the SHA-256 of local files by (path, size, mtime) so they are never re-hashed"""
+
+    def __init__(self, index_file: Path = HASH_INDEX_FILE):
+        self.index_file = index_file
+        self.entries = _load_json(index_file)
+        self._lock = threading.Lock()
+        # Reverse index so duplicate lookups stay O(1) on large selections
+        self.paths_by_hash: Dict[str, Set[str]] = {}
+        for path_str, entry in self.entries.items():
+            self.paths_by_hash.setdefault(entry['sha256'], set()).add(path_str)
+
+    def lookup(self, file_path: Path) -> Optional[str]:
+        """Return the recorded hash if the file is unchanged since it was recorded"""
+        entry = self.entries.get(str(file_path))
+        if not entry:
+            return None
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+        return None
+
+    def record(self, file_path: Path, sha256: str):
+        stat = file_path.stat()
+        path_str = str(file_path)
+        with self._lock:
+            previous = self.entries.get(path_str)
+            if previous and previous['sha256'] != sha256:
+                self.paths_by_hash.get(previous['sha256'], set()).discard(path_str)
+            self.entries[path_str] = {'sha256': sha256, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            self.paths_by_hash.setdefault(sha256, set()).add(path_str)
+
+    def hash_and_record(self, file_path: Path) -> str:
+        sha256 = self.lookup(file_path)
+        if sha256 is None:
+            sha256 = sha256_file(file_path)
+            self.record(file_path, sha256)
+        return sha256
+
+    def find_by_hash(self, sha256: str) -> Optional[Path]:
+        """Find an unchanged local file with the given content hash"""
+        with self._lock:
+            candidates = sorted(self.paths_by_hash.get(sha256, ()))
+        for path_str in candidates:
+            path = Path(path_str)
+            if self.lookup(path) == sha256:
+                return path
+        return None
+
+    def save(self):
+        with self._lock:
+            snapshot = dict(self.entries)
+        try:
+            _save_json(self.index_file, snapshot)
+        except OSError:
+            pass
+
+
+# check_existing_asset reasons that compared the file against the expected metadata
+VERIFIED_KEEP_REASONS = ('hash match', 'size match')
+
+
+def check_existing_asset(file_path: Path, expected: Dict[str, Any], hash_index: LocalHashIndex) -> Optional[str]:
+    """Return why an existing file can be kept, or None if it must be (re)downloaded"""
+    if not file_path.exists():
+        return None
+    size = file_path.stat().st_size
+    expected_sha256 = expected.get('sha256')
+    expected_size = expected.get('size')
+
+    if expected_sha256:
+        # Files the index has not seen are hashed once here and recorded, so the next check is a lookup
+        try:
+            known_sha256 = hash_index.hash_and_record(file_path)
+        except OSError:
+            return None
+        return "hash match" if known_sha256 == expected_sha256 else None
+    if expected_size is not None:
+        return "size match" if size == expected_size else None
+    # No metadata available: keep the previous heuristic, but reject files with a broken header
+    # (e.g. written in place by an interrupted download before staging existed)
+    return "already exists" if size > 1024 * 1024 and check_header(file_path) is None else None
+
+
+def link_duplicate(sha256: str, file_path: Path, hash_index: LocalHashIndex) -> Optional[Path]:
+    """Materialize file_path from an identical local file (hardlink, else copy); return the source"""
+    source = hash_index.find_by_hash(sha256)
+    if source is None or source == file_path:
+        return None
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if file_path.exists():
+            file_path.unlink()
+        os.link(source, file_path)
+    except OSError:
+        copy_file_uncached(source, file_path)
+    hash_index.record(file_path, sha256)
+    return source
@@ -0,0 +1,114 @@
+"""
+TrinityUI Asset Update Checker
+Detects upstream changes to installed assets with conditional requests against their recorded validators
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.http_client import get_http_client, TrinityHTTPClient
+from scripts.asset_metadata import HUGGINGFACE_RESOLVE_RE
+from scripts.negative_cache import classify_exception, classify_http_status
+from scripts.download_state import DEFAULT_DB_PATH, open_state_store
+
+UPDATE_CHECK_WORKERS = 8
+
+
+class AssetUpdateChecker:
+    def __init__(self, client: Optional[TrinityHTTPClient] = None, max_workers: int = UPDATE_CHECK_WORKERS):
+        self.client = client or get_http_client()
+        self.max_workers = max_workers
+
+    def check(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Compare an installed asset's {'url', 'sha256', 'etag', 'last_modified'} against upstream.
+
+        Returns {'state': 'unchanged' | 'changed' | 'unknown' | 'error', 'metadata': fresh metadata or None}.
+        """
+        url = record['url']
+        headers = {}
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'):
+            headers['If-Modified-Since'] = record['last_modified']
+        if not headers and not record.get('sha256'):
+            return {'state': 'unknown', 'metadata': None, 'reason': 'no validators recorded'}
+
+        # Hugging Face answers on the unfollowed resolve redirect, the same request the resolver makes
+        is_huggingface = bool(HUGGINGFACE_RESOLVE_RE.match(url))
+        try:
+            response = self.client.head(url, headers=headers, allow_redirects=not is_huggingface)
+        except requests.RequestException as e:
+            return {'state': 'error', 'metadata': None, 'failure': classify_exception(e), 'reason': str(e)[:200]}
+
+        if response.status_code == 304:
+            return {'state': 'unchanged', 'metadata': None, 'reason': 'not modified'}
+        if response.status_code >= 400:
+            return {'state': 'error', 'metadata': None, 'failure': classify_http_status(response.status_code),
+                    'reason': f"HTTP {response.status_code}"}
+
+        response_headers = response.headers
+        linked_etag = response_headers.get('X-Linked-Etag', '').strip('"').lower()
+        size = response_headers.get('X-Linked-Size') or \
+            (response_headers.get('Content-Length') if response.status_code == 200 else None)
+        metadata = {
+            'sha256': linked_etag if len(linked_etag) == 64 else None,
+            'size': int(size) if size and size.isdigit() else None,
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'source': 'huggingface' if is_huggingface else 'http'
+        }
+
+        # Servers that ignore conditional headers still expose comparable validators
+        for key in ('sha256', 'etag', 'last_modified'):
+            if record.get(key) and metadata[key]:
+                changed = record[key] != metadata[key]
+                return {'state': 'changed' if changed else 'unchanged', 'metadata': metadata,
+                        'reason': f"{key} {'differs' if changed else 'matches'}"}
+        return {'state': 'unknown', 'metadata': metadata, 'reason': 'no comparable validators returned'}
+
+    def check_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Check several installed assets concurrently; results line up with `records`"""
+        if not records:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="TrinityUpdate") as pool:
+            return list(pool.map(self.check, records))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check installed assets for upstream updates")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to the download state database")
+    parser.add_argument("--webui", help="Only check assets installed for this WebUI")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    store = open_state_store(args.db)
+    if store is None:
+        print(f"No download state at {args.db}")
+        return
+    try:
+        rows = [row for row in store.query(status='success', webui=args.webui) if Path(row['destination']).exists()]
+    finally:
+        store.close()
+
+    results = AssetUpdateChecker().check_many(rows)
+    if args.json:
+        print(json.dumps([dict(row, update=result) for row, result in zip(rows, results)], indent=2))
+        return
+
+    icons = {'unchanged': "✅", 'changed': "🔄", 'unknown': "❔", 'error': "❌"}
+    for row, result in zip(rows, results):
+        print(f"{icons[result['state']]} {result['state']:<9} {row['name']}  ({result['reason']})")
+    changed = sum(1 for result in results if result['state'] == 'changed')
+    print(f"\n📊 {len(rows)} installed assets checked, {changed} changed upstream")
+    if changed:
+        print("💡 Enable 'Check installed assets for updates' in the hub to download the new versions")
+
+
+if __name__ == "__main__":
+    main()
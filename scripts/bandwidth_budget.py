@@ -0,0 +1,314 @@
+"""
+TrinityUI Bandwidth Budget
+Shares one connection and rate ceiling between every download consumer (pip wheels, assets)
+"""
+import fcntl
+import json
+import os
+import re
+import secrets
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+CACHE_DIR = Path('/tmp/trinity_cache')
+BUDGET_FILE = CACHE_DIR / 'bandwidth_budget.json'
+
+# Combined ceilings for all consumers across processes; a rate of 0 means unlimited
+MAX_CONNECTIONS = int(os.environ.get('TRINITY_MAX_CONNECTIONS', '32'))
+MAX_RATE = os.environ.get('TRINITY_MAX_RATE', '0')
+
+# Priority weights: the critical path (torch, the selected checkpoint) gets the largest share
+PRIORITY_CRITICAL = 4
+PRIORITY_NORMAL = 2
+PRIORITY_BACKGROUND = 1
+
+# aria2c refuses more than 16 connections per server
+ARIA2C_MAX_PER_SERVER = 16
+
+# Running aria2c consumers listen for option changes over JSON-RPC on a local port
+RPC_POLL_INTERVAL = 0.25  # seconds
+RPC_TIMEOUT = 1.0
+
+
+def parse_rate(value) -> int:
+    """Parse an aria2c-style rate ('0', '500K', '40M') into bytes per second"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KkMmGg]?)\s*', str(value or '0'))
+    if not match:
+        return 0
+    multiplier = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}[match.group(2).lower()]
+    return int(float(match.group(1)) * multiplier)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def aria2c_rpc(endpoint: Dict[str, Any], method: str, *params, timeout: float = RPC_TIMEOUT) -> Any:
+    """Call a method on an aria2c started with this budget's RPC options; raises OSError or ValueError"""
+    payload = json.dumps({'jsonrpc': '2.0', 'id': 'trinity', 'method': method,
+                          'params': [f"token:{endpoint['secret']}", *params]}).encode('utf-8')
+    request = urllib.request.Request(f"http://127.0.0.1:{endpoint['port']}/jsonrpc", data=payload,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        reply = json.loads(response.read())
+    if 'result' not in reply:
+        raise ValueError(f"aria2c {method} failed: {reply.get('error')}")
+    return reply['result']
+
+
+class BandwidthLease:
+    """A registered consumer; its grant is taken when its download starts and adjusted while it runs"""
+
+    def __init__(self, budget: 'BandwidthBudget', lease_id: str, name: str, weight: int):
+        self.budget = budget
+        self.id = lease_id
+        self.name = name
+        self.weight = weight
+        self._released = threading.Event()
+
+    def share(self) -> Dict[str, Any]:
+        return self.budget.share(self.id)
+
+    def grant(self, concurrent_downloads: int = 1, rpc: Optional[Dict[str, Any]] = None,
+              max_per_download: int = ARIA2C_MAX_PER_SERVER) -> Dict[str, Any]:
+        return self.budget.grant(self.id, concurrent_downloads, rpc, max_per_download)
+
+    def aria2c_args(self, concurrent_downloads: int = 1, rpc: bool = True,
+                    progress_callback: Optional[Callable[[str, int, int], None]] = None) -> List[str]:
+        """aria2c options that keep this consumer inside its grant from the budget.
+
+        With rpc, aria2c also listens on a local port so the budget can lower or raise its rate and
+        concurrency as other consumers come and go. An RPC-enabled aria2c does not exit on its own,
+        so the lease shuts it down once its queue is empty; progress_callback(path, done, total) is
+        called for each active download while it runs.
+        """
+        endpoint = {'port': _free_port(), 'secret': secrets.token_hex(8)} if rpc else None
+        grant = self.grant(concurrent_downloads, endpoint)
+        args = [
+            f'--max-concurrent-downloads={grant["jobs"]}',
+            f'--max-connection-per-server={grant["per_download"]}',
+            f'--split={grant["per_download"]}'
+        ]
+        if grant['rate']:
+            args.append(f'--max-overall-download-limit={grant["rate"]}')
+        if endpoint:
+            args += ['--enable-rpc', f'--rpc-listen-port={endpoint["port"]}', f'--rpc-secret={endpoint["secret"]}']
+            threading.Thread(target=self._watch_aria2c, args=(endpoint, progress_callback), daemon=True,
+                             name="TrinityAria2cRPC").start()
+        return args
+
+    def _watch_aria2c(self, endpoint: Dict[str, Any], progress_callback):
+        connected = False
+        while not self._released.wait(RPC_POLL_INTERVAL):
+            try:
+                stat = aria2c_rpc(endpoint, 'aria2.getGlobalStat')
+                active = aria2c_rpc(endpoint, 'aria2.tellActive', ['completedLength', 'totalLength', 'files']) \
+                    if progress_callback else []
+            except (OSError, ValueError):
+                if connected:
+                    return  # aria2c has exited
+                continue
+            connected = True
+            for download in active:
+                if download.get('files'):
+                    progress_callback(download['files'][0]['path'], int(download['completedLength']),
+                                      int(download['totalLength']))
+            if int(stat['numActive']) + int(stat['numWaiting']) == 0:
+                try:
+                    aria2c_rpc(endpoint, 'aria2.shutdown')
+                except (OSError, ValueError):
+                    pass
+                return
+
+    def release(self):
+        self._released.set()
+        self.budget.release(self.id)
+
+
+class BandwidthBudget:
+    """Connections are granted once, when a consumer starts, from the headroom the running consumers
+    left; running aria2c can only have its rate and concurrency changed, not the connections of
+    downloads already in flight. Rates follow the weights live on every register and release."""
+
+    def __init__(self, state_file: Path = BUDGET_FILE, max_connections: int = MAX_CONNECTIONS,
+                 max_rate=MAX_RATE):
+        self.state_file = state_file
+        self.lock_file = state_file.with_name(state_file.name + '.lock')
+        self.max_connections = max(1, max_connections)
+        self.max_rate = parse_rate(max_rate)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, Dict[str, Any]]]:
+        """Load the registry under an exclusive lock, drop dead processes, write it back on exit"""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        with self._thread_lock, open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.state_file, 'r', encoding='utf-8') as f:
+                        consumers = json.load(f)
+                except (OSError, ValueError):
+                    consumers = {}
+                consumers = {k: v for k, v in consumers.items() if _pid_alive(v.get('pid', 0))}
+                yield consumers
+                tmp_path = self.state_file.with_name(self.state_file.name + '.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(consumers, f, indent=1)
+                os.replace(tmp_path, self.state_file)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def register(self, name: str, weight: int = PRIORITY_NORMAL) -> BandwidthLease:
+        lease_id = uuid.uuid4().hex[:12]
+        with self._locked_state() as consumers:
+            consumers[lease_id] = {
+                'name': name,
+                'weight': max(1, int(weight)),
+                'pid': os.getpid(),
+                'registered_at': time.time()
+            }
+            self._rebalance(consumers)
+        return BandwidthLease(self, lease_id, name, weight)
+
+    def release(self, lease_id: str):
+        with self._locked_state() as consumers:
+            if consumers.pop(lease_id, None) is not None:
+                self._rebalance(consumers)
+
+    def grant(self, lease_id: str, concurrent_downloads: int = 1, rpc: Optional[Dict[str, Any]] = None,
+              max_per_download: int = ARIA2C_MAX_PER_SERVER) -> Dict[str, Any]:
+        """Allocate a starting consumer's connections and rate: {'connections', 'jobs', 'per_download', 'rate'}.
+
+        Connections come out of what running consumers have not been granted, so the grants never add up
+        to more than the ceiling. rpc ({'port', 'secret'}) lets later rebalances reach the consumer.
+        """
+        with self._locked_state() as consumers:
+            entry = consumers.get(lease_id)
+            if entry is None:
+                # Released or unknown: behave as the only consumer
+                entry = consumers[lease_id] = {'name': lease_id, 'weight': PRIORITY_NORMAL, 'pid': os.getpid(),
+                                               'registered_at': time.time()}
+                temporary = True
+            else:
+                temporary = False
+            granted = sum(c.get('connections', 0) for key, c in consumers.items() if key != lease_id)
+            target = self._target_connections(consumers, lease_id, reserve=True)
+            connections = max(1, min(target, self.max_connections - granted))
+            jobs = max(1, min(concurrent_downloads, connections))
+            per_download = max(1, min(max_per_download, connections // jobs))
+            entry.update({'connections': jobs * per_download, 'per_download': per_download,
+                          'jobs_wanted': max(1, concurrent_downloads), 'jobs': jobs, 'rpc': rpc})
+            entry['rate'] = self._rates(consumers)[lease_id]
+            self._rebalance(consumers)
+            if temporary:
+                consumers.pop(lease_id)
+            return {'connections': entry['connections'], 'jobs': jobs, 'per_download': per_download,
+                    'rate': entry['rate']}
+
+    def share(self, lease_id: str) -> Dict[str, Any]:
+        """Weighted share of the ceilings for one consumer: {'connections', 'rate', 'consumers'}"""
+        with self._locked_state() as consumers:
+            return self._compute_share(consumers, lease_id)
+
+    def _compute_share(self, consumers: Dict[str, Dict[str, Any]], lease_id: str) -> Dict[str, Any]:
+        entry = consumers.get(lease_id)
+        if entry is None:
+            # Released or unknown: behave as the only consumer
+            return {'connections': self.max_connections, 'rate': self.max_rate, 'consumers': len(consumers)}
+        return {
+            'connections': self._target_connections(consumers, lease_id),
+            'rate': self._rates(consumers)[lease_id],
+            'consumers': len(consumers)
+        }
+
+    def _target_connections(self, consumers: Dict[str, Dict[str, Any]], lease_id: str,
+                            reserve: bool = False) -> int:
+        """Weighted share of the connection ceiling. With reserve, a consumer below critical priority
+        leaves room for a critical one that is not running yet, since connections cannot be taken back."""
+        weight = consumers[lease_id]['weight']
+        total_weight = sum(c['weight'] for c in consumers.values())
+        if reserve and weight < PRIORITY_CRITICAL and \
+                all(c['weight'] < PRIORITY_CRITICAL for c in consumers.values()):
+            total_weight += PRIORITY_CRITICAL
+        return max(1, int(self.max_connections * weight / total_weight))
+
+    def _rates(self, consumers: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Rate of every consumer; those started without RPC keep the rate they were given"""
+        if not self.max_rate:
+            return {key: 0 for key in consumers}
+        fixed = {key: c['rate'] for key, c in consumers.items() if 'rate' in c and not c.get('rpc')}
+        adjustable = {key: c['weight'] for key, c in consumers.items() if key not in fixed}
+        remaining = max(0, self.max_rate - sum(fixed.values()))
+        total_weight = sum(adjustable.values())
+        # aria2c reads a limit of 0 as unlimited
+        return {**fixed, **{key: max(1, int(remaining * weight / total_weight)) for key, weight in adjustable.items()}}
+
+    def _rebalance(self, consumers: Dict[str, Dict[str, Any]]):
+        """Push new rates and concurrency to running aria2c consumers; concurrency only ever moves within
+        a consumer's grant, and lowering it takes effect as its in-flight downloads finish"""
+        rates = self._rates(consumers)
+        for key, entry in consumers.items():
+            if not entry.get('rpc'):
+                continue
+            per_download = entry['per_download']
+            jobs = max(1, min(entry['jobs_wanted'], entry['connections'] // per_download,
+                              self._target_connections(consumers, key) // per_download))
+            options = {}
+            if jobs != entry['jobs']:
+                options['max-concurrent-downloads'] = str(jobs)
+            if rates[key] != entry.get('rate', 0):
+                options['max-overall-download-limit'] = str(rates[key])
+            if not options:
+                continue
+            try:
+                aria2c_rpc(entry['rpc'], 'aria2.changeGlobalOption', options)
+            except (OSError, ValueError):
+                # Not listening yet or already gone; the next rebalance tries again
+                continue
+            entry['jobs'], entry['rate'] = jobs, rates[key]
+
+    def consumers(self) -> Dict[str, Dict[str, Any]]:
+        with self._locked_state() as consumers:
+            return dict(consumers)
+
+    @contextmanager
+    def lease(self, name: str, weight: int = PRIORITY_NORMAL) -> Iterator[BandwidthLease]:
+        """Register for the duration of a download; registering and releasing rebalance the running consumers"""
+        lease = self.register(name, weight)
+        try:
+            yield lease
+        finally:
+            lease.release()
+
+
+_budget: Optional[BandwidthBudget] = None
+_budget_lock = threading.Lock()
+
+
+def get_bandwidth_budget() -> BandwidthBudget:
+    """Return the process-wide budget (the registry itself is shared through BUDGET_FILE)"""
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = BandwidthBudget()
+    return _budget
@@ -0,0 +1,101 @@
+"""
+Benchmark: per-package `pip install --upgrade` loop vs one constrained resolve for additional_packages
+
+Builds a local find-links index of small synthetic wheels that mirror the A1111 spec (a pinned torch,
+transformers, safetensors, accelerate, diffusers), with a newer accelerate that wants a newer torch.
+Each mode gets a fresh venv with the pinned torch already installed, as after Step 3 of
+WebUIDependencyManager.install_webui_dependencies. Everything is offline, so the timings show resolver
+runs and interpreter startups only; against a real index each extra resolve also costs index traffic.
+
+Usage: python scripts/benchmarks/bench_additional_packages.py
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+PACKAGES = ['transformers==4.30.2', 'safetensors==0.4.2', 'accelerate', 'diffusers']
+TORCH_PIN = 'torch==2.1.2'
+# (name, version, requirements)
+INDEX = [
+    ('torch', '2.1.2', []),
+    ('torch', '2.2.0', []),
+    ('safetensors', '0.4.2', []),
+    ('safetensors', '0.4.3', []),
+    ('transformers', '4.30.2', ['safetensors>=0.3.1']),
+    ('accelerate', '0.25.0', ['torch>=1.10.0']),
+    ('accelerate', '0.30.0', ['torch>=2.2.0']),
+    ('diffusers', '0.25.0', ['safetensors>=0.3.1']),
+]
+
+
+def build_wheel(directory: Path, name: str, version: str, requires) -> Path:
+    path = directory / f"{name}-{version}-py3-none-any.whl"
+    dist_info = f"{name}-{version}.dist-info"
+    metadata = f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+    metadata += ''.join(f"Requires-Dist: {requirement}\n" for requirement in requires)
+    with zipfile.ZipFile(path, 'w') as wheel:
+        wheel.writestr(f"{name}/__init__.py", f"__version__ = '{version}'\n")
+        wheel.writestr(f"{dist_info}/METADATA", metadata)
+        wheel.writestr(f"{dist_info}/WHEEL", "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n")
+        wheel.writestr(f"{dist_info}/RECORD", "")
+    return path
+
+
+def pip(venv: Path, *args) -> subprocess.CompletedProcess:
+    return subprocess.run([str(venv / 'bin' / 'pip'), 'install', '--disable-pip-version-check', *args],
+                          capture_output=True, text=True)
+
+
+def installed_version(venv: Path, name: str) -> str:
+    result = subprocess.run([str(venv / 'bin' / 'python'), '-c',
+                             f"from importlib import metadata; print(metadata.version('{name}'))"],
+                            capture_output=True, text=True)
+    return result.stdout.strip() or 'missing'
+
+
+def fresh_venv(path: Path, index_args) -> Path:
+    subprocess.run([sys.executable, '-m', 'venv', str(path)], check=True)
+    pip(path, TORCH_PIN, *index_args)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched additional_packages installs")
+    parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        index = tmp / 'index'
+        index.mkdir()
+        for name, version, requires in INDEX:
+            build_wheel(index, name, version, requires)
+        index_args = ['--no-index', '--find-links', str(index)]
+
+        venv = fresh_venv(tmp / 'loop', index_args)
+        start = time.perf_counter()
+        for package in PACKAGES:
+            pip(venv, package, '--upgrade', *index_args)
+        loop_time = time.perf_counter() - start
+        loop_torch = installed_version(venv, 'torch')
+
+        venv = fresh_venv(tmp / 'batch', index_args)
+        constraints = tmp / 'constraints.txt'
+        constraints.write_text(f"{TORCH_PIN}\n")
+        start = time.perf_counter()
+        result = pip(venv, *PACKAGES, '--upgrade', '-c', str(constraints), *index_args)
+        batch_time = time.perf_counter() - start
+        if result.returncode != 0:
+            print(f"⚠️ batched install failed: {result.stderr.strip()[-300:]}")
+        batch_torch = installed_version(venv, 'torch')
+
+    print(f"{len(PACKAGES)} additional packages, pinned {TORCH_PIN}")
+    print(f"  per-package loop    {loop_time:6.2f}s  {len(PACKAGES)} resolves   torch afterwards {loop_torch}")
+    print(f"  one constrained run {batch_time:6.2f}s  1 resolve    torch afterwards {batch_torch}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: config-file batch downloads in UIs/*.py, blocking coroutines vs the bounded I/O engine
+
+Usage: python scripts/benchmarks/bench_config_downloads.py [--files 16] [--size-kb 256] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.benchmarks.http_fixture import HTTPFixture, create_fixture_file
+from scripts.http_client import get_http_client
+from scripts.io_engine import run_io, IO_CONCURRENCY
+
+
+async def blocking_download(url: str, file_path: Path):
+    """The previous pattern: an async def that blocks the event loop"""
+    get_http_client().download_to_path(url, file_path)
+
+
+async def offloaded_download(url: str, file_path: Path):
+    """The current pattern: the blocking transfer runs on the I/O pool"""
+    await run_io(get_http_client().download_to_path, url, file_path)
+
+
+async def run_batch(download, urls, out_dir: Path) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*[download(url, out_dir / f"{i}.bin") for i, url in enumerate(urls)])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent config downloads")
+    parser.add_argument("--files", type=int, default=16, help="Number of files in the batch")
+    parser.add_argument("--size-kb", type=int, default=256, help="Size of each file in KiB")
+    parser.add_argument("--latency", type=float, default=0.2, help="Per-request server latency in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        served = tmp / "served"
+        for i in range(args.files):
+            create_fixture_file(served / f"file{i}.bin", args.size_kb * 1024)
+
+        with HTTPFixture(served, latency=args.latency) as fixture:
+            urls = [fixture.url_for(f"file{i}.bin") for i in range(args.files)]
+
+            # Warm the connection pool so both runs start from the same state
+            asyncio.run(run_batch(offloaded_download, urls[:1], tmp))
+
+            results = {}
+            for label, download in [("before (blocking)", blocking_download), ("after (I/O engine)", offloaded_download)]:
+                out_dir = tmp / label.split()[0]
+                out_dir.mkdir()
+                results[label] = asyncio.run(run_batch(download, urls, out_dir))
+
+    print(f"{args.files} files x {args.size_kb} KiB, {args.latency:.2f}s latency, I/O pool size {IO_CONCURRENCY}")
+    for label, elapsed in results.items():
+        print(f"  {label:<20} {elapsed:7.3f}s")
+    before, after = results["before (blocking)"], results["after (I/O engine)"]
+    print(f"  speedup              {before / after:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: extension installs with shallow `git clone` vs codeload tarballs
+
+Builds N synthetic git repositories, serves their `git archive` tarballs and the two GitHub API
+lookups from a local HTTP fixture, and installs them both ways with the installers' concurrency.
+The git side clones over file://, so it pays no network latency; --latency only slows the tarball side.
+
+Usage: python scripts/benchmarks/bench_extension_fetch.py [--repos 8] [--files 300] [--latency 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts import extension_fetcher
+from scripts.benchmarks.http_fixture import HTTPFixture
+from scripts.extension_fetcher import fetch_repos, load_source
+from scripts.io_engine import git_clone_many
+
+OWNER = 'bench'
+
+
+def git(*args, cwd: Path) -> str:
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def create_repo(root: Path, served: Path, name: str, files: int) -> str:
+    """Create a committed repo plus a bare copy; publish its tarball and API responses; return the SHA"""
+    work = root / 'work' / name
+    for i in range(files):
+        path = work / f"module{i % 10}" / f"file{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(os.urandom(2048).hex())
+    git('init', '-q', '-b', 'main', cwd=work)
+    git('add', '.', cwd=work)
+    git('-c', 'user.name=bench', '-c', 'user.email=bench@localhost', 'commit', '-q', '-m', 'init', cwd=work)
+    commit = git('rev-parse', 'HEAD', cwd=work)
+    git('clone', '-q', '--bare', str(work), str(root / 'bare' / f"{name}.git"), cwd=root)
+
+    api = served / 'repos' / OWNER / name
+    (api / 'commits').mkdir(parents=True)
+    (api / 'index.html').write_text(json.dumps({'default_branch': 'main'}))
+    (api / 'commits' / 'main').write_text(commit)
+    tarball = served / OWNER / name / 'tar.gz' / commit
+    tarball.parent.mkdir(parents=True)
+    git('archive', '--format=tar.gz', f"--prefix={name}-{commit}/", '-o', str(tarball), 'HEAD', cwd=work)
+    return commit
+
+
+def count_files(directory: Path) -> int:
+    return sum(1 for path in directory.rglob('*') if path.is_file() and '.git' not in path.parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark git clone vs tarball extension installs")
+    parser.add_argument("--repos", type=int, default=8, help="Number of repositories")
+    parser.add_argument("--files", type=int, default=300, help="Files per repository")
+    parser.add_argument("--latency", type=float, default=0.0, help="Per-request latency of the HTTP fixture (s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        served = root / 'served'
+        names = [f"extension{i}" for i in range(args.repos)]
+        commits = {name: create_repo(root, served, name, args.files) for name in names}
+
+        with HTTPFixture(served, latency=args.latency) as fixture:
+            extension_fetcher.GITHUB_API_URL = fixture.base_url
+            extension_fetcher.CODELOAD_URL = fixture.base_url
+
+            git_dir = root / 'git'
+            git_dir.mkdir()
+            repos = [(f"file://{root / 'bare' / name}.git", name) for name in names]
+            start = time.perf_counter()
+            git_results = asyncio.run(git_clone_many(repos, git_dir))
+            git_time = time.perf_counter() - start
+
+            tar_dir = root / 'tarball'
+            tar_dir.mkdir()
+            repos = [(f"https://github.com/{OWNER}/{name}", name) for name in names]
+            start = time.perf_counter()
+            tar_results = asyncio.run(fetch_repos(repos, tar_dir, mode='tarball'))
+            tar_time = time.perf_counter() - start
+
+        for label, results in (("git", git_results), ("tarball", tar_results)):
+            failed = [r for r in results if isinstance(r, Exception) or r[0] != 0]
+            if failed:
+                print(f"⚠️ {label}: {len(failed)} failed: {failed[0]}")
+        mismatched = [name for name in names if (load_source(tar_dir / name) or {}).get('commit') != commits[name]]
+        if mismatched:
+            print(f"⚠️ recorded commit missing or wrong for {mismatched}")
+
+        print(f"{args.repos} repos x {args.files} files, fixture latency {args.latency * 1000:.0f} ms")
+        for label, elapsed, directory in (("git clone --depth 1", git_time, git_dir),
+                                          ("codeload tarball", tar_time, tar_dir)):
+            files = sum(count_files(directory / name) for name in names)
+            print(f"  {label:<20} {elapsed:6.2f}s  ({files:,} files installed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: per-file bookkeeping overhead of a large asset selection
+
+Plans N synthetic files and runs them through the tracker the way the installer does
+(pending -> downloading -> success), with a callback standing in for the hub, and compares the
+previous list-based tracker and per-file dicts against the current tracker and DownloadTask.
+Also times duplicate lookups in the local hash index.
+
+Usage: python scripts/benchmarks/bench_large_selection.py [--files 10000]
+"""
+import argparse
+import hashlib
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.asset_metadata import LocalHashIndex
+from scripts.download_tasks import DownloadTask
+from scripts.installation_manager import InstallationProgressTracker
+
+
+class ListTracker:
+    """The previous tracker: a linear scan per update and the whole list pushed every time"""
+
+    def __init__(self, gradio_callback):
+        self.gradio_callback = gradio_callback
+        self.asset_progress = []
+
+    def update_asset_progress(self, asset_name, status, error=None, progress=None):
+        for asset in self.asset_progress:
+            if asset['name'] == asset_name:
+                asset['status'] = status
+                break
+        else:
+            self.asset_progress.append({'name': asset_name, 'status': status})
+        self.gradio_callback("asset_progress", self.asset_progress)
+
+
+def render(update_type, data):
+    """Roughly what the hub does with a push: one row of HTML per item"""
+    items = data['items'] if isinstance(data, dict) else data
+    return ''.join(f'<div>{item["name"]} {item["status"]}</div>' for item in items)
+
+
+def run_tracker(tracker, names) -> float:
+    start = time.perf_counter()
+    for status in ('pending', 'downloading', 'success'):
+        for name in names:
+            tracker.update_asset_progress(name, status)
+    return time.perf_counter() - start
+
+
+def measure_tasks(make_task, count: int) -> int:
+    tracemalloc.start()
+    tasks = [make_task(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tasks
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-file overhead of large selections")
+    parser.add_argument("--files", type=int, default=10000, help="Number of planned files")
+    parser.add_argument("--baseline-files", type=int, default=2000,
+                        help="Files for the quadratic baseline (scaled up to --files for comparison)")
+    args = parser.parse_args()
+
+    names = [f"lora_{i:05d}.safetensors" for i in range(args.files)]
+    target = Path('/content/A1111/models/Lora')
+
+    dict_bytes = measure_tasks(lambda i: {
+        'url': f"https://huggingface.co/org/pack/resolve/main/{names[i]}", 'path': target, 'filename': names[i],
+        'type': 'LoRA', 'selection': 'pack', 'priority': 2, 'expected': {}}, args.files)
+    slot_bytes = measure_tasks(lambda i: DownloadTask(
+        f"https://huggingface.co/org/pack/resolve/main/{names[i]}", target, names[i], 'LoRA', 'pack'), args.files)
+
+    # The list tracker is O(n^2); time a smaller run and scale it rather than waiting minutes
+    baseline_names = names[:min(args.baseline_files, args.files)]
+    baseline = run_tracker(ListTracker(render), baseline_names) * (args.files / len(baseline_names)) ** 2
+    current = run_tracker(InstallationProgressTracker(gradio_callback=render), names)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LocalHashIndex(Path(tmp) / 'hashes.json')
+        hashes = []
+        for i in range(args.files):
+            path = Path(tmp) / f"{i}.bin"
+            path.write_bytes(b'x')
+            sha256 = hashlib.sha256(str(i).encode()).hexdigest()
+            index.record(path, sha256)
+            hashes.append(sha256)
+        start = time.perf_counter()
+        for sha256 in hashes:
+            index.find_by_hash(sha256)
+        lookup = time.perf_counter() - start
+
+    per_file = lambda seconds: seconds / args.files * 1000
+    print(f"{args.files:,} planned files")
+    print(f"  task records        dicts {dict_bytes / 2**20:6.1f} MiB   DownloadTask {slot_bytes / 2**20:6.1f} MiB")
+    print(f"  tracker (3 updates) list  {baseline:7.2f}s ({per_file(baseline):.3f} ms/file, scaled from "
+          f"{len(baseline_names):,})   current {current:.2f}s ({per_file(current):.3f} ms/file)")
+    print(f"  duplicate lookups   {lookup:.2f}s ({per_file(lookup):.3f} ms/file)")
+
+
+if __name__ == "__main__":
+    main()
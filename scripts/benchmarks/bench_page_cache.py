@@ -0,0 +1,156 @@
+"""
+Benchmark: checkpoint time-to-load after a large download, with and without page-cache dropping
+
+Simulates a WebUI that has its checkpoint cached while a large file is downloaded
+through TrinityHTTPClient, then measures how much of the checkpoint is still resident and how long
+reading it takes. While the download runs, the downloading file's resident size and the checkpoint's
+residency are sampled, showing whether ranges are dropped in flight or only when the file is finished.
+Pick --download-mb larger than free RAM to see eviction.
+
+Usage: python scripts/benchmarks/bench_page_cache.py [--model-mb 1024] [--download-mb 6144]
+"""
+import argparse
+import ctypes
+import ctypes.util
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts import page_cache
+from scripts.download_staging import staging_path
+from scripts.benchmarks.http_fixture import HTTPFixture, create_fixture_file
+from scripts.http_client import get_http_client
+
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+SAMPLE_INTERVAL = 0.1  # seconds
+
+
+def evict(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def read_file(path: Path) -> float:
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        while f.read(READ_CHUNK_SIZE):
+            pass
+    return time.perf_counter() - start
+
+
+def resident_fraction(path: Path) -> Optional[float]:
+    """Fraction of the file's pages in the page cache (mincore), or None if unavailable"""
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    libc.mmap.restype = ctypes.c_void_p
+    libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+    libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+    libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+
+    size = path.stat().st_size
+    pages = (size + mmap.PAGESIZE - 1) // mmap.PAGESIZE
+    with open(path, 'rb') as f:
+        address = libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, f.fileno(), 0)
+    if address in (None, ctypes.c_void_p(-1).value):
+        return None
+    try:
+        vec = (ctypes.c_ubyte * pages)()
+        if libc.mincore(address, size, vec) != 0:
+            return None
+        return sum(v & 1 for v in vec) / pages
+    finally:
+        libc.munmap(address, size)
+
+
+def sample_in_flight(model: Path, part_path: Path, done: threading.Event, samples: dict):
+    """Peak resident MiB of the downloading file and lowest checkpoint residency until done is set"""
+    while not done.wait(SAMPLE_INTERVAL):
+        try:
+            size = part_path.stat().st_size
+            part = resident_fraction(part_path) if size else None
+        except OSError:
+            continue
+        if part is not None:
+            samples['peak_mb'] = max(samples.get('peak_mb', 0), part * size / 1024 ** 2)
+        model_resident = resident_fraction(model)
+        if model_resident is not None:
+            samples['model_min'] = min(samples.get('model_min', 1.0), model_resident)
+
+
+def run(mode_enabled: bool, model: Path, url: str, download_path: Path) -> dict:
+    page_cache.DROP_ENABLED = mode_enabled
+    # The WebUI loaded its checkpoint earlier, so it starts fully cached
+    read_file(model)
+    before = resident_fraction(model)
+
+    done, samples = threading.Event(), {}
+    sampler = threading.Thread(target=sample_in_flight,
+                               args=(model, staging_path(download_path), done, samples), daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        get_http_client().download_to_path(url, download_path)
+    finally:
+        done.set()
+        sampler.join()
+    download_time = time.perf_counter() - start
+
+    after = resident_fraction(model)
+    load_time = read_file(model)
+    download_path.unlink()
+    return {'download': download_time, 'resident_before': before, 'resident_after': after, 'load': load_time,
+            'peak_mb': samples.get('peak_mb'), 'model_min': samples.get('model_min')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page-cache dropping during large downloads")
+    parser.add_argument("--model-mb", type=int, default=1024, help="Size of the cached checkpoint in MiB")
+    parser.add_argument("--download-mb", type=int, default=6144, help="Size of the concurrent download in MiB")
+    parser.add_argument("--dir", type=Path, default=None, help="Scratch directory (needs model + 2x download space)")
+    args = parser.parse_args()
+
+    if not page_cache.FADVISE_AVAILABLE:
+        print("posix_fadvise is not available on this platform")
+        return
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        tmp = Path(tmp)
+        served = tmp / "served"
+        model = tmp / "models" / "checkpoint.safetensors"
+        create_fixture_file(model, args.model_mb * 1024 * 1024)
+        create_fixture_file(served / "large.bin", args.download_mb * 1024 * 1024)
+        evict(served / "large.bin")
+
+        results = {}
+        with HTTPFixture(served, drop_cache=True) as fixture:
+            url = fixture.url_for("large.bin")
+            for label, enabled in [("before (kernel default)", False), ("after (fadvise DONTNEED)", True)]:
+                results[label] = run(enabled, model, url, tmp / "downloads" / "large.bin")
+
+    print(f"{args.download_mb} MiB download while a {args.model_mb} MiB checkpoint is cached")
+    print(f"  {'mode':<26} {'download':>9} {'in-flight peak':>15} {'lowest during':>14} {'resident':>15} "
+          f"{'time-to-load':>13}")
+    for label, r in results.items():
+        resident = "n/a" if r['resident_after'] is None else \
+            f"{r['resident_before']:.0%} -> {r['resident_after']:.0%}"
+        peak = "n/a" if r['peak_mb'] is None else f"{r['peak_mb']:.0f} MiB"
+        lowest = "n/a" if r['model_min'] is None else f"{r['model_min']:.0%}"
+        print(f"  {label:<26} {r['download']:8.2f}s {peak:>15} {lowest:>14} {resident:>15} {r['load']:12.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: in-process threaded downloads vs the process-pool downloader against a local HTTP fixture
+
+The fixture runs in its own process so the server does not compete for the client's GIL.
+Both modes hash every byte with SHA-256, as the installer does.
+
+Usage: python scripts/benchmarks/bench_process_downloads.py [--files 4] [--size-mb 512] [--workers 1,2,4]
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scripts.benchmarks.http_fixture import HTTPFixture, create_fixture_file
+from scripts.http_client import get_http_client
+from scripts.process_downloader import ProcessPoolDownloader
+
+
+def serve(root: Path, queue):
+    with HTTPFixture(root, drop_cache=True) as fixture:
+        queue.put(fixture.base_url)
+        while True:
+            time.sleep(3600)
+
+
+def threaded_download(url: str, file_path: Path) -> str:
+    """The in-process path: stream to disk, then hash, all under the parent's GIL"""
+    get_http_client().download_to_path(url, file_path)
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(4 * 1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process-pool downloads")
+    parser.add_argument("--files", type=int, default=4, help="Number of files")
+    parser.add_argument("--size-mb", type=int, default=512, help="Size of each file in MiB")
+    parser.add_argument("--workers", default=None, help="Comma-separated pool sizes (default: 1,2,4..ncpu)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    pool_sizes = [int(w) for w in args.workers.split(',')] if args.workers else \
+        sorted({1, *[n for n in (2, 4, 8, 16) if n <= cpus], cpus})
+    total_mb = args.files * args.size_mb
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        served = tmp / "served"
+        for i in range(args.files):
+            create_fixture_file(served / f"file{i}.bin", args.size_mb * 1024 * 1024)
+
+        queue = multiprocessing.Queue()
+        server = multiprocessing.Process(target=serve, args=(served, queue), daemon=True)
+        server.start()
+        base_url = queue.get(timeout=30)
+        urls = [f"{base_url}/file{i}.bin" for i in range(args.files)]
+
+        results = []
+        try:
+            out = tmp / "threads"
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.files) as pool:
+                list(pool.map(threaded_download, urls, [out / f"{i}.bin" for i in range(args.files)]))
+            results.append(("in-process threads", time.perf_counter() - start))
+
+            for workers in pool_sizes:
+                out = tmp / f"pool{workers}"
+                files = [{'url': url, 'file_path': out / f"{i}.bin", 'expected': {}} for i, url in enumerate(urls)]
+                start = time.perf_counter()
+                outcome = ProcessPoolDownloader(workers=workers).download(files)
+                elapsed = time.perf_counter() - start
+                if not all(r['ok'] for r in outcome):
+                    print(f"⚠️ pool of {workers} reported failures: {[r['message'] for r in outcome if not r['ok']]}")
+                results.append((f"process pool x{workers}", elapsed))
+        finally:
+            server.terminate()
+
+    print(f"{args.files} files x {args.size_mb} MiB ({total_mb} MiB), {cpus} CPU(s)")
+    for label, elapsed in results:
+        print(f"  {label:<22} {elapsed:7.2f}s  {total_mb / elapsed:8.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+TrinityUI Benchmark HTTP Fixture
+Local threaded HTTP server serving files from a directory with optional latency, Range and If-None-Match support
+"""
+import os
+import re
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    # Keep served files out of the page cache, as they would be on a remote server
+    drop_cache = False
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_file(self, include_body: bool):
+        if self.latency:
+            time.sleep(self.latency)
+
+        path = Path(self.translate_path(self.path))
+        # Like SimpleHTTPRequestHandler, a directory is served by its index.html (lets API-style paths nest)
+        if path.is_dir():
+            path = path / 'index.html'
+        if not path.is_file():
+            self.send_error(404, "File not found")
+            return
+
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get('Range')
+        match = re.match(r'bytes=(\d*)-(\d*)', range_header or '')
+        if match and size:
+            if match.group(1):
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else size - 1
+            else:
+                start = max(0, size - int(match.group(2)))
+            end = min(end, size - 1)
+            status = 206
+
+        stat = path.stat()
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(stat.st_mtime))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+
+        if not include_body:
+            return
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+                if self.drop_cache:
+                    os.posix_fadvise(f.fileno(), 0, f.tell(), os.POSIX_FADV_DONTNEED)
+
+    def do_GET(self):
+        self._send_file(include_body=True)
+
+    def do_HEAD(self):
+        self._send_file(include_body=False)
+
+
+class HTTPFixture:
+    """Serve `root` on localhost in a background thread; use as a context manager"""
+
+    def __init__(self, root: Path, latency: float = 0.0, port: int = 0, drop_cache: bool = False):
+        self.root = Path(root)
+        handler = type('LatencyHandler', (FixtureRequestHandler,), {'latency': latency, 'drop_cache': drop_cache})
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), partial(handler, directory=str(self.root)))
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    def __enter__(self) -> 'HTTPFixture':
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="TrinityHTTPFixture")
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def create_fixture_file(path: Path, size: int, chunk_size: int = COPY_CHUNK_SIZE) -> Path:
+    """Write `size` bytes of pseudo-random data to path (reused if it already has that size)"""
+    path = Path(path)
+    if path.exists() and path.stat().st_size == size:
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            f.write(os.urandom(n))
+            remaining -= n
+    return path
@@ -0,0 +1,102 @@
+"""
+TrinityUI Download Staging
+Downloads land under a `.part` name next to their destination and are renamed into place only once verified
+"""
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from scripts.page_cache import CacheDropper, open_sequential
+
+PART_SUFFIX = '.part'
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# A safetensors header is JSON metadata; anything larger than this is a corrupt length prefix
+SAFETENSORS_MAX_HEADER = 100 * 1024 * 1024
+ZIP_MAGIC = b'PK\x03\x04'
+# Legacy (non-zip) torch checkpoints are raw pickles starting with the PROTO opcode
+PICKLE_MAGIC = b'\x80'
+
+
+def staging_path(file_path: Path) -> Path:
+    """The in-progress name for file_path; same directory so the final rename is atomic"""
+    file_path = Path(file_path)
+    return file_path.with_name(file_path.name + PART_SUFFIX)
+
+
+def sha256_file(file_path: Path) -> str:
+    """Hash a file in chunks without leaving it in the page cache"""
+    digest = hashlib.sha256()
+    position = 0
+    with open_sequential(file_path) as f:
+        dropper = CacheDropper(f, file_path)
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            position += len(chunk)
+            dropper.advance(position)
+        dropper.finish()
+    return digest.hexdigest()
+
+
+def check_header(file_path: Path, final_name: Optional[str] = None) -> Optional[str]:
+    """Validate the container header for known model/archive formats; return an error or None"""
+    name = (final_name or Path(file_path).name).lower()
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(8)
+        if name.endswith('.safetensors'):
+            if len(head) < 8:
+                return "truncated safetensors header"
+            (header_len,) = struct.unpack('<Q', head)
+            if header_len == 0 or header_len > SAFETENSORS_MAX_HEADER or 8 + header_len > size:
+                return f"invalid safetensors header length {header_len}"
+            try:
+                json.loads(f.read(header_len))
+            except ValueError:
+                return "safetensors header is not valid JSON"
+        elif name.endswith('.zip'):
+            if not head.startswith(ZIP_MAGIC):
+                return "not a zip archive"
+        elif name.endswith(('.ckpt', '.pt', '.pth')):
+            if not (head.startswith(ZIP_MAGIC) or head.startswith(PICKLE_MAGIC)):
+                return "not a torch checkpoint"
+    return None
+
+
+def verify_download(part_path: Path, final_name: str, expected: Optional[Dict[str, Any]] = None,
+                    hash_verified: bool = False) -> Optional[str]:
+    """Check size, header and (unless the downloader already did) SHA-256; return an error or None"""
+    expected = expected or {}
+    if not part_path.exists():
+        return "staged file is missing"
+    size = part_path.stat().st_size
+    if size == 0:
+        return "staged file is empty"
+    expected_size = expected.get('size')
+    if expected_size is not None and size != expected_size:
+        return f"size mismatch ({size} != {expected_size} bytes)"
+    error = check_header(part_path, final_name)
+    if error:
+        return error
+    expected_sha256 = expected.get('sha256')
+    if expected_sha256 and not hash_verified:
+        if sha256_file(part_path) != expected_sha256:
+            return "SHA-256 mismatch"
+    return None
+
+
+def commit_staged(part_path: Path, file_path: Path):
+    """Atomically publish a verified download under its final name"""
+    os.replace(part_path, file_path)
+
+
+def discard_staged(part_path: Path):
+    """Remove a staged file that failed verification, along with any aria2c control file"""
+    for path in (Path(part_path), Path(str(part_path) + '.aria2')):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,260 @@
+"""
+TrinityUI Download State Store
+Durable per-asset download state in SQLite, shared by the installers, the hub, the launcher and a CLI
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DB_FILENAME = 'trinity_downloads.db'
+DEFAULT_DB_PATH = Path(os.environ.get('TRINITY_STATE_DB', f'/content/TrinityUI/{DB_FILENAME}'))
+
+# Queued writes are committed in one transaction once either limit is reached; a timer commits a
+# partial batch after FLUSH_INTERVAL, so readers never see a write later than that
+FLUSH_INTERVAL = 1.0  # seconds
+FLUSH_BATCH_SIZE = 32
+
+STATUSES = ('pending', 'downloading', 'success', 'error', 'skipped')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    destination TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    name TEXT NOT NULL,
+    asset_type TEXT,
+    webui TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    bytes_done INTEGER NOT NULL DEFAULT 0,
+    bytes_total INTEGER,
+    sha256 TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads (status);
+CREATE INDEX IF NOT EXISTS idx_downloads_url ON downloads (url);
+"""
+
+# Columns added after the first release, created on open for older databases
+MIGRATION_COLUMNS = {'etag': 'TEXT', 'last_modified': 'TEXT'}
+
+
+class DownloadStateStore:
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH, flush_interval: float = FLUSH_INTERVAL,
+                 batch_size: int = FLUSH_BATCH_SIZE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, tuple]] = []
+        self._last_flush = time.time()
+        self._timer: Optional[threading.Timer] = None
+
+        # WAL lets the hub, launcher and CLI read while an installer is writing
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        existing = {row['name'] for row in self._conn.execute("PRAGMA table_info(downloads)")}
+        for column, column_type in MIGRATION_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE downloads ADD COLUMN {column} {column_type}")
+        self._conn.commit()
+
+    # -- writes (queued, committed in batches) -------------------------------------------------
+
+    def _queue(self, sql: str, params: tuple):
+        with self._lock:
+            self._pending.append((sql, params))
+            due = len(self._pending) >= self.batch_size or time.time() - self._last_flush >= self.flush_interval
+            if not due and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Commit every queued write in a single transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.time()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not pending:
+                return
+            with self._conn:
+                for sql, params in pending:
+                    self._conn.execute(sql, params)
+
+    def plan(self, url: str, destination: Path, name: str, asset_type: Optional[str] = None,
+             webui: Optional[str] = None, bytes_total: Optional[int] = None, sha256: Optional[str] = None):
+        """Record a planned download; earlier attempts and timings for the same destination are kept"""
+        now = time.time()
+        self._queue(
+            """INSERT INTO downloads (destination, url, name, asset_type, webui, status, bytes_total, sha256,
+                                      created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?)
+               ON CONFLICT(destination) DO UPDATE SET
+                   url = excluded.url, name = excluded.name, asset_type = excluded.asset_type,
+                   webui = excluded.webui, status = 'pending', error = NULL,
+                   bytes_total = COALESCE(excluded.bytes_total, bytes_total),
+                   sha256 = COALESCE(excluded.sha256, sha256), updated_at = excluded.updated_at""",
+            (str(destination), url, name, asset_type, webui, bytes_total, sha256, now, now)
+        )
+
+    def mark_started(self, destination: Path):
+        now = time.time()
+        self._queue(
+            "UPDATE downloads SET status = 'downloading', attempts = attempts + 1, started_at = ?, "
+            "finished_at = NULL, error = NULL, updated_at = ? WHERE destination = ?",
+            (now, now, str(destination))
+        )
+
+    def mark_progress(self, destination: Path, bytes_done: int):
+        """Record how far a running download has got; rows that already finished are left alone"""
+        self._queue(
+            "UPDATE downloads SET bytes_done = ?, updated_at = ? WHERE destination = ? AND status = 'downloading'",
+            (bytes_done, time.time(), str(destination))
+        )
+
+    def mark_finished(self, destination: Path, bytes_done: int, sha256: Optional[str] = None,
+                      etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Record a complete file; etag/last_modified are the upstream validators of the version on disk"""
+        now = time.time()
+        self._queue(
+            "UPDATE downloads SET status = 'success', bytes_done = ?, bytes_total = COALESCE(bytes_total, ?), "
+            "sha256 = COALESCE(?, sha256), etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+            "error = NULL, finished_at = ?, updated_at = ? WHERE destination = ?",
+            (bytes_done, bytes_done, sha256, etag, last_modified, now, now, str(destination))
+        )
+
+    def mark_failed(self, destination: Path, error: str, bytes_done: int = 0, status: str = 'error'):
+        now = time.time()
+        self._queue(
+            "UPDATE downloads SET status = ?, bytes_done = ?, error = ?, finished_at = ?, updated_at = ? "
+            "WHERE destination = ?",
+            (status, bytes_done, error[:500], now, now, str(destination))
+        )
+
+    # -- reads --------------------------------------------------------------------------------
+
+    def get(self, destination: Path) -> Optional[Dict[str, Any]]:
+        self.flush()
+        row = self._conn.execute("SELECT * FROM downloads WHERE destination = ?", (str(destination),)).fetchone()
+        return dict(row) if row else None
+
+    def query(self, status: Optional[str] = None, webui: Optional[str] = None, url: Optional[str] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Rows matching the given filters, most recently updated first"""
+        self.flush()
+        clauses, params = [], []
+        for column, value in (('status', status), ('webui', webui), ('url', url)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT * FROM downloads"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY updated_at DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def summary(self, webui: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """{status: {'count', 'bytes_done', 'bytes_total'}}"""
+        self.flush()
+        sql = ("SELECT status, COUNT(*) AS count, COALESCE(SUM(bytes_done), 0) AS bytes_done, "
+               "COALESCE(SUM(bytes_total), 0) AS bytes_total FROM downloads")
+        params: tuple = ()
+        if webui:
+            sql += " WHERE webui = ?"
+            params = (webui,)
+        sql += " GROUP BY status"
+        return {row['status']: {'count': row['count'], 'bytes_done': row['bytes_done'],
+                                'bytes_total': row['bytes_total']}
+                for row in self._conn.execute(sql, params)}
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+def open_state_store(db_path: Path = DEFAULT_DB_PATH) -> Optional[DownloadStateStore]:
+    """Open the store for read-side callers (hub, launcher); None if the database is unavailable"""
+    if not Path(db_path).exists():
+        return None
+    try:
+        return DownloadStateStore(db_path)
+    except sqlite3.Error as e:
+        print(f"⚠️ Download state unavailable: {e}")
+        return None
+
+
+def _format_bytes(n: Optional[int]) -> str:
+    if not n:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == 'B' else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}TB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect TrinityUI download state")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="Path to the state database")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    subparsers = parser.add_subparsers(dest="command")
+
+    list_parser = subparsers.add_parser("list", help="List tracked assets")
+    list_parser.add_argument("--status", choices=STATUSES)
+    list_parser.add_argument("--webui")
+    list_parser.add_argument("--limit", type=int)
+
+    summary_parser = subparsers.add_parser("summary", help="Counts and bytes per status")
+    summary_parser.add_argument("--webui")
+
+    args = parser.parse_args()
+    store = open_state_store(args.db)
+    if store is None:
+        print(f"No download state at {args.db}")
+        return
+
+    if args.command == "summary":
+        summary = store.summary(args.webui)
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            for status, row in sorted(summary.items()):
+                print(f"{status:<12} {row['count']:>5}  {_format_bytes(row['bytes_done']):>10} / "
+                      f"{_format_bytes(row['bytes_total'])}")
+    else:
+        rows = store.query(status=getattr(args, 'status', None), webui=getattr(args, 'webui', None),
+                           limit=getattr(args, 'limit', None))
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            for row in rows:
+                print(f"{row['status']:<12} {row['attempts']:>2}x {_format_bytes(row['bytes_done']):>10}  "
+                      f"{row['name']}  ->  {row['destination']}")
+                if row['error']:
+                    print(f"{'':16}{row['error']}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+TrinityUI Download Tasks
+Compact per-file records for the asset planners, which handle selections of tens of thousands of files
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from scripts.bandwidth_budget import PRIORITY_CRITICAL, PRIORITY_NORMAL
+
+
+class DownloadTask:
+    """One planned file; __slots__ keeps a 10k-file plan to a fraction of the memory of per-file dicts"""
+    __slots__ = ('url', 'path', 'filename', 'type', 'selection', 'priority', 'expected',
+                 'recent_failure', 'update_available', 'pack')
+
+    def __init__(self, url: str, path: Path, filename: str, asset_type: str, selection: str,
+                 priority: Optional[int] = None, pack: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.path = path
+        self.filename = filename
+        self.type = asset_type
+        self.selection = selection
+        # The selected checkpoint is on the critical path to a usable WebUI
+        if priority is None:
+            priority = PRIORITY_CRITICAL if asset_type == 'Model' else PRIORITY_NORMAL
+        self.priority = priority
+        self.expected: Dict[str, Any] = {}
+        self.recent_failure: Optional[Dict[str, Any]] = None
+        self.update_available = False
+        # Catalog entry of a 'pack' (archive extracted into path); None for plain files
+        self.pack = pack
+
+    @property
+    def file_path(self) -> Path:
+        return self.path / self.filename
+
+    def transfer(self) -> Dict[str, Any]:
+        """The {'url', 'file_path', 'expected'} record the batch and process-pool downloaders take"""
+        return {'url': self.url, 'file_path': self.file_path, 'expected': self.expected}
+
+    def __repr__(self) -> str:
+        return f"DownloadTask({self.type} {self.filename!r} <- {self.url!r})"
@@ -27,6 +27,11 @@ scripts_path = PROJECT_ROOT / 'scripts'
 sys.path.insert(0, str(PROJECT_ROOT))
 sys.path.insert(0, str(scripts_path))
 
+from scripts.http_client import get_http_client
+from scripts.download_state import open_state_store, DB_FILENAME
+from scripts.link_prober import load_catalog, CATALOG_LISTS
+from scripts.prefetcher import get_prefetcher, PREFETCH_ENABLED
+
 # Import installation manager components
 try:
     from scripts.installation_manager import InstallationProgressTracker, run_installation
@@ -50,11 +55,9 @@ def load_html_from_repo(html_file):
     """Load HTML content from repository"""
     base_url = "https://raw.githubusercontent.com/remphanstar/TrinityUI/main/HTML"
     try:
-        response = requests.get(f"{base_url}/{html_file}", timeout=10)
-        if response.status_code == 200:
-            return response.text
-        else:
-            return f"<div>Failed to load {html_file}</div>"
+        return get_http_client().get_text(f"{base_url}/{html_file}")
+    except requests.HTTPError:
+        return f"<div>Failed to load {html_file}</div>"
     except Exception as e:
         return f"<div>Error loading {html_file}: {e}</div>"
 
@@ -119,7 +122,51 @@ progress_state = {
     "accordion_open": False
 }
 
-def update_model_lists_for_version(is_xl):
+def selected_catalog_items(is_xl, models=(), vaes=(), controlnets=(), loras=()):
+    """Catalog items ({'url', 'name'}) behind the selected names of each list"""
+    data_file = xl_model_data_file if is_xl else model_data_file
+    try:
+        catalog = load_catalog(data_file)
+    except Exception as e:
+        log_to_unified(f"Error reading catalog {data_file}: {e}", "ERROR")
+        return []
+    items = []
+    for list_name, selected in zip(CATALOG_LISTS, (models, vaes, controlnets, loras)):
+        for name in selected or []:
+            items.extend(catalog[list_name].get(name, []))
+    return items
+
+def start_prefetch(is_xl, models, vaes):
+    """Speculatively download the selected checkpoint/VAE at background priority (opt-in)"""
+    items = [item for item in selected_catalog_items(is_xl, models, vaes) if item.get('type') != 'pack']
+    prefetcher = get_prefetcher()
+    prefetcher.retain(item['url'] for item in items)
+    
+    def run():
+        started = prefetcher.start(items)
+        if started:
+            log_to_unified(f"Prefetching {started} default selection(s) in the background", "INFO")
+    
+    threading.Thread(target=run, daemon=True, name="TrinityPrefetchStart").start()
+
+def update_prefetch_selection(is_xl, prefetch, models, vaes, controlnets, loras):
+    """Cancel prefetches the user deselected; their partial data stays cached for later"""
+    prefetcher = get_prefetcher()
+    if not prefetch:
+        cancelled = prefetcher.cancel_all()
+    else:
+        selected = selected_catalog_items(is_xl, models, vaes, controlnets, loras)
+        cancelled = prefetcher.retain(item['url'] for item in selected)
+    if cancelled:
+        log_to_unified(f"Cancelled prefetch of {', '.join(cancelled)}", "INFO")
+
+def toggle_prefetch(is_xl, prefetch, models, vaes, controlnets, loras):
+    if prefetch:
+        start_prefetch(is_xl, models, vaes)
+    else:
+        update_prefetch_selection(is_xl, prefetch, models, vaes, controlnets, loras)
+
+def update_model_lists_for_version(is_xl, prefetch=False):
     data_file = xl_model_data_file if is_xl else model_data_file
     try:
         model_options = read_model_data(data_file, 'model')
@@ -134,6 +181,10 @@ def update_model_lists_for_version(is_xl):
             default_model = next((opt for opt in model_options if "1.5" in opt.lower() or "v1-5" in opt.lower()), model_options[1] if len(model_options) > 1 else "none")
             default_vae = next((opt for opt in vae_options if "840000" in opt.lower()), vae_options[1] if len(vae_options) > 1 else "none")
         
+        if prefetch:
+            start_prefetch(is_xl, [default_model] if default_model != "none" else [],
+                           [default_vae] if default_vae != "none" else [])
+        
         return (
             gr.update(choices=model_options, value=[default_model] if default_model != "none" else []),
             gr.update(choices=vae_options, value=[default_vae] if default_vae != "none" else []),
@@ -144,6 +195,79 @@ def update_model_lists_for_version(is_xl):
         log_to_unified(f"Error updating lists: {e}", "ERROR")
         return (gr.update(), gr.update(), gr.update(), gr.update())
 
+ASSET_STATUS_ICONS = {
+    "success": "✅", 
+    "error": "❌", 
+    "downloading": "⬇️", 
+    "pending": "⏳",
+    "skipped": "⏭️"
+}
+
+def render_asset_summary(summary):
+    """Status counts and paging line for a tracker summary/page"""
+    counts = summary.get('counts', {})
+    parts = [f'{ASSET_STATUS_ICONS[status]} {counts[status]:,}' for status in ASSET_STATUS_ICONS if counts.get(status)]
+    paging = ""
+    if summary.get('pages', 1) > 1 or summary.get('status'):
+        shown = f"{summary['status']}: " if summary.get('status') else ""
+        paging = f'<span style="color: #888;">{shown}page {summary["page"]}/{summary["pages"]} ({summary["matching"]:,} items)</span>'
+    elif summary.get('matching', 0) > len(summary.get('items', [])):
+        paging = f'<span style="color: #888;">showing {len(summary["items"])} of {summary["matching"]:,}</span>'
+    return f'''
+        <div style="display: flex; justify-content: space-between; padding: 10px; border-bottom: 1px solid #555; color: #e8e8e8;">
+            <span>{" &nbsp; ".join(parts)} &nbsp; of {summary.get('total', 0):,} assets</span>
+            {paging}
+        </div>
+    '''
+
+def render_asset_progress(assets, summary=None):
+    """Render a list of {'name', 'status', 'error'} dicts as the asset progress panel"""
+    asset_html = ""
+    for asset in assets:
+        status_icon = ASSET_STATUS_ICONS.get(asset.get('status', 'pending'), "⏳")
+        
+        progress_info = ""
+        if asset.get('status') == 'downloading' and asset.get('progress') is not None:
+            progress_info = f'<span style="color: #888; font-family: \'Courier New\', monospace;">{asset["progress"]:.0%}</span>'
+        
+        error_info = ""
+        if asset.get('error'):
+            error_info = f'<div style="color: #ff6b6b; font-size: 12px; margin-left: 35px; margin-top: 5px;">{asset["error"]}</div>'
+        
+        asset_html += f'''
+            <div style="padding: 10px; border-bottom: 1px solid #444; color: #e8e8e8;">
+                <div style="display: flex; align-items: center;">
+                    <span style="margin-right: 15px; font-size: 18px;">{status_icon}</span>
+                    <span style="font-family: 'Courier New', monospace; flex: 1;">{asset["name"]}</span>
+                    {progress_info}
+                </div>
+                {error_info}
+            </div>
+        '''
+    
+    if not asset_html:
+        asset_html = '<div style="color: #888; text-align: center; padding: 20px;">No assets being downloaded</div>'
+    
+    header_html = render_asset_summary(summary) if summary else ""
+    return f'''
+    <div style="max-height: 400px; overflow-y: auto; background: #1a1a1a; 
+               border-radius: 8px; border: 1px solid #333;">
+        {header_html}
+        {asset_html}
+    </div>
+    '''
+
+def load_previous_asset_progress():
+    """Asset panel for the last recorded downloads, so a restarted hub still shows them"""
+    store = open_state_store(PROJECT_ROOT / DB_FILENAME)
+    if store is None:
+        return None
+    try:
+        rows = store.query(limit=50)
+    finally:
+        store.close()
+    return render_asset_progress(rows) if rows else None
+
 def gradio_progress_callback(update_type, data):
     """Callback for real-time Gradio progress updates"""
     global progress_state
@@ -166,42 +290,10 @@ def gradio_progress_callback(update_type, data):
             print(f"📊 [GRADIO] Updated dependency progress display")
         
         elif update_type == "asset_progress":
-            if isinstance(data, list):
-                asset_html = ""
-                for asset in data:
-                    status_icon = {
-                        "success": "✅", 
-                        "error": "❌", 
-                        "downloading": "⬇️", 
-                        "pending": "⏳"
-                    }.get(asset.get('status', 'pending'), "⏳")
-                    
-                    error_info = ""
-                    if asset.get('error'):
-                        error_info = f'<div style="color: #ff6b6b; font-size: 12px; margin-left: 35px; margin-top: 5px;">{asset["error"]}</div>'
-                    
-                    asset_html += f'''
-                        <div style="padding: 10px; border-bottom: 1px solid #444; color: #e8e8e8;">
-                            <div style="display: flex; align-items: center;">
-                                <span style="margin-right: 15px; font-size: 18px;">{status_icon}</span>
-                                <span style="font-family: 'Courier New', monospace; flex: 1;">{asset["name"]}</span>
-                            </div>
-                            {error_info}
-                        </div>
-                    '''
-                
-                if not asset_html:
-                    asset_html = '<div style="color: #888; text-align: center; padding: 20px;">No assets being downloaded</div>'
-                
-                html_content = f'''
-                <div style="max-height: 400px; overflow-y: auto; background: #1a1a1a; 
-                           border-radius: 8px; border: 1px solid #333;">
-                    {asset_html}
-                </div>
-                '''
-                # Store the updated content
-                progress_state["asset_content"] = html_content
-                print(f"📊 [GRADIO] Updated asset progress display with {len(data)} items")
+            if isinstance(data, dict):
+                # Counts plus the first page; other pages are read from the tracker on demand
+                progress_state["asset_content"] = render_asset_progress(data['items'], data)
+                print(f"📊 [GRADIO] Updated asset progress display ({data['total']} assets)")
         
         elif update_type == "completion":
             progress_state["accordion_visible"] = True
@@ -213,7 +305,7 @@ def gradio_progress_callback(update_type, data):
         import traceback
         traceback.print_exc()
 
-def get_progress_updates():
+def get_progress_updates(asset_page=1, asset_status="all"):
     """Function to return current progress state for Gradio updates"""
     global progress_state
     
@@ -221,8 +313,17 @@ def get_progress_updates():
     dependency_content = progress_state.get("dependency_content", 
         '<div style="padding: 20px; text-align: center; color: #888; background: #1a1a1a; border-radius: 8px; border: 1px solid #333;">Waiting for installation to start...</div>')
     
-    asset_content = progress_state.get("asset_content",
-        '<div style="padding: 20px; text-align: center; color: #888; background: #1a1a1a; border-radius: 8px; border: 1px solid #333;">Waiting for downloads to start...</div>')
+    asset_content = progress_state.get("asset_content")
+    if asset_content is None:
+        asset_content = load_previous_asset_progress() or \
+            '<div style="padding: 20px; text-align: center; color: #888; background: #1a1a1a; border-radius: 8px; border: 1px solid #333;">Waiting for downloads to start...</div>'
+        progress_state["asset_content"] = asset_content
+    
+    # Browsing past the first page or filtering reads the live tracker instead of the pushed summary
+    asset_page = int(asset_page or 1)
+    if installation_tracker is not None and (asset_page > 1 or asset_status != "all"):
+        page = installation_tracker.asset_progress_page(asset_page, status=None if asset_status == "all" else asset_status)
+        asset_content = render_asset_progress(page['items'], page)
     
     accordion_visible = progress_state.get("accordion_visible", False)
     accordion_open = progress_state.get("accordion_open", False)
@@ -291,7 +392,7 @@ def run_installation_thread(config_data):
         installation_in_progress = False
         print("📝 [THREAD] Installation thread finished")
 
-def save_config_and_install(webui_choice, sd_version, models, vaes, controlnets, loras, arguments, theme_accent, civitai_token, ngrok_token, tunnel_choice):
+def save_config_and_install(webui_choice, sd_version, models, vaes, controlnets, loras, arguments, theme_accent, civitai_token, ngrok_token, tunnel_choice, check_updates=False):
     """Save configuration and start installation with immediate progress feedback"""
     global current_config, installation_in_progress, progress_state
     
@@ -320,6 +421,7 @@ def save_config_and_install(webui_choice, sd_version, models, vaes, controlnets,
         "civitai_token": civitai_token,
         "ngrok_token": ngrok_token, 
         "tunnel_choice": tunnel_choice, 
+        "check_updates": bool(check_updates),
         "session_id": session_id,
     }
     
@@ -451,6 +553,17 @@ def create_trinity_interface():
                     type="password",
                     placeholder="Optional: For ngrok tunneling"
                 )
+            
+            check_updates_checkbox = gr.Checkbox(
+                label="Check installed assets for updates",
+                value=False,
+                info="Re-download only assets whose upstream file changed (uses conditional requests)"
+            )
+            prefetch_checkbox = gr.Checkbox(
+                label="Prefetch default selections while configuring",
+                value=PREFETCH_ENABLED,
+                info="Starts low-priority downloads of the preselected checkpoint/VAE right away; deselecting cancels them"
+            )
         
         # Enhanced save button
         save_button = gr.Button(
@@ -474,6 +587,12 @@ def create_trinity_interface():
                 )
             
             with gr.Tab("Asset Downloads"):
+                with gr.Row():
+                    asset_status_filter = gr.Dropdown(
+                        choices=["all", "downloading", "error", "pending", "success"],
+                        value="all", label="Show"
+                    )
+                    asset_page = gr.Number(value=1, precision=0, minimum=1, label="Page")
                 asset_progress = gr.HTML(
                     value='<div style="padding: 20px; text-align: center; color: #888; background: #1a1a1a; border-radius: 8px; border: 1px solid #333;">Waiting for downloads to start...</div>',
                     elem_id="asset-progress"
@@ -483,16 +602,29 @@ def create_trinity_interface():
         refresh_timer = gr.Timer(2.0)
         refresh_timer.tick(
             fn=get_progress_updates,
+            inputs=[asset_page, asset_status_filter],
             outputs=[progress_accordion, dependency_progress, asset_progress]
         )
+        for paging_control in (asset_page, asset_status_filter):
+            paging_control.change(
+                fn=get_progress_updates,
+                inputs=[asset_page, asset_status_filter],
+                outputs=[progress_accordion, dependency_progress, asset_progress]
+            )
         
         # Event handlers
         is_xl_checkbox.change(
             fn=update_model_lists_for_version, 
-            inputs=[is_xl_checkbox], 
+            inputs=[is_xl_checkbox, prefetch_checkbox], 
             outputs=[model_cbg, vae_cbg, controlnet_cbg, lora_cbg]
         )
         
+        # Speculative prefetch follows the selection: deselected items are cancelled
+        selection_inputs = [is_xl_checkbox, prefetch_checkbox, model_cbg, vae_cbg, controlnet_cbg, lora_cbg]
+        for selection_cbg in (model_cbg, vae_cbg, controlnet_cbg, lora_cbg):
+            selection_cbg.change(fn=update_prefetch_selection, inputs=selection_inputs, outputs=[])
+        prefetch_checkbox.change(fn=toggle_prefetch, inputs=selection_inputs, outputs=[])
+        
         webui_dropdown.change(
             fn=lambda w: gr.update(value=webui_selection.get(w, "")), 
             inputs=[webui_dropdown], 
@@ -505,14 +637,15 @@ def create_trinity_interface():
             inputs=[
                 webui_dropdown, is_xl_checkbox, model_cbg, vae_cbg, 
                 controlnet_cbg, lora_cbg, arguments_textbox, theme_dropdown, 
-                civitai_token, ngrok_token, tunnel_choice
+                civitai_token, ngrok_token, tunnel_choice, check_updates_checkbox
             ],
             outputs=[status_display, progress_accordion, dependency_progress, asset_progress]
         )
         
         # Initialize model lists on load
         interface.load(
-            fn=lambda: update_model_lists_for_version(False), 
+            fn=lambda prefetch: update_model_lists_for_version(False, prefetch), 
+            inputs=[prefetch_checkbox],
             outputs=[model_cbg, vae_cbg, controlnet_cbg, lora_cbg]
         )
     
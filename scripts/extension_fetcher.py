@@ -0,0 +1,209 @@
+"""
+TrinityUI Extension Fetcher
+Installs extension repositories as GitHub tarballs pinned to their default-branch commit, instead of `git clone`
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+import urllib3.exceptions
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.http_client import get_http_client, TrinityHTTPClient
+from scripts.io_engine import run_io, run_subprocess, gather_bounded, git_clone_many, SUBPROCESS_CONCURRENCY
+
+# 'git' (shallow clones) or 'tarball' (codeload archives, no git metadata)
+EXTENSION_FETCH_MODE = os.environ.get('TRINITY_EXTENSION_FETCH', 'git')
+# Overridable so the tarball path can run against a local HTTP server
+GITHUB_API_URL = os.environ.get('TRINITY_GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+CODELOAD_URL = os.environ.get('TRINITY_CODELOAD_URL', 'https://codeload.github.com').rstrip('/')
+# Written into each tarball-installed extension; enough to turn it into a git checkout later
+SOURCE_FILE = '.trinity-source.json'
+
+GITHUB_REPO_RE = re.compile(r'^https?://github\.com/([^/\s]+)/([^/\s]+?)(?:\.git)?/?$')
+COMMIT_SHA_RE = re.compile(r'^[0-9a-f]{40}$')
+TAR_EXTRACT_KWARGS = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+
+
+def parse_github_repo(repo_url: str) -> Optional[Tuple[str, str]]:
+    """(owner, repo) for a github.com repository URL, else None"""
+    match = GITHUB_REPO_RE.match(repo_url.strip())
+    return (match.group(1), match.group(2)) if match else None
+
+
+def load_source(extension_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((Path(extension_dir) / SOURCE_FILE).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+class ExtensionFetcher:
+    def __init__(self, client: Optional[TrinityHTTPClient] = None):
+        self.client = client or get_http_client()
+        token = os.environ.get('GITHUB_TOKEN')
+        # Unauthenticated API calls are limited to 60 an hour per IP
+        self.api_headers = {'Accept': 'application/vnd.github+json'}
+        if token:
+            self.api_headers['Authorization'] = f"Bearer {token}"
+
+    def resolve_commit(self, owner: str, repo: str) -> Tuple[str, str]:
+        """(default branch, commit SHA) of a GitHub repository"""
+        response = self.client.get(f"{GITHUB_API_URL}/repos/{owner}/{repo}", headers=self.api_headers)
+        response.raise_for_status()
+        branch = response.json()['default_branch']
+
+        headers = dict(self.api_headers, Accept='application/vnd.github.sha')
+        response = self.client.get(f"{GITHUB_API_URL}/repos/{owner}/{repo}/commits/{branch}", headers=headers)
+        response.raise_for_status()
+        commit = response.text.strip()
+        if not COMMIT_SHA_RE.match(commit):
+            raise ValueError(f"Unexpected commit lookup response for {owner}/{repo}: {commit[:80]!r}")
+        return branch, commit
+
+    def fetch(self, repo_url: str, target_dir: Path, name: str) -> Dict[str, Any]:
+        """Install repo_url's default-branch tree at target_dir/name.
+
+        Returns {'ok', 'message', 'commit', 'fallback'}; 'fallback' is True when the repository
+        cannot be installed from a tarball and should be cloned with git instead.
+        """
+        parsed = parse_github_repo(repo_url)
+        if not parsed:
+            return {'ok': False, 'message': "Not a GitHub repository URL", 'commit': None, 'fallback': True}
+        owner, repo = parsed
+        destination = Path(target_dir) / name
+        staging_dir = Path(target_dir) / f".{name}.trinity-fetch"
+
+        try:
+            branch, commit = self.resolve_commit(owner, repo)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            return {'ok': False, 'message': f"Commit lookup failed: {e}", 'commit': None, 'fallback': True}
+
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        try:
+            with self.client.get(f"{CODELOAD_URL}/{owner}/{repo}/tar.gz/{commit}", stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                self._extract(response.raw, staging_dir)
+        # Reading response.raw directly raises urllib3's own errors (ProtocolError, ReadTimeoutError), not requests'
+        except (requests.RequestException, urllib3.exceptions.HTTPError, tarfile.TarError, OSError, EOFError) as e:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return {'ok': False, 'message': f"Tarball download failed: {e}", 'commit': commit, 'fallback': True}
+
+        # Archives leave submodules out; only git can populate them
+        if (staging_dir / '.gitmodules').exists():
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return {'ok': False, 'message': "Repository uses submodules", 'commit': commit, 'fallback': True}
+
+        source = {'repo_url': repo_url, 'branch': branch, 'commit': commit, 'fetched_at': time.time()}
+        (staging_dir / SOURCE_FILE).write_text(json.dumps(source, indent=2), encoding='utf-8')
+        if destination.exists():
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return {'ok': False, 'message': f"{destination} already exists", 'commit': commit, 'fallback': False}
+        staging_dir.rename(destination)
+        return {'ok': True, 'message': f"Fetched {owner}/{repo}@{commit[:12]} ({branch})",
+                'commit': commit, 'fallback': False}
+
+    @staticmethod
+    def _extract(stream, staging_dir: Path):
+        """Stream-extract a codeload archive, dropping its `<repo>-<sha>/` top-level directory"""
+        staging_dir.mkdir(parents=True)
+        with tarfile.open(fileobj=stream, mode='r|gz') as tar:
+            for member in tar:
+                parts = member.name.split('/', 1)
+                if len(parts) < 2 or not parts[1].strip('/'):
+                    continue
+                member.name = parts[1]
+                if member.islnk():
+                    member.linkname = member.linkname.split('/', 1)[-1]
+                if member.name.startswith('/') or '..' in member.name.split('/'):
+                    raise tarfile.TarError(f"Unsafe archive member: {member.name}")
+                # Where available, the data filter also rejects links pointing outside the tree
+                tar.extract(member, staging_dir, **TAR_EXTRACT_KWARGS)
+
+
+def convert_to_git(extension_dir: Path) -> Dict[str, Any]:
+    """Turn a tarball-installed extension into a shallow git checkout of its recorded commit.
+
+    The working tree is left as is, so `git status` shows any local edits; `git pull` works afterwards.
+    """
+    extension_dir = Path(extension_dir)
+    source = load_source(extension_dir)
+    if source is None:
+        return {'ok': False, 'message': f"No {SOURCE_FILE} in {extension_dir}"}
+    if (extension_dir / '.git').exists():
+        return {'ok': False, 'message': f"{extension_dir} is already a git checkout"}
+
+    branch = source['branch']
+    steps = [
+        ['git', 'init', '-q', '-b', branch],
+        ['git', 'remote', 'add', 'origin', source['repo_url']],
+        ['git', 'fetch', '-q', '--depth', '1', 'origin', f"{source['commit']}:refs/remotes/origin/{branch}"],
+        ['git', 'reset', '-q', source['commit']],
+        ['git', 'config', f"branch.{branch}.remote", 'origin'],
+        ['git', 'config', f"branch.{branch}.merge", f"refs/heads/{branch}"],
+    ]
+    for cmd in steps:
+        result = subprocess.run(cmd, cwd=extension_dir, capture_output=True, text=True)
+        if result.returncode != 0:
+            shutil.rmtree(extension_dir / '.git', ignore_errors=True)
+            return {'ok': False, 'message': f"{' '.join(cmd[:2])} failed: {result.stderr.strip()}"}
+    (extension_dir / SOURCE_FILE).unlink()
+    return {'ok': True, 'message': f"{extension_dir.name} is now a git checkout of {branch}@{source['commit'][:12]}"}
+
+
+async def fetch_repos(repos: List[Tuple[str, str]], target_dir: Path,
+                      mode: Optional[str] = None, limit: int = SUBPROCESS_CONCURRENCY) -> List[Any]:
+    """Install (repo_url, name) pairs into target_dir using the configured fetch mode.
+
+    Drop-in for git_clone_many: results line up with `repos` as (returncode, stdout, stderr) or the
+    raised exception. In tarball mode, repositories that cannot be fetched that way are cloned with git.
+    """
+    if (mode or EXTENSION_FETCH_MODE) != 'tarball':
+        return await git_clone_many(repos, target_dir, limit)
+
+    fetcher = ExtensionFetcher()
+
+    async def _fetch(repo_url: str, name: str) -> Tuple[int, bytes, bytes]:
+        result = await run_io(fetcher.fetch, repo_url, target_dir, name)
+        if result['ok']:
+            return 0, result['message'].encode(), b''
+        if not result['fallback']:
+            return 1, b'', result['message'].encode()
+        returncode, stdout, stderr = await run_subprocess(f"git clone --depth 1 {repo_url} {name}", cwd=target_dir)
+        return returncode, f"Tarball skipped ({result['message']}); cloned with git\n".encode() + stdout, stderr
+
+    return await gather_bounded([_fetch(url, name) for url, name in repos], limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage extensions installed from GitHub tarballs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_git = subparsers.add_parser("to-git", help="Turn tarball-installed extensions into git checkouts")
+    to_git.add_argument("paths", nargs='+', type=Path,
+                        help="Extension directories, or a directory of extensions")
+    args = parser.parse_args()
+
+    directories = []
+    for path in args.paths:
+        directories.extend([path] if (path / SOURCE_FILE).exists() else
+                           sorted(p for p in path.iterdir() if (p / SOURCE_FILE).exists()))
+    if not directories:
+        print("No tarball-installed extensions found")
+        return
+    for directory in directories:
+        result = convert_to_git(directory)
+        print(f"{'✅' if result['ok'] else '❌'} {result['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+TrinityUI Shared HTTP Client
+Process-wide pooled HTTP session with keep-alive, retry/timeout policy and small text caching
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from scripts.download_staging import staging_path, check_header, commit_staged, discard_staged
+from scripts.page_cache import CacheDropper
+
+USER_AGENT = "TrinityUI/1.0 (+https://github.com/remphanstar/TrinityUI)"
+
+# Timeout and retry policy shared by every caller
+DEFAULT_TIMEOUT: Tuple[int, int] = (10, 60)  # (connect, read) seconds
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Connection pooling: one pool per host, each keeping up to POOL_MAXSIZE keep-alive sockets
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 16
+
+# Small text resources (HTML templates, config files) are cached in-process
+TEXT_CACHE_MAX_BYTES = 512 * 1024
+TEXT_CACHE_TTL = 300  # seconds before a cached entry is revalidated
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class TrinityHTTPClient:
+    def __init__(self, timeout: Tuple[int, int] = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 pool_maxsize: int = POOL_MAXSIZE, cache_ttl: int = TEXT_CACHE_TTL):
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.session = self.create_session(retries, pool_maxsize)
+        self._text_cache: Dict[str, dict] = {}
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def create_session(retries: int, pool_maxsize: int) -> requests.Session:
+        """Create a keep-alive session with per-host pools and the shared retry policy"""
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the pooled session using the default timeout"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('allow_redirects', True)
+        return self.request('HEAD', url, **kwargs)
+
+    def get_text(self, url: str, max_age: Optional[int] = None) -> str:
+        """Fetch a small text resource, serving repeats from cache and revalidating with ETag/Last-Modified"""
+        max_age = self.cache_ttl if max_age is None else max_age
+
+        with self._cache_lock:
+            cached = self._text_cache.get(url)
+        if cached and time.time() - cached['fetched_at'] < max_age:
+            return cached['text']
+
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        response = self.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            cached['fetched_at'] = time.time()
+            return cached['text']
+
+        response.raise_for_status()
+        text = response.text
+
+        if len(response.content) <= TEXT_CACHE_MAX_BYTES:
+            with self._cache_lock:
+                self._text_cache[url] = {
+                    'text': text,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time.time()
+                }
+        return text
+
+    def download_to_path(self, url: str, file_path: Path, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> int:
+        """Stream a URL to a `.part` file beside file_path and rename it into place once complete.
+
+        Returns the number of bytes written; raises requests.RequestException on a truncated or invalid body.
+        """
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = staging_path(file_path)
+
+        written = 0
+        try:
+            with self.get(url, stream=True) as response:
+                response.raise_for_status()
+                # Content-Length counts encoded bytes, so it is only comparable for identity bodies
+                expected = None if response.headers.get('Content-Encoding') else response.headers.get('Content-Length')
+                with open(part_path, 'wb') as f:
+                    dropper = CacheDropper(f, file_path)
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            written += len(chunk)
+                            dropper.advance(written)
+                    f.flush()
+                    dropper.finish()
+            if expected and expected.isdigit() and written != int(expected):
+                raise requests.RequestException(f"Incomplete download of {url}: {written} of {expected} bytes")
+            error = check_header(part_path, file_path.name)
+            if error:
+                raise requests.RequestException(f"Invalid download of {url}: {error}")
+        except BaseException:
+            discard_staged(part_path)
+            raise
+        commit_staged(part_path, file_path)
+        return written
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._text_cache.clear()
+
+    def close(self):
+        self.session.close()
+
+
+_client: Optional[TrinityHTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> TrinityHTTPClient:
+    """Return the process-wide HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TrinityHTTPClient()
+    return _client
@@ -0,0 +1,150 @@
+"""
+TrinityUI Install Planner
+Diffs a venv's installed distributions (read from dist-info metadata, no interpreter start) against a
+WebUI's requirements, so installers run only what changed
+"""
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.utils import canonicalize_name
+except ImportError:
+    # pip vendors packaging, and pip is always present where venvs are built
+    from pip._vendor.packaging.requirements import Requirement, InvalidRequirement
+    from pip._vendor.packaging.utils import canonicalize_name
+
+# Requirement-file options that do not change what must be installed
+IGNORED_OPTIONS_RE = re.compile(r'^(?:--index-url|-i|--extra-index-url|--find-links|-f|--trusted-host|--pre)\b')
+# .pth file that attaches a shared base venv's site-packages below a WebUI venv's own (see venv_layers)
+LAYER_PTH_FILENAME = '_trinity_base_layer.pth'
+
+
+def _own_site_packages(venv_path: Path) -> List[Path]:
+    venv_path = Path(venv_path)
+    return sorted(p for pattern in ('lib/python*/site-packages', 'lib64/python*/site-packages')
+                  for p in venv_path.glob(pattern) if p.is_dir())
+
+
+def layer_site_packages(venv_path: Path) -> List[Path]:
+    """Base-layer site-packages a venv imports from, in sys.path order"""
+    layers = []
+    for site_packages in _own_site_packages(venv_path):
+        try:
+            lines = (site_packages / LAYER_PTH_FILENAME).read_text(encoding='utf-8').splitlines()
+        except OSError:
+            continue
+        layers += [Path(line.strip()) for line in lines
+                   if line.strip() and not line.startswith(('#', 'import')) and Path(line.strip()).is_dir()]
+    return layers
+
+
+def site_packages_dirs(venv_path: Path, layers: bool = True) -> List[Path]:
+    """A venv's site-packages, followed by its base layers' unless layers=False"""
+    own = _own_site_packages(venv_path)
+    return own + [path for path in layer_site_packages(venv_path) if path not in own] if layers else own
+
+
+def _metadata_field(path: Path, field: str) -> Optional[str]:
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    break  # headers end at the first blank line
+                if line.startswith(f"{field}:"):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return None
+
+
+def installed_distributions(venv_path: Path) -> Dict[str, str]:
+    """{canonical project name: version} of everything venv_path can import; its own packages shadow its layers'"""
+    distributions = {}
+    for site_packages in site_packages_dirs(venv_path):
+        for entry in site_packages.iterdir():
+            if entry.suffix == '.dist-info':
+                # `{name}-{version}.dist-info`; versions never contain '-'
+                name, _, version = entry.stem.rpartition('-')
+                if not name:
+                    name = _metadata_field(entry / 'METADATA', 'Name') or ''
+                    version = _metadata_field(entry / 'METADATA', 'Version') or ''
+            elif entry.suffix == '.egg-info':
+                metadata = entry / 'PKG-INFO' if entry.is_dir() else entry
+                name = _metadata_field(metadata, 'Name') or ''
+                version = _metadata_field(metadata, 'Version') or ''
+            else:
+                continue
+            if name and version:
+                distributions.setdefault(canonicalize_name(name), version)
+    return distributions
+
+
+def read_plannable_requirements(requirements_file: Path) -> Dict[str, Any]:
+    """{'requirements': [...], 'unplannable': [...]}: lines the planner can check, and lines only pip can"""
+    requirements, unplannable = [], []
+    for line in Path(requirements_file).read_text(encoding='utf-8').splitlines():
+        line = line.split(' #', 1)[0].strip()
+        if not line or line.startswith('#') or IGNORED_OPTIONS_RE.match(line):
+            continue
+        if line.startswith('-') or '://' in line or ' @ ' in line:
+            unplannable.append(line)
+        else:
+            requirements.append(line)
+    return {'requirements': requirements, 'unplannable': unplannable}
+
+
+def plan_install(venv_path: Path, requirements: Iterable[str], remove: Iterable[str] = (),
+                 python_version: Optional[str] = None) -> Dict[str, Any]:
+    """Minimal diff between a venv and a set of requirement strings.
+
+    Returns {'install', 'upgrade', 'remove', 'satisfied', 'unplannable'}: install/upgrade hold
+    {'name', 'requirement', 'installed'} for requirements that are missing or at a non-matching
+    version (local labels such as +cu121 count), remove the installed names from `remove`.
+    python_version evaluates environment markers for the venv's interpreter rather than this one.
+    """
+    installed = installed_distributions(venv_path)
+    environment = {'python_version': python_version, 'python_full_version': f"{python_version}.0"} \
+        if python_version else None
+    plan = {'install': [], 'upgrade': [], 'remove': [], 'satisfied': [], 'unplannable': []}
+
+    for requirement_string in requirements:
+        try:
+            requirement = Requirement(requirement_string)
+        except InvalidRequirement:
+            plan['unplannable'].append(requirement_string)
+            continue
+        if requirement.marker is not None and not requirement.marker.evaluate(environment):
+            continue
+        name = canonicalize_name(requirement.name)
+        version = installed.get(name)
+        entry = {'name': name, 'requirement': requirement_string, 'installed': version}
+        if version is None:
+            plan['install'].append(entry)
+        elif requirement.specifier.contains(version, prereleases=True):
+            plan['satisfied'].append(entry)
+        else:
+            plan['upgrade'].append(entry)
+
+    plan['remove'] = [canonicalize_name(name) for name in remove if canonicalize_name(name) in installed]
+    return plan
+
+
+def plan_changes(plan: Dict[str, Any]) -> int:
+    """Number of actions a plan needs; 0 means the venv already matches"""
+    return len(plan['install']) + len(plan['upgrade']) + len(plan['remove']) + len(plan['unplannable'])
+
+
+def describe_plan(plan: Dict[str, Any]) -> str:
+    parts = []
+    if plan['install']:
+        parts.append("install " + ', '.join(entry['requirement'] for entry in plan['install']))
+    if plan['upgrade']:
+        parts.append("change " + ', '.join(f"{entry['name']} {entry['installed']} -> {entry['requirement']}"
+                                           for entry in plan['upgrade']))
+    if plan['remove']:
+        parts.append("remove " + ', '.join(plan['remove']))
+    if plan['unplannable']:
+        parts.append(f"{len(plan['unplannable'])} requirement(s) left to pip")
+    return '; '.join(parts) or 'nothing to do'
@@ -15,15 +15,71 @@ from datetime import datetime
 from typing import Dict, List, Any, Callable, Optional
 import requests
 
+from scripts.asset_metadata import (AssetMetadataResolver, LocalHashIndex, check_existing_asset, link_duplicate,
+                                    VERIFIED_KEEP_REASONS)
+from scripts.negative_cache import NegativeURLCache, SKIP_CLASSES, classify_aria2c_failure, partition_known_bad
+from scripts.bandwidth_budget import get_bandwidth_budget, PRIORITY_CRITICAL, PRIORITY_NORMAL
+from scripts.download_staging import staging_path, verify_download, commit_staged, discard_staged
+from scripts.page_cache import drop_file_cache, mark_load_next
+from scripts.download_state import DownloadStateStore, DB_FILENAME
+from scripts.link_prober import LinkProber
+from scripts.asset_updates import AssetUpdateChecker
+from scripts.process_downloader import ProcessPoolDownloader, DOWNLOAD_MODE, PROCESS_WORKERS
+from scripts.download_tasks import DownloadTask
+from scripts.aria2c_manager import Aria2cManager, BATCH_MIN_FILES, BATCH_CHUNK_SIZE
+from scripts.pack_extractor import PackExtractor, pack_installed
+from scripts.prefetcher import get_prefetcher
+from scripts.wheelhouse import get_wheelhouse
+from scripts.venv_probe import probe_venv
+from scripts.venv_dedupe import dedupe_venvs
+
+# Gradio gets at most one push per kind this often; the hub polls every 2s anyway
+PUSH_INTERVAL = 0.5
+ASSET_PAGE_SIZE = 50
+
+class AssetProgressEntry:
+    __slots__ = ('name', 'status', 'error', 'progress')
+    
+    def __init__(self, name: str, status: str):
+        self.name = name
+        self.status = status
+        self.error = None
+        self.progress = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        entry = {'name': self.name, 'status': self.status}
+        if self.error:
+            entry['error'] = self.error
+        if self.progress is not None:
+            entry['progress'] = self.progress
+        return entry
+
 class InstallationProgressTracker:
     def __init__(self, notebook_callback: Optional[Callable] = None, gradio_callback: Optional[Callable] = None):
         self.notebook_callback = notebook_callback
         self.gradio_callback = gradio_callback
         self.dependency_log = []
-        self.asset_progress = []
+        # Keyed by asset name with running per-status counts, so updates stay O(1) on 10k-file selections
+        self.asset_progress: Dict[str, AssetProgressEntry] = {}
+        self.asset_status_counts: Dict[str, int] = {}
+        self._asset_lock = threading.Lock()
+        self._last_push: Dict[str, float] = {}
+        self._pending_push = set()
         self.installation_start_time = None
         self.current_phase = "initializing"
         
+    def _should_push(self, update_type: str, force: bool = False) -> bool:
+        """Throttle Gradio pushes; a skipped push is sent by the next one or by flush_progress"""
+        if not self.gradio_callback:
+            return False
+        now = time.monotonic()
+        if not force and now - self._last_push.get(update_type, 0) < PUSH_INTERVAL:
+            self._pending_push.add(update_type)
+            return False
+        self._last_push[update_type] = now
+        self._pending_push.discard(update_type)
+        return True
+    
     def log(self, message: str, level: str = "INFO", phase: str = None):
         """Log message to both notebook and Gradio outputs"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -39,7 +95,7 @@ class InstallationProgressTracker:
             self.notebook_callback(f"{log_entry}\n")
             
         # Send to Gradio output
-        if self.gradio_callback:
+        if self._should_push("dependency_progress", force=level == "ERROR"):
             formatted_log = self.format_log_for_display()
             self.gradio_callback("dependency_progress", formatted_log)
     
@@ -57,27 +113,62 @@ class InstallationProgressTracker:
                 formatted_lines.append(f'<div class="log-line log-info">{line}</div>')
         return ''.join(formatted_lines)
     
-    def update_asset_progress(self, asset_name: str, status: str, error: str = None):
-        """Update asset download progress"""
-        # Update existing asset or add new one
-        asset_found = False
-        for asset in self.asset_progress:
-            if asset['name'] == asset_name:
-                asset['status'] = status
-                if error:
-                    asset['error'] = error
-                asset_found = True
-                break
-        
-        if not asset_found:
-            asset_entry = {'name': asset_name, 'status': status}
+    def update_asset_progress(self, asset_name: str, status: str, error: str = None, progress: float = None):
+        """Update asset download progress (progress is the downloaded fraction, when known)"""
+        with self._asset_lock:
+            entry = self.asset_progress.get(asset_name)
+            if entry is None:
+                entry = AssetProgressEntry(asset_name, status)
+                self.asset_progress[asset_name] = entry
+            else:
+                self.asset_status_counts[entry.status] -= 1
+                entry.status = status
+            self.asset_status_counts[status] = self.asset_status_counts.get(status, 0) + 1
             if error:
-                asset_entry['error'] = error
-            self.asset_progress.append(asset_entry)
+                entry.error = error
+            if progress is not None:
+                entry.progress = progress
         
-        # Send to Gradio output
-        if self.gradio_callback:
-            self.gradio_callback("asset_progress", self.asset_progress)
+        # Send to Gradio output: counts plus the first page, never the whole list
+        if self._should_push("asset_progress"):
+            self.gradio_callback("asset_progress", self.asset_progress_summary())
+    
+    def asset_progress_page(self, page: int = 1, page_size: int = ASSET_PAGE_SIZE,
+                            status: Optional[str] = None) -> Dict[str, Any]:
+        """One page of asset entries (optionally of a single status) with the overall status counts"""
+        with self._asset_lock:
+            entries = [entry for entry in self.asset_progress.values() if status is None or entry.status == status]
+            counts = dict(self.asset_status_counts)
+            total = len(self.asset_progress)
+        pages = max(1, -(-len(entries) // page_size))
+        page = min(max(1, page), pages)
+        items = [entry.to_dict() for entry in entries[(page - 1) * page_size:page * page_size]]
+        return {'total': total, 'counts': counts, 'status': status, 'page': page, 'pages': pages,
+                'matching': len(entries), 'items': items}
+    
+    def asset_progress_summary(self, page_size: int = ASSET_PAGE_SIZE) -> Dict[str, Any]:
+        """Status counts plus the entries worth showing first: active downloads, then failures"""
+        with self._asset_lock:
+            active, failed = [], []
+            for entry in self.asset_progress.values():
+                if entry.status == 'downloading':
+                    active.append(entry)
+                elif entry.status == 'error':
+                    failed.append(entry)
+            # Nothing running or failed (yet): show the start of the queue
+            shown = (active + failed) or list(self.asset_progress.values())
+            counts = dict(self.asset_status_counts)
+            total = len(self.asset_progress)
+        items = [entry.to_dict() for entry in shown[:page_size]]
+        return {'total': total, 'counts': counts, 'status': None, 'page': 1, 'pages': 1,
+                'matching': len(shown), 'items': items}
+    
+    def flush_progress(self):
+        """Send any updates held back by the push throttle"""
+        if "dependency_progress" in self._pending_push and self._should_push("dependency_progress", force=True):
+            self.gradio_callback("dependency_progress", self.format_log_for_display())
+        if "asset_progress" in self._pending_push and self._should_push("asset_progress", force=True):
+            self.gradio_callback("asset_progress", self.asset_progress_summary())
     
     def start_installation(self):
         """Mark installation start"""
@@ -92,6 +183,7 @@ class InstallationProgressTracker:
         else:
             self.log(f"Installation completed with errors after {duration:.1f} seconds", "ERROR", "completed")
         
+        self.flush_progress()
         if self.gradio_callback:
             self.gradio_callback("completion", success)
 
@@ -100,6 +192,9 @@ class TrinityInstallationManager:
         self.project_root = project_root
         self.tracker = tracker
         self.webui_root = Path('/content')
+        self.negative_cache = NegativeURLCache()
+        self.state = DownloadStateStore(project_root / DB_FILENAME)
+        self._progress_recorded: Dict[Path, float] = {}
         
     def install_webui_dependencies(self, webui_choice: str) -> bool:
         """Install dependencies for the selected WebUI"""
@@ -107,7 +202,6 @@ class TrinityInstallationManager:
         
         webui_path = self.webui_root / webui_choice
         venv_path = webui_path / 'venv'
-        venv_python = venv_path / 'bin' / 'python'
         venv_pip = venv_path / 'bin' / 'pip'
         
         if not webui_path.exists():
@@ -118,17 +212,14 @@ class TrinityInstallationManager:
             self.tracker.log(f"Virtual environment not found: {venv_path}", "ERROR")
             return False
         
-        # Check if dependencies already installed
+        # Check if dependencies already installed (package metadata, no cold torch import)
         try:
-            result = subprocess.run(
-                [str(venv_python), '-c', 'import torch; print("PyTorch version:", torch.__version__)'],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.returncode == 0:
+            torch_version = probe_venv(venv_path, ['torch'])['packages']['torch']
+            if torch_version:
                 self.tracker.log(f"Dependencies already installed for {webui_choice}", "SUCCESS")
-                self.tracker.log(f"PyTorch status: {result.stdout.strip()}", "INFO")
+                self.tracker.log(f"PyTorch status: PyTorch version: {torch_version}", "INFO")
                 return True
-        except Exception:
+        except OSError:
             pass
         
         # Install requirements
@@ -168,36 +259,39 @@ class TrinityInstallationManager:
             
             process.wait()
             
-            # Install requirements
+            # Install requirements through the wheelhouse shared by every WebUI venv
             self.tracker.log(f"Installing requirements from {requirements_file.name}", "INFO")
-            install_cmd = [
-                str(venv_pip), 'install', '-r', str(requirements_file),
-                '--cache-dir', '/tmp/pip-cache',
+            install_args = [
+                '-r', str(requirements_file),
                 '--trusted-host', 'pypi.org',
                 '--trusted-host', 'pypi.python.org', 
                 '--trusted-host', 'files.pythonhosted.org',
                 '--progress-bar', 'on'
             ]
+            return_codes = []
             
-            process = subprocess.Popen(
-                install_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                cwd=webui_path
-            )
-            
-            for line in iter(process.stdout.readline, ''):
-                if line.strip():
-                    self.tracker.log(f"INSTALL: {line.strip()}", "INFO")
-            
-            return_code = process.wait()
+            def run(cmd: List[str]) -> bool:
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    cwd=webui_path
+                )
+                
+                for line in iter(process.stdout.readline, ''):
+                    if line.strip():
+                        self.tracker.log(f"INSTALL: {line.strip()}", "INFO")
+                
+                return_codes.append(process.wait())
+                return return_codes[-1] == 0
             
-            if return_code == 0:
+            if get_wheelhouse().install(venv_pip, install_args, run, log=lambda message: self.tracker.log(message, "INFO")):
                 self.tracker.log(f"Successfully installed {webui_choice} dependencies", "SUCCESS")
+                dedupe_venvs(log=lambda message: self.tracker.log(message, "INFO"))
                 return True
             else:
-                self.tracker.log(f"Dependency installation failed with exit code {return_code}", "ERROR")
+                self.tracker.log(f"Dependency installation failed with exit code {return_codes[-1]}", "ERROR")
                 return False
                 
         except Exception as e:
@@ -254,37 +348,208 @@ class TrinityInstallationManager:
                 'lora': webui_path / 'models' / 'Lora'
             }
     
-    def download_single_asset(self, url: str, output_path: Path, filename: str) -> tuple:
-        """Download a single asset with aria2c acceleration"""
+    def download_single_asset(self, url: str, output_path: Path, filename: str, checksum: Optional[str] = None,
+                              priority: int = PRIORITY_NORMAL, expected_size: Optional[int] = None,
+                              progress_callback: Optional[Callable[[int, int], None]] = None) -> tuple:
+        """Download a single asset with aria2c acceleration into a `.part` file and publish it once verified"""
         try:
             output_path.mkdir(parents=True, exist_ok=True)
+            file_path = output_path / filename
+            part_path = staging_path(file_path)
             
-            cmd = [
-                'aria2c',
-                '--max-connection-per-server=16',
-                '--split=16',
-                '--min-split-size=1M',
-                '--continue=true',
-                '--retry-wait=3',
-                '--max-tries=5',
-                '--dir', str(output_path),
-                '--out', filename,
-                url
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            with get_bandwidth_budget().lease(f"asset:{filename}", priority) as lease:
+                report = (lambda path, done, total: progress_callback(done, total)) if progress_callback else None
+                cmd = [
+                    'aria2c',
+                    *lease.aria2c_args(progress_callback=report),
+                    '--min-split-size=1M',
+                    '--continue=true',
+                    '--retry-wait=3',
+                    '--max-tries=5',
+                    '--dir', str(output_path),
+                    '--out', part_path.name
+                ]
+                if checksum:
+                    cmd.append(f'--checksum=sha-256={checksum}')
+                cmd.append(url)
+                
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
             
-            file_path = output_path / filename
-            if result.returncode == 0 and file_path.exists() and file_path.stat().st_size > 0:
+            if result.returncode == 0 and part_path.exists():
+                # aria2c already checked the hash when one was passed
+                error = verify_download(part_path, filename, {'sha256': checksum, 'size': expected_size},
+                                        hash_verified=bool(checksum))
+                if error:
+                    discard_staged(part_path)
+                    return False, f"Verification failed for {filename}: {error}"
+                commit_staged(part_path, file_path)
+                drop_file_cache(file_path)
+                self.negative_cache.clear(url)
                 return True, f"Downloaded {filename} successfully"
             else:
+                failure = classify_aria2c_failure(result.returncode, result.stdout + result.stderr)
+                if failure:
+                    self.negative_cache.record_failure(url, failure, result.stderr or result.stdout)
                 return False, f"Download failed: {result.stderr[:200] if result.stderr else 'Unknown error'}"
                 
         except subprocess.TimeoutExpired:
+            self.negative_cache.record_failure(url, 'timeout', 'aria2c did not finish within 600s')
             return False, f"Download timed out for {filename}"
         except Exception as e:
             return False, f"Download error for {filename}: {e}"
     
+    def report_progress(self, task: DownloadTask, done: int, total: Optional[int]):
+        """Show a running download's progress and persist it, throttled like the tracker's pushes"""
+        if total:
+            self.tracker.update_asset_progress(task.filename, 'downloading', progress=done / total)
+        now = time.monotonic()
+        if now - self._progress_recorded.get(task.file_path, 0) >= PUSH_INTERVAL:
+            self._progress_recorded[task.file_path] = now
+            self.state.mark_progress(task.file_path, done)
+    
+    def record_skipped_asset(self, task: DownloadTask, webui_choice: str, reason: str):
+        """Persist a download that was planned but never attempted"""
+        self.state.plan(task.url, task.file_path, task.filename, task.type, webui_choice)
+        self.state.mark_failed(task.file_path, reason, status='skipped')
+    
+    def mark_changed_assets(self, download_tasks: List[DownloadTask], resolver: AssetMetadataResolver) -> int:
+        """Conditional-request installed assets and flag those whose upstream version changed"""
+        installed = []
+        for task in download_tasks:
+            file_path = task.file_path
+            row = self.state.get(file_path)
+            if file_path.exists() and row and row['status'] == 'success' and row['url'] == task.url:
+                installed.append((task, row))
+        
+        self.tracker.log(f"Checking {len(installed)} installed assets for upstream updates", "INFO")
+        changed = 0
+        results = AssetUpdateChecker().check_many([row for _, row in installed])
+        for (task, row), result in zip(installed, results):
+            if result['state'] == 'changed':
+                # The new version's hash/size replace the cached metadata so it verifies and is kept next run
+                task.update_available = True
+                task.expected = result['metadata']
+                resolver.remember(task.url, result['metadata'])
+                changed += 1
+                self.tracker.log(f"Upstream changed ({result['reason']}): {task.filename}", "INFO")
+            elif result['state'] == 'error':
+                self.tracker.log(f"Update check failed for {task.filename}: {result['reason']}", "WARNING")
+        resolver.save()
+        return changed
+    
+    def record_download_result(self, task: DownloadTask, success: bool, message: str,
+                               sha256: Optional[str], hash_index: LocalHashIndex):
+        """Report a finished download attempt to the tracker, hash index and state store"""
+        asset_name = task.filename
+        file_path = task.file_path
+        if success:
+            if sha256:
+                # The downloader verified or computed the hash, so the file is never re-read for it
+                hash_index.record(file_path, sha256)
+            self.tracker.log(f"✅ {message}", "SUCCESS")
+            self.tracker.update_asset_progress(asset_name, 'success')
+            self.state.mark_finished(file_path, file_path.stat().st_size, sha256,
+                                     task.expected.get('etag'), task.expected.get('last_modified'))
+        else:
+            self.tracker.log(f"❌ {message}", "ERROR")
+            self.tracker.update_asset_progress(asset_name, 'error', message)
+            part_path = staging_path(file_path)
+            self.state.mark_failed(file_path, message, part_path.stat().st_size if part_path.exists() else 0)
+    
+    def record_transfer_results(self, tasks: List[DownloadTask], results: List[Dict[str, Any]],
+                                hash_index: LocalHashIndex, has_token: bool) -> int:
+        """Apply {'ok', 'message', 'sha256', 'failure'} results from a batch downloader; returns the successes"""
+        success_count = 0
+        for task, result in zip(tasks, results):
+            if result['ok']:
+                self.negative_cache.clear(task.url)
+                success_count += 1
+            elif result['failure']:
+                self.negative_cache.record_failure(task.url, result['failure'], result['message'], has_token)
+            self.record_download_result(task, result['ok'], result['message'], result['sha256'], hash_index)
+        return success_count
+    
+    def download_with_process_pool(self, tasks: List[DownloadTask], hash_index: LocalHashIndex,
+                                   has_token: bool) -> int:
+        """Download tasks with worker processes; returns the number of successes"""
+        with get_bandwidth_budget().lease("asset-pool", max(task.priority for task in tasks)) as lease:
+            # Each worker holds one connection, so the budget's grant caps the pool size
+            downloader = ProcessPoolDownloader(workers=lease.grant(PROCESS_WORKERS, max_per_download=1)['jobs'])
+            self.tracker.log(f"Downloading {len(tasks)} files with {downloader.workers} worker processes", "INFO")
+            
+            def report(index, done, total):
+                self.report_progress(tasks[index], done, total)
+            
+            try:
+                results = downloader.download([task.transfer() for task in tasks], progress_callback=report)
+            except Exception as e:
+                # Every task still gets a result, so none is left 'downloading' in the state store
+                message = f"Process pool failed: {type(e).__name__}: {e}"
+                self.tracker.log(f"❌ {message}", "ERROR")
+                results = [{'ok': False, 'message': message, 'sha256': None, 'failure': None} for _ in tasks]
+        
+        return self.record_transfer_results(tasks, results, hash_index, has_token)
+    
+    def download_in_batches(self, tasks: List[DownloadTask], hash_index: LocalHashIndex, has_token: bool) -> int:
+        """Download many files with one aria2c process per chunk; returns the number of successes"""
+        aria2c = Aria2cManager()
+        success_count = 0
+        for start in range(0, len(tasks), BATCH_CHUNK_SIZE):
+            chunk = tasks[start:start + BATCH_CHUNK_SIZE]
+            self.tracker.log(f"Downloading files {start + 1}-{start + len(chunk)} of {len(tasks)} in one aria2c batch", "INFO")
+            for task in chunk:
+                self.tracker.update_asset_progress(task.filename, 'downloading')
+            results = aria2c.download_batch([task.transfer() for task in chunk],
+                                            priority=max(task.priority for task in chunk),
+                                            progress_callback=lambda index, done, total, chunk=chunk:
+                                            self.report_progress(chunk[index], done, total))
+            success_count += self.record_transfer_results(chunk, results, hash_index, has_token)
+            # Persist per chunk so an interrupted 10k-file run resumes from the last finished chunk
+            self.state.flush()
+        return success_count
+    
+    def download_packs(self, tasks: List[DownloadTask], hash_index: LocalHashIndex, has_token: bool,
+                       webui_choice: str) -> int:
+        """Stream-extract pack archives into their model directory; returns the number of packs installed"""
+        extractor = PackExtractor()
+        success_count = 0
+        for task in tasks:
+            if not task.update_available and pack_installed(task.path, task.filename, task.url):
+                self.tracker.log(f"Already extracted (pack manifest): {task.filename}", "SUCCESS")
+                self.tracker.update_asset_progress(task.filename, 'success')
+                success_count += 1
+                continue
+            
+            self.tracker.update_asset_progress(task.filename, 'downloading')
+            
+            def report(done, total, task=task):
+                self.report_progress(task, done, total)
+            
+            result = extractor.extract(task.url, task.path, task.filename, task.pack, task.expected, report)
+            for skipped in result['skipped']:
+                self.tracker.log(f"Skipped {skipped['name']} in {task.filename}: {skipped['reason']}", "WARNING")
+            if not result['ok']:
+                if result['failure']:
+                    self.negative_cache.record_failure(task.url, result['failure'], result['message'], has_token)
+                self.tracker.log(f"❌ {result['message']}", "ERROR")
+                self.tracker.update_asset_progress(task.filename, 'error', result['message'])
+                self.state.mark_failed(task.file_path, result['message'])
+                continue
+            
+            # Every member is recorded like a regular download, so later selections can reuse it by hash
+            for member in result['members']:
+                member_path = task.path / member['path']
+                hash_index.record(member_path, member['sha256'])
+                self.state.plan(f"{task.url}#{member['path']}", member_path, member['path'], task.type,
+                                webui_choice, member['size'], member['sha256'])
+                self.state.mark_finished(member_path, member['size'], member['sha256'])
+            self.state.mark_finished(task.file_path, sum(m['size'] for m in result['members']), result['archive_sha256'])
+            self.negative_cache.clear(task.url)
+            self.tracker.log(f"✅ {result['message']}", "SUCCESS")
+            self.tracker.update_asset_progress(task.filename, 'success')
+            success_count += 1
+        return success_count
+    
     def download_selected_assets(self, config: Dict[str, Any]) -> bool:
         """Download only the selected assets"""
         webui_choice = config.get('webui_choice', 'A1111')
@@ -329,52 +594,163 @@ class TrinityInstallationManager:
                         url = item.get('url', '')
                         filename = item.get('name', url.split('/')[-1])
                         if url and filename:
-                            download_tasks.append({
-                                'url': url,
-                                'path': target_dir,
-                                'filename': filename,
-                                'type': asset_type,
-                                'selection': item_name
-                            })
+                            download_tasks.append(DownloadTask(url, target_dir, filename, asset_type, item_name,
+                                                               pack=item if item.get('type') == 'pack' else None))
         
         if not download_tasks:
             self.tracker.log("No valid download URLs found for selections", "ERROR")
             return False
         
+        # Drop URLs already known to be dead before anything is queued
+        has_token = bool(config.get('civitai_token'))
+        download_tasks, skipped_tasks = partition_known_bad(download_tasks, self.negative_cache, has_token)
+        for task, entry in skipped_tasks:
+            self.tracker.log(f"Skipping {task.filename}: URL is known to fail ({entry['failure']}): {task.url}", "WARNING")
+            self.tracker.update_asset_progress(task.filename, 'error', f"Known-bad URL ({entry['failure']})")
+            self.record_skipped_asset(task, webui_choice, f"Known-bad URL ({entry['failure']})")
+        for task in download_tasks:
+            if task.recent_failure:
+                self.tracker.log(f"{task.filename} failed recently ({task.recent_failure['failure']}), trying again", "WARNING")
+        
+        # Surface the last link-health probe (cached results only, no extra requests)
+        link_health = LinkProber()
+        for task in download_tasks:
+            health = link_health.cached(task.url)
+            if health and not health['ok']:
+                self.tracker.log(f"Link check reported {task.filename} as failing ({health['status'] or health['failure']}): {task.url}", "WARNING")
+        
+        # Discover expected hashes and sizes (one tree listing per Hugging Face repo, else one HEAD / API call per asset)
+        self.tracker.log("Resolving expected hashes from Hugging Face and Civitai metadata", "INFO")
+        resolver = AssetMetadataResolver(civitai_token=config.get('civitai_token') or None)
+        metadata = resolver.resolve_many(task.url for task in download_tasks)
+        for task in download_tasks:
+            task.expected = metadata.get(task.url, {})
+        
+        # A 404/401 seen while resolving never enters the download queue
+        kept_tasks = []
+        for task in download_tasks:
+            failure = task.expected.get('failure')
+            if failure:
+                self.negative_cache.record_failure(task.url, failure, task.expected.get('error', ''), has_token)
+            if failure in SKIP_CLASSES:
+                self.tracker.log(f"Skipping {task.filename}: metadata lookup failed ({failure}): {task.url}", "WARNING")
+                self.tracker.update_asset_progress(task.filename, 'error', f"URL unavailable ({failure})")
+                self.record_skipped_asset(task, webui_choice, f"URL unavailable ({failure})")
+            else:
+                kept_tasks.append(task)
+        download_tasks = kept_tasks
+        self.negative_cache.save()
+        
+        # Update check mode: only installed assets that changed upstream are downloaded again
+        if config.get('check_updates'):
+            changed = self.mark_changed_assets(download_tasks, resolver)
+            self.tracker.log(f"{changed} installed assets have upstream updates", "INFO")
+        
+        for task in download_tasks:
+            self.state.plan(task.url, task.file_path, task.filename, task.type,
+                            webui_choice, task.expected.get('size'), task.expected.get('sha256'))
+        # The first selected checkpoint is what the WebUI loads at startup, so it stays in the page cache
+        first_model = next((task for task in download_tasks if task.type == 'Model' and task.pack is None), None)
+        if first_model:
+            mark_load_next([first_model.file_path])
+        known_hashes = sum(1 for task in download_tasks if task.expected.get('sha256'))
+        self.tracker.log(f"Expected SHA-256 known for {known_hashes}/{len(download_tasks)} assets", "INFO")
+        hash_index = LocalHashIndex()
+        
         self.tracker.log(f"Starting download of {len(download_tasks)} files", "INFO")
         
         # Initialize progress tracking for all assets
         for task in download_tasks:
-            self.tracker.update_asset_progress(task['filename'], 'pending')
+            self.tracker.update_asset_progress(task.filename, 'pending')
         
-        # Download assets
+        # Download assets; in process and batch mode the transfers are collected and run afterwards
         success_count = 0
         total_count = len(download_tasks)
+        process_mode = config.get('download_mode', DOWNLOAD_MODE) == 'process'
+        # Large selections pay aria2c's startup once per chunk; the checkpoint still gets its own process
+        batch_mode = not process_mode and total_count > BATCH_MIN_FILES
+        pool_tasks = []
+        batch_tasks = []
+        pack_tasks = []
+        prefetcher = get_prefetcher()
         
         for i, task in enumerate(download_tasks, 1):
-            asset_name = task['filename']
-            self.tracker.log(f"[{i}/{total_count}] Downloading {task['type']} from '{task['selection']}': {asset_name}", "INFO")
-            self.tracker.update_asset_progress(asset_name, 'downloading')
+            asset_name = task.filename
+            self.tracker.log(f"[{i}/{total_count}] Downloading {task.type} from '{task.selection}': {asset_name}", "INFO")
+            
+            # Packs are archives that never land on disk; their members are checked against the pack manifest
+            if task.pack is not None:
+                pack_tasks.append(task)
+                continue
             
-            # Check if file already exists
-            file_path = task['path'] / task['filename']
-            if file_path.exists() and file_path.stat().st_size > 1024*1024:  # > 1MB
-                self.tracker.log(f"Already exists: {asset_name}", "SUCCESS")
+            # Check if file already exists, using the expected hash/size when known
+            file_path = task.file_path
+            expected_sha256 = task.expected.get('sha256')
+            reason = None if task.update_available else check_existing_asset(file_path, task.expected, hash_index)
+            if reason:
+                self.tracker.log(f"Already exists ({reason}): {asset_name}", "SUCCESS")
                 self.tracker.update_asset_progress(asset_name, 'success')
+                # Upstream validators only describe this file if it was checked against that metadata;
+                # otherwise the update check would get a 304 for a possibly older file and call it unchanged
+                verified = reason in VERIFIED_KEEP_REASONS
+                self.state.mark_finished(file_path, file_path.stat().st_size, hash_index.lookup(file_path),
+                                         task.expected.get('etag') if verified else None,
+                                         task.expected.get('last_modified') if verified else None)
                 success_count += 1
                 continue
             
-            success, message = self.download_single_asset(task['url'], task['path'], task['filename'])
+            # Reuse an identical file downloaded earlier (e.g. for another WebUI)
+            if expected_sha256:
+                source = link_duplicate(expected_sha256, file_path, hash_index)
+                if source:
+                    self.tracker.log(f"Reused identical file {source} for {asset_name}", "SUCCESS")
+                    self.tracker.update_asset_progress(asset_name, 'success')
+                    self.state.mark_finished(file_path, file_path.stat().st_size, expected_sha256,
+                                             task.expected.get('etag'), task.expected.get('last_modified'))
+                    success_count += 1
+                    continue
             
+            # Promote a speculative prefetch from the hub: a finished file is used as is, a partial one resumed
+            # by aria2c (the process pool rewrites `.part` from the start, so it only takes finished files)
+            adopted = prefetcher.adopt(task.url, file_path, task.expected, resumable=not process_mode)
+            if adopted == 'complete':
+                self.record_download_result(task, True, f"Used prefetched {asset_name}", expected_sha256, hash_index)
+                success_count += 1
+                continue
+            if adopted == 'partial':
+                self.tracker.log(f"Resuming prefetched partial download of {asset_name}", "INFO")
+            
+            self.state.mark_started(file_path)
+            if process_mode:
+                pool_tasks.append(task)
+                continue
+            if batch_mode and task.priority != PRIORITY_CRITICAL:
+                batch_tasks.append(task)
+                continue
+            
+            self.tracker.update_asset_progress(asset_name, 'downloading')
+            success, message = self.download_single_asset(task.url, task.path, task.filename,
+                                                          checksum=expected_sha256, priority=task.priority,
+                                                          expected_size=task.expected.get('size'),
+                                                          progress_callback=lambda done, total, task=task:
+                                                          self.report_progress(task, done, total))
+            # aria2c verified the checksum when one was known
+            self.record_download_result(task, success, message, expected_sha256 if success else None, hash_index)
             if success:
                 success_count += 1
-                self.tracker.log(f"✅ {message}", "SUCCESS")
-                self.tracker.update_asset_progress(asset_name, 'success')
-            else:
-                self.tracker.log(f"❌ {message}", "ERROR")
-                self.tracker.update_asset_progress(asset_name, 'error', message)
         
+        if pool_tasks:
+            success_count += self.download_with_process_pool(pool_tasks, hash_index, has_token)
+        if batch_tasks:
+            success_count += self.download_in_batches(batch_tasks, hash_index, has_token)
+        if pack_tasks:
+            success_count += self.download_packs(pack_tasks, hash_index, has_token, webui_choice)
+        
+        hash_index.save()
+        self.negative_cache.save()
+        self.state.flush()
         self.tracker.log(f"Download Summary: {success_count}/{total_count} assets downloaded successfully", "SUCCESS")
+        self.tracker.flush_progress()
         return success_count > 0
 
 def run_installation(config: Dict[str, Any], tracker: InstallationProgressTracker) -> bool:
@@ -0,0 +1,68 @@
+"""
+TrinityUI Async I/O Engine
+Runs blocking downloads and subprocesses from asyncio code with a concurrency bound
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+# Worker threads available for blocking I/O (HTTP downloads, file writes)
+IO_CONCURRENCY = int(os.environ.get('TRINITY_IO_CONCURRENCY', '8'))
+# Simultaneous git/network subprocesses (extension clones)
+SUBPROCESS_CONCURRENCY = int(os.environ.get('TRINITY_SUBPROCESS_CONCURRENCY', '6'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Return the shared, bounded thread pool used for blocking I/O"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IO_CONCURRENCY, thread_name_prefix="TrinityIO")
+    return _executor
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable on the I/O pool without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def gather_bounded(coros: Iterable[Awaitable], limit: int, return_exceptions: bool = True) -> List[Any]:
+    """Like asyncio.gather, but never runs more than `limit` awaitables at once"""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _bounded(coro: Awaitable) -> Any:
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(_bounded(c) for c in coros), return_exceptions=return_exceptions)
+
+
+async def run_subprocess(command: str, cwd: Optional[Path] = None) -> Tuple[int, bytes, bytes]:
+    """Run a shell command asynchronously and return (returncode, stdout, stderr)"""
+    process = await asyncio.create_subprocess_shell(
+        command,
+        cwd=str(cwd) if cwd else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    return process.returncode, stdout, stderr
+
+
+async def git_clone_many(repos: List[Tuple[str, str]], target_dir: Path,
+                         limit: int = SUBPROCESS_CONCURRENCY) -> List[Any]:
+    """Shallow-clone (repo_url, name) pairs into target_dir, at most `limit` at a time.
+
+    Results line up with `repos`: a (returncode, stdout, stderr) tuple or the raised exception.
+    """
+    coros = [run_subprocess(f"git clone --depth 1 {url} {name}", cwd=target_dir) for url, name in repos]
+    return await gather_bounded(coros, limit)
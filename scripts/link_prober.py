@@ -0,0 +1,205 @@
+"""
+TrinityUI Link Health Prober
+Probes every URL in the model catalogs concurrently (HEAD, or a 1-byte Range GET) and caches the results
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.http_client import get_http_client, TrinityHTTPClient
+from scripts.negative_cache import classify_http_status, classify_exception
+
+CACHE_DIR = Path('/tmp/trinity_cache')
+LINK_HEALTH_FILE = CACHE_DIR / 'link_health.json'
+CATALOG_FILES = {'sd15': '_models-data.py', 'sdxl': '_xl-models-data.py'}
+CATALOG_LISTS = ('model_list', 'vae_list', 'controlnet_list', 'lora_list')
+
+# Results younger than this are served from the cache unless --force is given
+LINK_HEALTH_TTL = 6 * 3600
+PROBE_WORKERS = 32
+PER_HOST_LIMIT = 4
+# Servers that reject HEAD are retried with a ranged GET
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 501}
+
+
+def load_catalog(data_file: Path) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
+    """Execute a catalog file and return its model/vae/controlnet/lora dictionaries"""
+    namespace: Dict[str, Any] = {}
+    with open(data_file, 'r', encoding='utf-8') as f:
+        exec(f.read(), namespace)
+    return {name: namespace.get(name, {}) for name in CATALOG_LISTS}
+
+
+def iter_catalog_entries(scripts_dir: Path, catalogs: Iterable[str] = CATALOG_FILES) -> List[Dict[str, str]]:
+    """Flatten the catalogs into {'catalog', 'list', 'selection', 'name', 'url'} entries"""
+    entries = []
+    for catalog in catalogs:
+        data_file = scripts_dir / CATALOG_FILES[catalog]
+        if not data_file.exists():
+            continue
+        for list_name, selections in load_catalog(data_file).items():
+            for selection, items in selections.items():
+                for item in items:
+                    if item.get('url'):
+                        entries.append({
+                            'catalog': catalog,
+                            'list': list_name,
+                            'selection': selection,
+                            'name': item.get('name', item['url'].split('/')[-1]),
+                            'url': item['url']
+                        })
+    return entries
+
+
+class LinkProber:
+    def __init__(self, cache_file: Path = LINK_HEALTH_FILE, client: Optional[TrinityHTTPClient] = None,
+                 max_workers: int = PROBE_WORKERS, per_host_limit: int = PER_HOST_LIMIT, ttl: int = LINK_HEALTH_TTL):
+        self.cache_file = cache_file
+        self.client = client or get_http_client()
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host_limit))
+        self._lock = threading.Lock()
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self.results: Dict[str, Dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            self.results = {}
+
+    def cached(self, url: str, max_age: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Return a stored result no older than max_age (default: the prober TTL) without touching the network"""
+        result = self.results.get(url)
+        max_age = self.ttl if max_age is None else max_age
+        if result and time.time() - result['checked_at'] < max_age:
+            return result
+        return None
+
+    def probe(self, url: str) -> Dict[str, Any]:
+        """Probe one URL: status, size, content type and redirect chain"""
+        with self._lock:
+            slot = self._host_slots[urlparse(url).netloc]
+        start = time.time()
+        with slot:
+            try:
+                response = self.client.head(url)
+                method = 'HEAD'
+                if response.status_code in HEAD_FALLBACK_STATUSES:
+                    response = self.client.get(url, headers={'Range': 'bytes=0-0'}, stream=True)
+                    response.close()
+                    method = 'GET'
+            except requests.RequestException as e:
+                return self._store(url, {
+                    'ok': False, 'status': None, 'size': None, 'content_type': None,
+                    'redirects': [], 'final_url': None, 'method': 'HEAD',
+                    'failure': classify_exception(e) or 'error', 'error': str(e)[:200],
+                    'elapsed': round(time.time() - start, 3)
+                })
+
+        headers = response.headers
+        size = None
+        if response.status_code == 206 and '/' in headers.get('Content-Range', ''):
+            total = headers['Content-Range'].rsplit('/', 1)[1]
+            size = int(total) if total.isdigit() else None
+        elif response.status_code == 200 and (headers.get('Content-Length') or '').isdigit():
+            size = int(headers['Content-Length'])
+
+        return self._store(url, {
+            'ok': response.status_code < 400,
+            'status': response.status_code,
+            'size': size,
+            'content_type': headers.get('Content-Type'),
+            'redirects': [r.headers.get('Location') for r in response.history],
+            'final_url': response.url,
+            'method': method,
+            'failure': classify_http_status(response.status_code),
+            'elapsed': round(time.time() - start, 3)
+        })
+
+    def _store(self, url: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        result['checked_at'] = time.time()
+        with self._lock:
+            self.results[url] = result
+        return result
+
+    def probe_many(self, urls: Iterable[str], force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Probe URLs concurrently (bounded per host), reusing fresh cached results unless forced"""
+        unique_urls = list(dict.fromkeys(urls))
+        results = {}
+        to_probe = []
+        for url in unique_urls:
+            cached = None if force else self.cached(url)
+            if cached:
+                results[url] = cached
+            else:
+                to_probe.append(url)
+        if to_probe:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="TrinityProbe") as pool:
+                results.update(zip(to_probe, pool.map(self.probe, to_probe)))
+            self.save()
+        return results
+
+    def save(self):
+        with self._lock:
+            snapshot = dict(self.results)
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_name(self.cache_file.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=1)
+            tmp_path.replace(self.cache_file)
+        except OSError:
+            pass
+
+
+def _format_size(size: Optional[int]) -> str:
+    return f"{size / 1024 ** 2:.0f}MB" if size else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe every catalog URL and report dead or stale links")
+    parser.add_argument("--catalog", choices=list(CATALOG_FILES) + ['all'], default='all')
+    parser.add_argument("--force", action="store_true", help="Ignore cached results")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT, help="Concurrent probes per host")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    parser.add_argument("--bad-only", action="store_true", help="Only list failing links")
+    args = parser.parse_args()
+
+    catalogs = list(CATALOG_FILES) if args.catalog == 'all' else [args.catalog]
+    entries = iter_catalog_entries(Path(__file__).parent, catalogs)
+    prober = LinkProber(per_host_limit=args.per_host)
+
+    start = time.time()
+    results = prober.probe_many((entry['url'] for entry in entries), force=args.force)
+    elapsed = time.time() - start
+
+    rows = [dict(entry, **results[entry['url']]) for entry in entries]
+    if args.bad_only:
+        rows = [row for row in rows if not row['ok']]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    for row in rows:
+        icon = "✅" if row['ok'] else "❌"
+        status = row['status'] or row.get('failure')
+        redirect = f" -> {urlparse(row['final_url']).netloc}" if row['redirects'] and row['final_url'] else ""
+        print(f"{icon} {status!s:<5} {_format_size(row['size']):>7}  {row['catalog']}/{row['list']}: "
+              f"{row['name']}{redirect}")
+        if not row['ok']:
+            print(f"      {row['url']}  ({row.get('error') or row.get('failure')})")
+    bad = sum(1 for entry in entries if not results[entry['url']]['ok'])
+    print(f"\n📊 {len(entries)} links, {bad} failing, probed in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
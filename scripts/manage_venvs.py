@@ -4,8 +4,16 @@ import sys
 import subprocess
 import json
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.venv_snapshot import restore_snapshot, VENV_SNAPSHOTS_ENABLED
+from scripts.venv_layers import ensure_base_venv, attach_base_layer, VENV_LAYERS_ENABLED
+from scripts.webui_installer import webui_spec_hash, webui_base_layer, WEBUI_CONFIGS
+
 PROJECT_ROOT = Path.cwd()
 WEBUI_ROOT = Path('/content')
 PIP_CACHE_DIR = WEBUI_ROOT / '.pip_cache'
@@ -31,8 +39,20 @@ TOOL_CONFIG = {
     },
 }
 
+# WebUIs bootstrapped at once; each one's clone, venv and pip upgrade run on its own thread
+BOOTSTRAP_WORKERS = int(os.environ.get('TRINITY_BOOTSTRAP_WORKERS', str(len(TOOL_CONFIG))))
+
+_print_lock = threading.Lock()
+_context = threading.local()
+
+def emit(line):
+    """Print one whole line, prefixed with the WebUI this thread is setting up"""
+    tool_name = getattr(_context, 'tool_name', None)
+    with _print_lock:
+        print(f"[{tool_name}] {line}" if tool_name else line, flush=True)
+
 def log_message(message):
-    print(f"[VenvManager] {message}")
+    emit(f"[VenvManager] {message}")
 
 def run_command_with_live_output(command, cwd):
     log_message(f"Executing: {command}")
@@ -43,7 +63,7 @@ def run_command_with_live_output(command, cwd):
             errors='replace', bufsize=1
         )
         for line in iter(process.stdout.readline, ''):
-            print(f"  > {line.strip()}")
+            emit(f"  > {line.strip()}")
         return process.wait() == 0
     except Exception as e:
         log_message(f"❌ Command exception: {e}")
@@ -66,9 +86,19 @@ def setup_basic_webui(tool_name, config):
     venv_path = tool_path / 'venv'
     python_exe = PYTHON_EXECUTABLES.get(config["python_version"])
     if not venv_path.is_dir():
-        log_message(f"Creating venv with {python_exe}...")
-        if not run_command_with_live_output(f"{python_exe} -m venv {venv_path}", cwd=tool_path):
-            return False
+        restored = {'ok': False}
+        if VENV_SNAPSHOTS_ENABLED and tool_name in WEBUI_CONFIGS:
+            restored = restore_snapshot(tool_name, venv_path, webui_spec_hash(tool_name))
+            log_message(f"{'📦' if restored['ok'] else 'ℹ️'} {restored['message']}")
+        if not restored['ok']:
+            log_message(f"Creating venv with {python_exe}...")
+            if not run_command_with_live_output(f"{python_exe} -m venv {venv_path}", cwd=tool_path):
+                return False
+            # The torch stack lives in a base venv shared by every WebUI with the same Python and pins
+            base_path = webui_base_layer(tool_name) if VENV_LAYERS_ENABLED and tool_name in WEBUI_CONFIGS else None
+            if base_path and ensure_base_venv(base_path, python_exe):
+                attach_base_layer(venv_path, base_path)
+                log_message(f"Attached shared base layer {base_path.name}")
     else:
         log_message(f"{tool_name} virtual environment already exists")
 
@@ -81,18 +111,36 @@ def setup_basic_webui(tool_name, config):
     log_message(f"✅ {tool_name} basic setup complete!")
     return True
 
+def bootstrap_webui(tool_name, config):
+    """setup_basic_webui on a worker thread: output prefixed with tool_name, exceptions fail only this tool"""
+    _context.tool_name = tool_name
+    try:
+        return setup_basic_webui(tool_name, config)
+    except Exception as e:
+        log_message(f"❌ Setup raised: {e}")
+        return False
+    finally:
+        _context.tool_name = None
+
 def main():
     """Setup all WebUI repositories and basic virtual environments"""
     log_message("Setting up basic WebUI repositories and virtual environments...")
     all_successful = True
+    start = time.perf_counter()
+    
+    # Clones, venv creation and pip upgrades of different WebUIs overlap; the total approaches the slowest one
+    with ThreadPoolExecutor(max_workers=max(1, BOOTSTRAP_WORKERS), thread_name_prefix="TrinityVenv") as pool:
+        futures = {tool_name: pool.submit(bootstrap_webui, tool_name, config)
+                   for tool_name, config in TOOL_CONFIG.items()}
     
-    for tool_name, config in TOOL_CONFIG.items():
-        if not setup_basic_webui(tool_name, config):
+    for tool_name, future in futures.items():
+        if not future.result():
             all_successful = False
             log_message(f"❌ Failed to setup {tool_name}")
         else:
             log_message(f"✅ {tool_name} basic setup successful")
     
+    log_message(f"Bootstrap of {len(TOOL_CONFIG)} WebUIs took {time.perf_counter() - start:.1f}s")
     if all_successful:
         log_message("✅ All WebUI basic setups completed successfully")
     else:
@@ -0,0 +1,141 @@
+"""
+TrinityUI Negative URL Cache
+Remembers failing asset URLs by failure class so known-bad links are skipped during planning
+"""
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from scripts.download_tasks import DownloadTask
+
+CACHE_DIR = Path('/tmp/trinity_cache')
+NEGATIVE_CACHE_FILE = CACHE_DIR / 'negative_urls.json'
+
+# How long each failure class is trusted before the URL is tried again (seconds)
+FAILURE_EXPIRY = {
+    'not_found': 7 * 24 * 3600,  # 404/410: dead Civitai IDs, renamed HF files
+    'unauthorized': 3600,        # 401/403: may work with a (different) token
+    'server_error': 15 * 60,     # 5xx after retries
+    'dns': 10 * 60,              # name resolution failed
+    'timeout': 5 * 60,           # connect/read timeout
+}
+
+# Classes that are skipped outright; the rest only produce a warning
+SKIP_CLASSES = {'not_found', 'unauthorized'}
+
+# aria2c exit statuses (see `man aria2c`, EXIT STATUS)
+ARIA2C_EXIT_CLASSES = {
+    2: 'timeout',
+    3: 'not_found',
+    19: 'dns',
+    24: 'unauthorized',
+}
+
+
+def classify_http_status(status: int) -> Optional[str]:
+    if status in (404, 410):
+        return 'not_found'
+    if status in (401, 403):
+        return 'unauthorized'
+    if status >= 500:
+        return 'server_error'
+    return None
+
+
+def classify_exception(error: BaseException) -> Optional[str]:
+    """Map a requests exception to a failure class"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return classify_http_status(error.response.status_code)
+    if isinstance(error, requests.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.ConnectionError):
+        text = str(error)
+        if 'NameResolutionError' in text or 'Name or service not known' in text or 'getaddrinfo' in text:
+            return 'dns'
+        return 'timeout' if 'timed out' in text else None
+    return None
+
+
+def classify_aria2c_failure(returncode: int, output: str = '') -> Optional[str]:
+    """Map an aria2c exit status (or the HTTP status in its output) to a failure class"""
+    if returncode in ARIA2C_EXIT_CLASSES:
+        return ARIA2C_EXIT_CLASSES[returncode]
+    match = re.search(r'status=(\d{3})', output or '')
+    return classify_http_status(int(match.group(1))) if match else None
+
+
+class NegativeURLCache:
+    def __init__(self, cache_file: Path = NEGATIVE_CACHE_FILE):
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self.entries: Dict[str, Dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, url: str, has_token: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the unexpired failure entry for url, if any"""
+        entry = self.entries.get(url)
+        if not entry:
+            return None
+        if time.time() >= entry['expires_at']:
+            self.clear(url)
+            return None
+        # An auth failure recorded without a token says nothing about a request with one
+        if entry['failure'] == 'unauthorized' and has_token and not entry.get('had_token'):
+            return None
+        return entry
+
+    def should_skip(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return bool(entry) and entry['failure'] in SKIP_CLASSES
+
+    def record_failure(self, url: str, failure: str, detail: str = '', had_token: bool = False):
+        now = time.time()
+        with self._lock:
+            previous = self.entries.get(url, {})
+            self.entries[url] = {
+                'failure': failure,
+                'detail': detail[:200],
+                'had_token': had_token,
+                'failed_at': now,
+                'expires_at': now + FAILURE_EXPIRY.get(failure, 300),
+                'count': previous.get('count', 0) + 1,
+            }
+
+    def clear(self, url: str):
+        with self._lock:
+            self.entries.pop(url, None)
+
+    def save(self):
+        with self._lock:
+            snapshot = dict(self.entries)
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_name(self.cache_file.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=1)
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            pass
+
+
+def partition_known_bad(tasks: List[DownloadTask], cache: NegativeURLCache,
+                        has_token: bool = False) -> Tuple[List[DownloadTask], List[Tuple[DownloadTask, Dict[str, Any]]]]:
+    """Split planned download tasks into (kept, skipped); skipped items are (task, failure entry)"""
+    kept, skipped = [], []
+    for task in tasks:
+        entry = cache.get(task.url, has_token)
+        if cache.should_skip(entry):
+            skipped.append((task, entry))
+        else:
+            if entry:
+                task.recent_failure = entry
+            kept.append(task)
+    return kept, skipped
@@ -0,0 +1,366 @@
+"""
+TrinityUI Pack Extractor
+Streams zip/tar archives of models (LoRA and embedding collections) straight into a model directory,
+validating each member as it arrives; the archive itself is never written to disk
+
+A catalog entry becomes a pack with 'type': "pack":
+    {'url': "https://.../loras.zip", 'name': "Anime-LoRA-Pack.zip", 'type': "pack",
+     'include': ["*.safetensors"], 'strip_components': 1}
+"""
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import struct
+import tarfile
+import time
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from scripts.http_client import get_http_client, TrinityHTTPClient, DOWNLOAD_CHUNK_SIZE
+from scripts.download_staging import staging_path, check_header, commit_staged, discard_staged
+from scripts.page_cache import CacheDropper
+from scripts.negative_cache import classify_exception
+
+PACK_MANIFEST_DIR = '.trinity-packs'
+# Members extracted when the catalog entry has no 'include' patterns
+PACK_MEMBER_PATTERNS = ['*.safetensors', '*.ckpt', '*.pt', '*.pth', '*.bin']
+# Upper bound on the bytes one pack may extract (guards against decompression bombs)
+PACK_MAX_BYTES = int(os.environ.get('TRINITY_PACK_MAX_BYTES', str(200 * 1024 ** 3)))
+
+ZIP_LOCAL_SIG = b'PK\x03\x04'
+ZIP_DESCRIPTOR_SIG = b'PK\x07\x08'
+# Any of these after the last member means the central directory has started
+ZIP_TRAILER_SIGS = (b'PK\x01\x02', b'PK\x05\x06', b'PK\x06\x06', b'PK\x06\x07', b'PK\x05\x05')
+ZIP_LOCAL_HEADER = struct.Struct('<HHHHHIIIHH')
+ZIP64_EXTRA_ID = 0x0001
+
+
+class PackError(Exception):
+    """The archive is malformed, unsupported or failed verification"""
+
+
+class _ResponseStream(io.RawIOBase):
+    """Readable view of a streamed response body that hashes and counts the bytes as they pass"""
+
+    def __init__(self, chunks: Iterator[bytes], progress_callback: Optional[Callable[[int], None]] = None):
+        self.chunks = chunks
+        self.pending = b''
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+        self.progress_callback = progress_callback
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = chunk
+            self.digest.update(chunk)
+            self.bytes_read += len(chunk)
+            if self.progress_callback:
+                self.progress_callback(self.bytes_read)
+        count = min(len(buffer), len(self.pending))
+        buffer[:count] = self.pending[:count]
+        self.pending = self.pending[count:]
+        return count
+
+
+class _PushbackReader:
+    """Buffered reader that can take back bytes a decompressor read past the end of a member"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.pushed = b''
+
+    def read(self, size: int) -> bytes:
+        if self.pushed:
+            data, self.pushed = self.pushed[:size], self.pushed[size:]
+            return data
+        return self.stream.read(size)
+
+    def read_exact(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self.read(size - len(data))
+            if not chunk:
+                raise PackError("archive is truncated")
+            data += chunk
+        return data
+
+    def unread(self, data: bytes):
+        self.pushed = data + self.pushed
+
+
+def _zip64_sizes(extra: bytes, compressed: int, uncompressed: int) -> Tuple[int, int, bool]:
+    """Replace 0xFFFFFFFF sizes with the ZIP64 extra field values; returns (compressed, uncompressed, zip64)"""
+    position = 0
+    while position + 4 <= len(extra):
+        header_id, length = struct.unpack_from('<HH', extra, position)
+        if header_id == ZIP64_EXTRA_ID:
+            values = extra[position + 4:position + 4 + length]
+            offset = 0
+            if uncompressed == 0xFFFFFFFF:
+                (uncompressed,) = struct.unpack_from('<Q', values, offset)
+                offset += 8
+            if compressed == 0xFFFFFFFF:
+                (compressed,) = struct.unpack_from('<Q', values, offset)
+            return compressed, uncompressed, True
+        position += 4 + length
+    return compressed, uncompressed, False
+
+
+def iter_zip_members(stream) -> Iterator[Tuple[str, Iterator[bytes]]]:
+    """Yield (name, chunks) for each member of a zip read front to back from local headers.
+
+    zipfile needs the central directory at the end of a seekable file; streaming only works because
+    every local header is followed by its data. CRC and size are checked as each member is read.
+    Unread data is skipped before the next member.
+    """
+    reader = _PushbackReader(stream)
+    while True:
+        signature = reader.read(4)
+        if not signature or signature in ZIP_TRAILER_SIGS:
+            return
+        if len(signature) < 4:
+            raise PackError("archive is truncated")
+        if signature != ZIP_LOCAL_SIG:
+            raise PackError("not a zip archive or corrupt member header")
+        (_, flags, method, _, _, crc, compressed, uncompressed,
+         name_length, extra_length) = ZIP_LOCAL_HEADER.unpack(reader.read_exact(ZIP_LOCAL_HEADER.size))
+        name = reader.read_exact(name_length).decode('utf-8' if flags & 0x800 else 'cp437')
+        compressed, uncompressed, zip64 = _zip64_sizes(reader.read_exact(extra_length), compressed, uncompressed)
+        has_descriptor = bool(flags & 0x08)
+        if flags & 0x01:
+            raise PackError(f"{name}: encrypted members are not supported")
+        if method not in (0, 8):
+            raise PackError(f"{name}: unsupported compression method {method}")
+        if method == 0 and has_descriptor:
+            raise PackError(f"{name}: stored member without a size cannot be streamed")
+
+        state = {'crc': 0, 'size': 0}
+
+        def chunks() -> Iterator[bytes]:
+            if method == 0:
+                remaining = uncompressed
+                while remaining:
+                    data = reader.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+                    if not data:
+                        raise PackError(f"{name}: archive is truncated")
+                    remaining -= len(data)
+                    state['crc'] = zlib.crc32(data, state['crc'])
+                    state['size'] += len(data)
+                    yield data
+                return
+            decompressor = zlib.decompressobj(-15)
+            remaining = None if has_descriptor else compressed
+            while not decompressor.eof:
+                if remaining == 0:
+                    raise PackError(f"{name}: deflate stream is truncated")
+                data = reader.read(DOWNLOAD_CHUNK_SIZE if remaining is None else min(DOWNLOAD_CHUNK_SIZE, remaining))
+                if not data:
+                    raise PackError(f"{name}: archive is truncated")
+                if remaining is not None:
+                    remaining -= len(data)
+                # Bounded output per call keeps memory flat whatever the compression ratio;
+                # output held back by the bound is drained before more input is read
+                while not decompressor.eof:
+                    out = decompressor.decompress(data, DOWNLOAD_CHUNK_SIZE)
+                    data = decompressor.unconsumed_tail
+                    if not out and not data:
+                        break
+                    if out:
+                        state['crc'] = zlib.crc32(out, state['crc'])
+                        state['size'] += len(out)
+                        yield out
+            if decompressor.unused_data:
+                reader.unread(decompressor.unused_data)
+
+        member_chunks = chunks()
+        yield name, member_chunks
+        for _ in member_chunks:
+            pass
+
+        if has_descriptor:
+            head = reader.read_exact(4)
+            if head == ZIP_DESCRIPTOR_SIG:
+                head = reader.read_exact(4)
+            (crc,) = struct.unpack('<I', head)
+            size_format = '<QQ' if zip64 else '<II'
+            _, uncompressed = struct.unpack(size_format, reader.read_exact(struct.calcsize(size_format)))
+        if state['size'] != uncompressed or state['crc'] != crc:
+            raise PackError(f"{name}: CRC or size mismatch")
+
+
+def iter_tar_members(stream) -> Iterator[Tuple[str, Iterator[bytes]]]:
+    """Yield (name, chunks) for each regular file of a (possibly compressed) tar stream"""
+    try:
+        with tarfile.open(fileobj=stream, mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    # Links and devices are never materialized from downloaded archives
+                    continue
+                f = archive.extractfile(member)
+                yield member.name, iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b'')
+    except tarfile.TarError as e:
+        raise PackError(f"invalid tar archive: {e}")
+
+
+def member_destination(name: str, strip_components: int = 0,
+                       include: Optional[List[str]] = None) -> Tuple[Optional[PurePosixPath], str]:
+    """Map an archive member name to a safe relative path; returns (path or None, reason)"""
+    name = name.replace('\\', '/')
+    if name.endswith('/'):
+        return None, "directory"
+    path = PurePosixPath(name)
+    if path.is_absolute() or '..' in path.parts:
+        return None, "unsafe path"
+    parts = path.parts[strip_components:]
+    if not parts:
+        return None, "directory"
+    if any(part.startswith('.') or part == '__MACOSX' for part in parts):
+        return None, "hidden or metadata file"
+    relative = PurePosixPath(*parts)
+    if not any(fnmatch.fnmatch(relative.name.lower(), pattern.lower()) for pattern in include or PACK_MEMBER_PATTERNS):
+        return None, "not a model file"
+    return relative, ""
+
+
+def pack_manifest_path(target_dir: Path, name: str) -> Path:
+    return Path(target_dir) / PACK_MANIFEST_DIR / f"{name}.json"
+
+
+def load_pack_manifest(target_dir: Path, name: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(pack_manifest_path(target_dir, name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def pack_installed(target_dir: Path, name: str, url: str) -> bool:
+    """True if the pack was extracted from this URL and every member is still in place"""
+    manifest = load_pack_manifest(target_dir, name)
+    if not manifest or manifest.get('url') != url:
+        return False
+    for member in manifest.get('members', []):
+        path = Path(target_dir) / member['path']
+        if not path.exists() or path.stat().st_size != member['size']:
+            return False
+    return True
+
+
+class PackExtractor:
+    def __init__(self, client: Optional[TrinityHTTPClient] = None, max_bytes: int = PACK_MAX_BYTES):
+        self.client = client or get_http_client()
+        self.max_bytes = max_bytes
+
+    def extract(self, url: str, target_dir: Path, name: str, options: Optional[Dict[str, Any]] = None,
+                expected: Optional[Dict[str, Any]] = None,
+                progress_callback: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+        """Stream the archive at url into target_dir and publish the members once the whole archive verified.
+
+        options are the catalog entry's 'include' and 'strip_components'; expected is resolver metadata
+        for the archive itself. Returns {'ok', 'message', 'members', 'skipped', 'archive_sha256'};
+        each member is {'path', 'size', 'sha256'}.
+        """
+        options = options or {}
+        expected = expected or {}
+        target_dir = Path(target_dir)
+        staged: Dict[PurePosixPath, Dict[str, Any]] = {}
+        skipped: List[Dict[str, str]] = []
+        try:
+            with self.client.get(url, stream=True) as response:
+                response.raise_for_status()
+                length = None if response.headers.get('Content-Encoding') else response.headers.get('Content-Length')
+                total = int(length) if length and length.isdigit() else expected.get('size')
+                raw = _ResponseStream(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE),
+                                      (lambda done: progress_callback(done, total)) if progress_callback else None)
+                stream = io.BufferedReader(raw, buffer_size=DOWNLOAD_CHUNK_SIZE)
+                members = iter_zip_members(stream) if stream.peek(4)[:4] == ZIP_LOCAL_SIG else iter_tar_members(stream)
+                extracted_bytes = 0
+                for member_name, chunks in members:
+                    relative, reason = member_destination(member_name, int(options.get('strip_components', 0)),
+                                                          options.get('include'))
+                    if relative is None:
+                        if reason != "directory":
+                            skipped.append({'name': member_name, 'reason': reason})
+                        continue
+                    record = self._stage_member(target_dir / relative, chunks, self.max_bytes - extracted_bytes)
+                    extracted_bytes += record['size']
+                    previous = staged.pop(relative, None)
+                    if previous:
+                        discard_staged(previous['part_path'])
+                    error = check_header(record['part_path'], relative.name)
+                    if error:
+                        discard_staged(record['part_path'])
+                        skipped.append({'name': member_name, 'reason': error})
+                        continue
+                    staged[relative] = record
+                # Drain anything after the last member so the archive hash covers the whole body
+                while stream.read(DOWNLOAD_CHUNK_SIZE):
+                    pass
+
+            archive_sha256 = raw.digest.hexdigest()
+            # Content-Length and the resolver's size count encoded bytes, so only identity bodies compare
+            if not response.headers.get('Content-Encoding'):
+                expected_size = int(length) if length and length.isdigit() else expected.get('size')
+                if expected_size is not None and raw.bytes_read != expected_size:
+                    raise PackError(f"incomplete download: {raw.bytes_read} of {expected_size} bytes")
+            if expected.get('sha256') and archive_sha256 != expected['sha256']:
+                raise PackError("archive SHA-256 mismatch")
+            if not staged:
+                raise PackError("archive contains no model files")
+        except (PackError, requests.RequestException, OSError, EOFError, zlib.error) as e:
+            for record in staged.values():
+                discard_staged(record['part_path'])
+            failure = classify_exception(e) if isinstance(e, requests.RequestException) else None
+            return {'ok': False, 'message': f"Pack {name} failed: {e}", 'members': [], 'skipped': skipped,
+                    'archive_sha256': None, 'failure': failure}
+
+        members = []
+        for relative, record in staged.items():
+            commit_staged(record['part_path'], target_dir / relative)
+            members.append({'path': str(relative), 'size': record['size'], 'sha256': record['sha256']})
+        self._write_manifest(target_dir, name, url, archive_sha256, members, skipped)
+        return {'ok': True, 'message': f"Extracted {len(members)} files from pack {name}",
+                'members': members, 'skipped': skipped, 'archive_sha256': archive_sha256}
+
+    def _stage_member(self, file_path: Path, chunks: Iterator[bytes], budget: int) -> Dict[str, Any]:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = staging_path(file_path)
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(part_path, 'wb') as f:
+                dropper = CacheDropper(f, file_path)
+                for chunk in chunks:
+                    written += len(chunk)
+                    if written > budget:
+                        raise PackError(f"pack exceeds {self.max_bytes} extracted bytes")
+                    f.write(chunk)
+                    digest.update(chunk)
+                    dropper.advance(written)
+                f.flush()
+                dropper.finish()
+        except BaseException:
+            discard_staged(part_path)
+            raise
+        return {'part_path': part_path, 'size': written, 'sha256': digest.hexdigest()}
+
+    def _write_manifest(self, target_dir: Path, name: str, url: str, archive_sha256: str,
+                        members: List[Dict[str, Any]], skipped: List[Dict[str, str]]):
+        manifest_path = pack_manifest_path(target_dir, name)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'archive_sha256': archive_sha256, 'extracted_at': time.time(),
+                       'members': members, 'skipped': skipped}, f, indent=1)
+        os.replace(tmp_path, manifest_path)
@@ -0,0 +1,181 @@
+"""
+TrinityUI Page Cache Hygiene
+Drops finished ranges of large downloads, hashes and copies from the page cache (posix_fadvise DONTNEED)
+so venv libraries and the checkpoint the WebUI loads next stay cached
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO, FrozenSet, Iterable, Optional
+
+CACHE_DIR = Path('/tmp/trinity_cache')
+LOAD_NEXT_FILE = CACHE_DIR / 'load_next.json'
+
+FADVISE_AVAILABLE = hasattr(os, 'posix_fadvise')
+# Set TRINITY_PAGE_CACHE_DROP=0 to leave the kernel's default caching alone
+DROP_ENABLED = FADVISE_AVAILABLE and os.environ.get('TRINITY_PAGE_CACHE_DROP', '1') != '0'
+# Ranges are dropped once this far behind the write/read position, giving writeback time to finish
+DROP_WINDOW = 64 * 1024 * 1024
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+# sync_file_range(2) flags: write back a range and wait for it, without flushing the rest of the file
+SYNC_FILE_RANGE_WAIT_BEFORE = 1
+SYNC_FILE_RANGE_WRITE = 2
+SYNC_FILE_RANGE_WAIT_AFTER = 4
+
+# (mtime_ns, paths) of the last read of LOAD_NEXT_FILE; checked once per file on large selections
+_load_next_cache = (None, frozenset())
+
+
+def _load_sync_file_range():
+    """libc's sync_file_range, or None off Linux"""
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return None
+    try:
+        function = ctypes.CDLL(libc_name, use_errno=True).sync_file_range
+    except (OSError, AttributeError):
+        return None
+    function.argtypes = [ctypes.c_int, ctypes.c_int64, ctypes.c_int64, ctypes.c_uint]
+    function.restype = ctypes.c_int
+    return function
+
+
+_sync_file_range = _load_sync_file_range() if FADVISE_AVAILABLE else None
+
+
+def write_back(fd: int, offset: int, length: int):
+    """Write a range's dirty pages to disk and wait, since DONTNEED skips dirty pages"""
+    flags = SYNC_FILE_RANGE_WAIT_BEFORE | SYNC_FILE_RANGE_WRITE | SYNC_FILE_RANGE_WAIT_AFTER
+    if _sync_file_range is not None and _sync_file_range(fd, offset, length, flags) == 0:
+        return
+    os.fdatasync(fd)
+
+
+def _load_load_next() -> FrozenSet[str]:
+    global _load_next_cache
+    try:
+        mtime_ns = os.stat(LOAD_NEXT_FILE).st_mtime_ns
+    except OSError:
+        return frozenset()
+    if _load_next_cache[0] != mtime_ns:
+        try:
+            with open(LOAD_NEXT_FILE, 'r', encoding='utf-8') as f:
+                _load_next_cache = (mtime_ns, frozenset(json.load(f)))
+        except (OSError, ValueError):
+            return frozenset()
+    return _load_next_cache[1]
+
+
+def mark_load_next(paths: Iterable[Path]):
+    """Record files the WebUI is about to load; they are never dropped from the cache"""
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(LOAD_NEXT_FILE, 'w', encoding='utf-8') as f:
+            json.dump(sorted(str(Path(p)) for p in paths), f, indent=1)
+    except OSError:
+        pass
+
+
+def is_load_next(path: Path) -> bool:
+    return str(Path(path)) in _load_load_next()
+
+
+class CacheDropper:
+    """Tracks progress through one file and drops the ranges that are done with"""
+
+    def __init__(self, f: BinaryIO, path: Optional[Path] = None, window: int = DROP_WINDOW):
+        self.fd = f.fileno()
+        self.writable = f.writable()
+        self.window = window
+        self.dropped_until = 0
+        # Staged downloads are checked against their final name
+        if path is not None and str(path).endswith('.part'):
+            path = Path(str(path)[:-len('.part')])
+        self.enabled = DROP_ENABLED and not (path is not None and is_load_next(path))
+
+    def advance(self, position: int):
+        """Drop everything more than one window behind position"""
+        if not self.enabled:
+            return
+        limit = position - self.window
+        if limit - self.dropped_until >= self.window:
+            # Written ranges are usually still dirty this soon and would not be dropped otherwise
+            if self.writable:
+                try:
+                    write_back(self.fd, self.dropped_until, limit - self.dropped_until)
+                except OSError:
+                    pass
+            self._drop(self.dropped_until, limit - self.dropped_until)
+            self.dropped_until = limit
+
+    def finish(self):
+        """Drop the rest of a large file; small files are left to the kernel.
+
+        Python-level buffers must be flushed by the caller first.
+        """
+        if not self.enabled or self.dropped_until == 0:
+            return
+        if self.writable:
+            try:
+                # DONTNEED skips dirty pages, so the tail has to be written back first
+                os.fdatasync(self.fd)
+            except OSError:
+                pass
+        self._drop(0, 0)
+
+    def _drop(self, offset: int, length: int):
+        try:
+            os.posix_fadvise(self.fd, offset, length, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            self.enabled = False
+
+
+def drop_file_cache(path: Path):
+    """Drop a completed file (e.g. written by aria2c) from the page cache unless it is loaded next"""
+    path = Path(path)
+    if not DROP_ENABLED or is_load_next(path):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        # DONTNEED skips dirty pages, so make sure the data has been written back first
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def open_sequential(path: Path) -> BinaryIO:
+    """Open a file for a single sequential pass (hashing); pair with CacheDropper"""
+    f = open(path, 'rb')
+    if FADVISE_AVAILABLE:
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+    return f
+
+
+def copy_file_uncached(source: Path, destination: Path, chunk_size: int = COPY_CHUNK_SIZE):
+    """shutil.copy2 equivalent that keeps neither side of a large copy in the page cache"""
+    with open_sequential(source) as src, open(destination, 'wb') as dst:
+        src_dropper = CacheDropper(src, source)
+        dst_dropper = CacheDropper(dst, destination)
+        position = 0
+        for chunk in iter(lambda: src.read(chunk_size), b''):
+            dst.write(chunk)
+            position += len(chunk)
+            src_dropper.advance(position)
+            dst_dropper.advance(position)
+        dst.flush()
+        src_dropper.finish()
+        dst_dropper.finish()
+    shutil.copystat(source, destination)
@@ -0,0 +1,144 @@
+"""
+TrinityUI pip Locks
+Per-WebUI lockfiles generated from pip's installation report: exact versions, sha256 hashes and wheel URLs,
+installed later with `--require-hashes --no-deps` and no resolver run
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+LOCK_DIR = Path(os.environ.get('TRINITY_LOCK_DIR', str(Path(__file__).parent.parent / 'locks')))
+PIP_LOCKS_ENABLED = os.environ.get('TRINITY_PIP_LOCKS', '1') != '0'
+
+LOCK_LINE_RE = re.compile(r'^(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)==(?P<version>\S+)\s+--hash=sha256:(?P<sha256>[0-9a-f]{64})'
+                          r'(?:\s+#\s*(?P<url>\S+))?$')
+HEADER_RE = re.compile(r'^#\s*(?P<key>[a-z-]+):\s*(?P<value>.*)$')
+
+
+def lock_path(webui_choice: str, lock_dir: Path = LOCK_DIR) -> Path:
+    return Path(lock_dir) / f"{webui_choice}.lock"
+
+
+def lock_from_report(report: Dict[str, Any], header: Dict[str, str]) -> Dict[str, Any]:
+    """{'text', 'packages', 'unlockable'} for a `pip install --report`; unlockable lists entries without a
+    sha256 archive (VCS, local directories, indexes that publish no hashes), which make a lock unusable"""
+    packages, unlockable = {}, []
+    for item in report.get('install', []):
+        name, version = item['metadata']['name'], item['metadata']['version']
+        download_info = item.get('download_info', {})
+        sha256 = download_info.get('archive_info', {}).get('hashes', {}).get('sha256')
+        if not sha256 or download_info.get('url', '').startswith('file:'):
+            unlockable.append(f"{name}=={version}")
+            continue
+        packages[name.lower()] = {'name': name, 'version': version, 'sha256': sha256, 'url': download_info['url']}
+
+    lines = [f"# {key}: {value}" for key, value in header.items()]
+    lines += [f"{entry['name']}=={entry['version']} --hash=sha256:{entry['sha256']}  # {entry['url']}"
+              for _, entry in sorted(packages.items())]
+    return {'text': '\n'.join(lines) + '\n', 'packages': packages, 'unlockable': unlockable}
+
+
+def parse_lock(path: Path) -> Optional[Dict[str, Any]]:
+    """{'header': {key: value}, 'packages': {lowercase name: {'name', 'version', 'sha256', 'url'}}}, or None"""
+    try:
+        text = Path(path).read_text(encoding='utf-8')
+    except OSError:
+        return None
+    header, packages = {}, {}
+    for line in text.splitlines():
+        line = line.strip()
+        match = HEADER_RE.match(line)
+        if match:
+            header[match.group('key')] = match.group('value')
+            continue
+        match = LOCK_LINE_RE.match(line)
+        if match:
+            packages[match.group('name').lower()] = match.groupdict()
+    return {'header': header, 'packages': packages}
+
+
+def diff_locks(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, List[str]]:
+    """{'added', 'removed', 'changed', 'rehashed'}; rehashed means same version, different file"""
+    old_packages = old['packages'] if old else {}
+    new_packages = new['packages']
+    diff = {'added': [], 'removed': [], 'changed': [], 'rehashed': []}
+    for key in sorted(set(old_packages) | set(new_packages)):
+        before, after = old_packages.get(key), new_packages.get(key)
+        if before is None:
+            diff['added'].append(f"{after['name']}=={after['version']}")
+        elif after is None:
+            diff['removed'].append(f"{before['name']}=={before['version']}")
+        elif before['version'] != after['version']:
+            diff['changed'].append(f"{after['name']} {before['version']} -> {after['version']}")
+        elif before['sha256'] != after['sha256']:
+            diff['rehashed'].append(f"{after['name']}=={after['version']}")
+    return diff
+
+
+def describe_diff(diff: Dict[str, List[str]]) -> str:
+    lines = []
+    for kind, symbol in (('added', '+'), ('removed', '-'), ('changed', '~'), ('rehashed', '#')):
+        lines += [f"  {symbol} {entry}" for entry in diff[kind]]
+    return '\n'.join(lines) or '  (no changes)'
+
+
+def write_lock(path: Path, text: str):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(text, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def lock_header(webui_choice: str, spec_key: str, python_version: str) -> Dict[str, str]:
+    return {'trinity-lock': webui_choice, 'spec': spec_key, 'python': python_version,
+            'generated': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'refresh': f"python scripts/pip_lock.py refresh {webui_choice}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate, refresh and compare per-WebUI pip lockfiles")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    refresh = subparsers.add_parser("refresh", help="Resolve a WebUI's requirements again and rewrite its lock")
+    refresh.add_argument("webui", help="WebUI name, e.g. A1111")
+    diff = subparsers.add_parser("diff", help="Show what a refresh would change, or compare two lock files")
+    diff.add_argument("targets", nargs='+', help="A WebUI name, or two lock files")
+    show = subparsers.add_parser("show", help="Print a WebUI's lock summary")
+    show.add_argument("webui", help="WebUI name, e.g. A1111")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        lock = parse_lock(lock_path(args.webui))
+        if lock is None:
+            print(f"❌ No lock for {args.webui} at {lock_path(args.webui)}")
+            sys.exit(1)
+        print(f"🔒 {args.webui}: {len(lock['packages'])} packages, generated {lock['header'].get('generated', '?')}")
+        for entry in sorted(lock['packages'].values(), key=lambda entry: entry['name'].lower()):
+            print(f"  {entry['name']}=={entry['version']}")
+        return
+
+    if args.command == "diff" and len(args.targets) == 2:
+        old, new = parse_lock(Path(args.targets[0])), parse_lock(Path(args.targets[1]))
+        if new is None:
+            print(f"❌ Cannot read {args.targets[1]}")
+            sys.exit(1)
+        print(describe_diff(diff_locks(old, new)))
+        return
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from scripts.webui_installer import resolve_webui_lock
+    webui_choice = args.webui if args.command == "refresh" else args.targets[0]
+    result = resolve_webui_lock(webui_choice, write=args.command == "refresh")
+    if not result['ok']:
+        print(f"❌ {result['message']}")
+        sys.exit(1)
+    print(f"{'🔒 Wrote' if args.command == 'refresh' else '🔍 Would write'} {lock_path(webui_choice)}:")
+    print(describe_diff(result['diff']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+TrinityUI pip Resolution Cache
+Caches `pip install --dry-run --report` output keyed by requirements, interpreter, platform tags and indexes
+"""
+import hashlib
+import json
+import os
+import re
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+PIP_REPORT_CACHE_DIR = Path(os.environ.get('TRINITY_PIP_REPORT_CACHE', '/content/.trinity_pip_reports'))
+# Reports for requirements with any unpinned entry go stale as new releases land
+PIP_REPORT_TTL = int(os.environ.get('TRINITY_PIP_REPORT_TTL', str(24 * 3600)))
+PIP_REPORT_REFRESH = os.environ.get('TRINITY_PIP_REPORT_REFRESH', '0') == '1'
+INDEX_ENV_VARS = ('PIP_INDEX_URL', 'PIP_EXTRA_INDEX_URL', 'PIP_FIND_LINKS', 'PIP_NO_INDEX')
+
+INCLUDE_RE = re.compile(r'^(?:-r|--requirement|-c|--constraint)[\s=]+(\S+)')
+PINNED_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*(?:\[[^\]]*\])?\s*===?\s*[^\s*,;]+$')
+
+# Run inside the venv: what pip's resolver sees of the interpreter and platform
+FINGERPRINT_SCRIPT = """
+import json, sys
+import pip
+from pip._vendor.packaging.tags import sys_tags
+print(json.dumps({'python': sys.version, 'pip': pip.__version__, 'tags': [str(tag) for tag in sys_tags()]}))
+"""
+
+
+def read_requirements(requirements_file: Path, _seen: Optional[set] = None) -> Tuple[List[str], bool]:
+    """Contents of a requirements file and its -r/-c includes, and whether every requirement is pinned"""
+    requirements_file = Path(requirements_file).resolve()
+    seen = _seen if _seen is not None else set()
+    if requirements_file in seen:
+        return [], True
+    seen.add(requirements_file)
+
+    text = requirements_file.read_text(encoding='utf-8')
+    contents = [text]
+    pinned = True
+    for line in text.splitlines():
+        line = line.split(' #', 1)[0].strip()
+        if not line or line.startswith('#'):
+            continue
+        include = INCLUDE_RE.match(line)
+        if include:
+            nested, nested_pinned = read_requirements(requirements_file.parent / include.group(1), seen)
+            contents.extend(nested)
+            pinned = pinned and nested_pinned
+        elif not line.startswith('-'):
+            requirement = line.split(';', 1)[0].split(' --hash', 1)[0].strip()
+            pinned = pinned and bool(PINNED_RE.match(requirement))
+    return contents, pinned
+
+
+class PipResolutionCache:
+    def __init__(self, cache_dir: Path = PIP_REPORT_CACHE_DIR, ttl: int = PIP_REPORT_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+    @staticmethod
+    def fingerprint(venv_pip: Path) -> Dict[str, Any]:
+        """Interpreter, pip version, platform tags and index configuration of a venv"""
+        venv_python = Path(venv_pip).with_name('python')
+        result = subprocess.run([str(venv_python), '-c', FINGERPRINT_SCRIPT],
+                                capture_output=True, text=True, timeout=60, check=True)
+        fingerprint = json.loads(result.stdout)
+        config = subprocess.run([str(venv_python), '-m', 'pip', 'config', 'list'],
+                                capture_output=True, text=True, timeout=60)
+        fingerprint['pip_config'] = config.stdout
+        fingerprint['index_env'] = {name: os.environ.get(name) for name in INDEX_ENV_VARS}
+        return fingerprint
+
+    def key(self, venv_pip: Path, requirements_file: Path, extra_args: List[str]) -> Tuple[str, bool]:
+        """(cache key, all requirements pinned)"""
+        contents, pinned = read_requirements(requirements_file)
+        material = json.dumps({'requirements': contents, 'args': extra_args,
+                               'venv': self.fingerprint(venv_pip)}, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest(), pinned
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """A fresh cached report, or None; reports naming local files that are gone count as stale"""
+        try:
+            entry = json.loads((self.cache_dir / f"{key}.json").read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if not entry.get('pinned') and time.time() - entry.get('created', 0) > self.ttl:
+            return None
+        for item in entry['report'].get('install', []):
+            url = item.get('download_info', {}).get('url', '')
+            if url.startswith('file:') and not Path(url2pathname(urlparse(url).path)).exists():
+                return None
+        return entry['report']
+
+    def put(self, key: str, report: Dict[str, Any], pinned: bool):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'created': time.time(), 'pinned': pinned, 'report': report}),
+                            encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    def resolve(self, venv_pip: Path, requirements_file: Path, extra_args: List[str], cwd: Path,
+                refresh: bool = PIP_REPORT_REFRESH) -> Dict[str, Any]:
+        """pip's installation report for requirements_file, from cache unless refresh is set.
+
+        Returns {'report', 'cached', 'error'}; 'report' is None when pip could not resolve.
+        The report is made with --ignore-installed so it describes the full set regardless of what the
+        venv already has, and can be shared by every venv with the same fingerprint.
+        """
+        try:
+            key, pinned = self.key(venv_pip, requirements_file, extra_args)
+        except (OSError, ValueError, subprocess.SubprocessError):
+            # Without a fingerprint the report cannot be keyed safely; resolve uncached
+            key, pinned = None, False
+        report = None if refresh or not key else self.get(key)
+        if report is not None:
+            return {'report': report, 'cached': True, 'error': None}
+
+        cmd = [str(venv_pip), 'install', '--dry-run', '--ignore-installed', '--quiet', '--report', '-',
+               *extra_args, '-r', str(requirements_file)]
+        result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return {'report': None, 'cached': False, 'error': result.stderr.strip()[-500:]}
+        try:
+            report = json.loads(result.stdout)
+        except ValueError as e:
+            return {'report': None, 'cached': False, 'error': f"Unparseable pip report: {e}"}
+        if key:
+            self.put(key, report, pinned)
+        return {'report': report, 'cached': False, 'error': None}
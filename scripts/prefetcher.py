@@ -0,0 +1,205 @@
+"""
+TrinityUI Speculative Prefetcher
+Downloads the hub's preselected defaults at background priority while the user is still configuring;
+the installer adopts whatever is still selected, and deselected items are cancelled with their partial data kept
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from scripts.asset_metadata import AssetMetadataResolver
+from scripts.bandwidth_budget import get_bandwidth_budget, PRIORITY_BACKGROUND
+from scripts.download_staging import staging_path, verify_download, discard_staged
+
+CACHE_DIR = Path('/tmp/trinity_cache')
+PREFETCH_DIR = CACHE_DIR / 'prefetch'
+# Opt-in: TRINITY_PREFETCH=1 ticks the hub's prefetch checkbox by default
+PREFETCH_ENABLED = os.environ.get('TRINITY_PREFETCH', '0') == '1'
+# Oldest partial/complete prefetches are evicted beyond this
+PREFETCH_MAX_BYTES = int(os.environ.get('TRINITY_PREFETCH_MAX_BYTES', str(20 * 1024 ** 3)))
+CANCEL_TIMEOUT = 10
+
+
+def prefetch_path(url: str, prefetch_dir: Path = PREFETCH_DIR) -> Path:
+    """Cache location of a URL's prefetched data; the `.part` beside it is what aria2c writes"""
+    return prefetch_dir / hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+
+class SpeculativePrefetcher:
+    def __init__(self, prefetch_dir: Path = PREFETCH_DIR, max_bytes: int = PREFETCH_MAX_BYTES):
+        self.prefetch_dir = prefetch_dir
+        self.max_bytes = max_bytes
+        # url -> {'name', 'process', 'lease', 'state': 'running' | 'complete' | 'failed' | 'cancelled', 'expected'}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, items: Iterable[Dict[str, str]]) -> int:
+        """Start background downloads for catalog items ({'url', 'name'}); returns how many were started"""
+        items = [item for item in items if item.get('url')]
+        with self._lock:
+            items = [item for item in items
+                     if self.jobs.get(item['url'], {}).get('state') not in ('running', 'complete')]
+        if not items:
+            return 0
+        self.prefetch_dir.mkdir(parents=True, exist_ok=True)
+        self._evict()
+        # Metadata is cached, so this is usually free; it lets aria2c verify the hash as it finishes
+        metadata = AssetMetadataResolver().resolve_many(item['url'] for item in items)
+        started = 0
+        for item in items:
+            expected = metadata.get(item['url'], {})
+            if expected.get('failure'):
+                continue
+            self._launch(item['url'], item.get('name') or item['url'].split('/')[-1], expected)
+            started += 1
+        return started
+
+    def _launch(self, url: str, name: str, expected: Dict[str, Any]):
+        part_path = staging_path(prefetch_path(url, self.prefetch_dir))
+        lease = get_bandwidth_budget().register(f"prefetch:{name}", PRIORITY_BACKGROUND)
+        cmd = [
+            'aria2c',
+            *lease.aria2c_args(),
+            '--continue=true',
+            '--retry-wait=3',
+            '--max-tries=5',
+            '--console-log-level=error',
+            '--summary-interval=0',
+            '--dir', str(part_path.parent),
+            '--out', part_path.name
+        ]
+        if expected.get('sha256'):
+            cmd.append(f"--checksum=sha-256={expected['sha256']}")
+        cmd.append(url)
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            lease.release()
+            return
+        job = {'name': name, 'process': process, 'lease': lease, 'state': 'running', 'expected': expected}
+        with self._lock:
+            self.jobs[url] = job
+        threading.Thread(target=self._watch, args=(job,), daemon=True, name="TrinityPrefetch").start()
+
+    def _watch(self, job: Dict[str, Any]):
+        returncode = job['process'].wait()
+        job['lease'].release()
+        with self._lock:
+            if job['state'] == 'running':
+                job['state'] = 'complete' if returncode == 0 else 'failed'
+
+    def cancel(self, url: str) -> bool:
+        """Stop a running prefetch; aria2c keeps its control file so the data can be resumed later"""
+        with self._lock:
+            job = self.jobs.get(url)
+            if not job or job['state'] != 'running':
+                return False
+            job['state'] = 'cancelled'
+        job['process'].terminate()
+        try:
+            job['process'].wait(timeout=CANCEL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            job['process'].kill()
+            job['process'].wait()
+        return True
+
+    def retain(self, urls: Iterable[str]) -> List[str]:
+        """Cancel every running prefetch whose URL is no longer selected; returns their names"""
+        keep = set(urls)
+        with self._lock:
+            stale = [url for url, job in self.jobs.items() if job['state'] == 'running' and url not in keep]
+        return [self.jobs[url]['name'] for url in stale if self.cancel(url)]
+
+    def cancel_all(self) -> List[str]:
+        return self.retain(())
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-URL {'name', 'state', 'bytes'} for display"""
+        with self._lock:
+            jobs = dict(self.jobs)
+        result = {}
+        for url, job in jobs.items():
+            part_path = staging_path(prefetch_path(url, self.prefetch_dir))
+            result[url] = {'name': job['name'], 'state': job['state'],
+                           'bytes': part_path.stat().st_size if part_path.exists() else 0}
+        return result
+
+    def adopt(self, url: str, file_path: Path, expected: Optional[Dict[str, Any]] = None,
+              resumable: bool = True) -> Optional[str]:
+        """Promote prefetched data for url to a real task writing file_path.
+
+        Returns 'complete' if a verified file was published at file_path, 'partial' if the partial data
+        (with aria2c's control file) now sits at file_path's `.part` for the download to resume, or None.
+        resumable=False is for downloaders that cannot resume aria2c's `.part` (the process pool); partial
+        data is then left in the prefetch cache instead of being handed over.
+        """
+        part_path = staging_path(prefetch_path(url, self.prefetch_dir))
+        if not part_path.exists():
+            return None
+        # A still-running speculative download hands over to the installer's normal-priority one
+        self.cancel(url)
+        control_file = Path(str(part_path) + '.aria2')
+        if not resumable and control_file.exists():
+            return None
+        with self._lock:
+            job = self.jobs.pop(url, None)
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Only data with aria2c's control file is resumable; without it a file is either complete or junk
+        if control_file.exists():
+            target_part = staging_path(file_path)
+            shutil.move(str(part_path), str(target_part))
+            shutil.move(str(control_file), str(target_part) + '.aria2')
+            return 'partial'
+        if job is not None and job['state'] != 'complete':
+            discard_staged(part_path)
+            return None
+
+        expected = expected or (job or {}).get('expected') or {}
+        # aria2c verified the hash only if this session's job carried the same one
+        aria2c_checked = bool(job and expected.get('sha256') and job['expected'].get('sha256') == expected['sha256'])
+        error = verify_download(part_path, file_path.name, expected, hash_verified=aria2c_checked)
+        if error:
+            discard_staged(part_path)
+            return None
+        shutil.move(str(part_path), str(file_path))
+        return 'complete'
+
+    def _evict(self):
+        """Drop the oldest prefetched data that is not being written until the cache fits max_bytes"""
+        with self._lock:
+            active = {str(staging_path(prefetch_path(url, self.prefetch_dir)))
+                      for url, job in self.jobs.items() if job['state'] == 'running'}
+        files = []
+        for path in self.prefetch_dir.glob('*.part'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if str(path) in active:
+                continue
+            discard_staged(path)
+            total -= size
+
+
+_prefetcher: Optional[SpeculativePrefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> SpeculativePrefetcher:
+    """Process-wide prefetcher shared by the hub and the installer thread it starts"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = SpeculativePrefetcher()
+        return _prefetcher
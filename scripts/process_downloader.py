@@ -0,0 +1,181 @@
+"""
+TrinityUI Process-Pool Downloader
+Spreads downloads over worker processes (TLS, SHA-256 and writes off the parent's GIL) with
+per-job progress reported through shared memory
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from scripts.http_client import TrinityHTTPClient, DOWNLOAD_CHUNK_SIZE
+from scripts.download_staging import staging_path, verify_download, commit_staged, discard_staged
+from scripts.negative_cache import classify_exception
+from scripts.page_cache import CacheDropper
+
+# 'aria2c' (default) or 'process'; the installer reads this when the config does not choose
+DOWNLOAD_MODE = os.environ.get('TRINITY_DOWNLOAD_MODE', 'aria2c')
+PROCESS_WORKERS = int(os.environ.get('TRINITY_DOWNLOAD_WORKERS', str(os.cpu_count() or 4)))
+# Files at least this large (with a known size) are split into one byte range per worker
+RANGE_SPLIT_THRESHOLD = 256 * 1024 * 1024
+PROGRESS_INTERVAL = 0.5
+# The pool is started from the hub's installer thread while other threads (prefetch watchers, state flush
+# timers, the server) may hold locks; forked workers would inherit them held, so workers start clean
+MP_CONTEXT = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Per-process state set up by _init_worker
+_worker_client: Optional[TrinityHTTPClient] = None
+_worker_progress = None
+
+
+def _init_worker(progress):
+    """Give each worker its own HTTP session and the shared progress array, which arrives through initargs"""
+    global _worker_client, _worker_progress
+    _worker_client = TrinityHTTPClient()
+    _worker_progress = progress
+
+
+def _download_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch one whole file (hashing as it writes) or one byte range into a preallocated file"""
+    slot = job['slot']
+    part_path = Path(job['part_path'])
+    ranged = job.get('start') is not None
+    headers = {'Range': f"bytes={job['start']}-{job['end']}"} if ranged else {}
+    digest = None if ranged else hashlib.sha256()
+    written = 0
+    try:
+        with _worker_client.get(job['url'], headers=headers, stream=True) as response:
+            response.raise_for_status()
+            if ranged and response.status_code != 206:
+                return {'slot': slot, 'ok': False, 'error': "server ignored the Range request", 'failure': None}
+            with open(part_path, 'r+b' if ranged else 'wb') as f:
+                position = job['start'] if ranged else 0
+                f.seek(position)
+                dropper = CacheDropper(f, part_path)
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    if digest:
+                        digest.update(chunk)
+                    written += len(chunk)
+                    _worker_progress[slot] = written
+                    dropper.advance(position + written)
+                f.flush()
+                dropper.finish()
+    except (requests.RequestException, OSError) as e:
+        return {'slot': slot, 'ok': False, 'error': str(e)[:200], 'failure': classify_exception(e)}
+
+    if ranged and written != job['end'] - job['start'] + 1:
+        return {'slot': slot, 'ok': False, 'error': f"short range: {written} bytes", 'failure': None}
+    return {'slot': slot, 'ok': True, 'bytes': written, 'sha256': digest.hexdigest() if digest else None}
+
+
+class ProcessPoolDownloader:
+    def __init__(self, workers: int = PROCESS_WORKERS, range_threshold: int = RANGE_SPLIT_THRESHOLD,
+                 progress_interval: float = PROGRESS_INTERVAL):
+        self.workers = max(1, workers)
+        self.range_threshold = range_threshold
+        self.progress_interval = progress_interval
+
+    def _plan_jobs(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        jobs = []
+        for index, item in enumerate(files):
+            file_path = Path(item['file_path'])
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            part_path = staging_path(file_path)
+            size = (item.get('expected') or {}).get('size')
+            if size and size >= self.range_threshold and self.workers > 1:
+                # Preallocate so every worker can write its range in place
+                with open(part_path, 'wb') as f:
+                    f.truncate(size)
+                step = -(-size // self.workers)
+                for start in range(0, size, step):
+                    jobs.append({'file': index, 'url': item['url'], 'part_path': str(part_path),
+                                 'start': start, 'end': min(start + step, size) - 1})
+            else:
+                jobs.append({'file': index, 'url': item['url'], 'part_path': str(part_path)})
+        for slot, job in enumerate(jobs):
+            job['slot'] = slot
+        return jobs
+
+    def download(self, files: List[Dict[str, Any]],
+                 progress_callback: Optional[Callable[[int, int, Optional[int]], None]] = None
+                 ) -> List[Dict[str, Any]]:
+        """Download [{'url', 'file_path', 'expected'}] and publish verified files.
+
+        progress_callback(file_index, bytes_done, bytes_total) is called from a monitor thread.
+        Returns one {'ok', 'message', 'sha256', 'failure'} per input file.
+        """
+        if not files:
+            return []
+        jobs = self._plan_jobs(files)
+        progress = multiprocessing.Array('q', len(jobs), lock=False)
+        job_results: Dict[int, Dict[str, Any]] = {}
+
+        stop = threading.Event()
+        monitor = None
+        if progress_callback:
+            def report():
+                while not stop.wait(self.progress_interval):
+                    done = [0] * len(files)
+                    for job in jobs:
+                        done[job['file']] += progress[job['slot']]
+                    for index, item in enumerate(files):
+                        progress_callback(index, done[index], (item.get('expected') or {}).get('size'))
+            monitor = threading.Thread(target=report, daemon=True, name="TrinityDownloadProgress")
+            monitor.start()
+
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)),
+                                     mp_context=multiprocessing.get_context(MP_CONTEXT),
+                                     initializer=_init_worker, initargs=(progress,)) as pool:
+                futures = {pool.submit(_download_job, job): job['slot'] for job in jobs}
+                for future in as_completed(futures):
+                    slot = futures[future]
+                    try:
+                        job_results[slot] = future.result()
+                    except Exception as e:
+                        # A job that raised, or a worker killed mid-job (BrokenProcessPool fails every
+                        # pending future), fails only its own file
+                        job_results[slot] = {'slot': slot, 'ok': False, 'failure': classify_exception(e),
+                                             'error': f"{type(e).__name__}: {e}"[:200]}
+        finally:
+            stop.set()
+            if monitor:
+                monitor.join()
+
+        results_by_file: List[List[Dict[str, Any]]] = [[] for _ in files]
+        for job in jobs:
+            results_by_file[job['file']].append(job_results[job['slot']])
+        return [self._finish_file(item, results) for item, results in zip(files, results_by_file)]
+
+    def _finish_file(self, item: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        file_path = Path(item['file_path'])
+        part_path = staging_path(file_path)
+        expected = item.get('expected') or {}
+        failed = next((r for r in results if not r['ok']), None)
+        if failed:
+            discard_staged(part_path)
+            return {'ok': False, 'message': f"Download failed: {failed['error']}", 'sha256': None,
+                    'failure': failed.get('failure')}
+
+        # Whole-file jobs hashed while writing; ranged files are hashed by verify_download
+        sha256 = results[0]['sha256'] if len(results) == 1 else None
+        if sha256 and expected.get('sha256') and sha256 != expected['sha256']:
+            discard_staged(part_path)
+            return {'ok': False, 'message': f"Verification failed for {file_path.name}: SHA-256 mismatch",
+                    'sha256': None, 'failure': None}
+        error = verify_download(part_path, file_path.name, expected, hash_verified=sha256 is not None)
+        if error:
+            discard_staged(part_path)
+            return {'ok': False, 'message': f"Verification failed for {file_path.name}: {error}",
+                    'sha256': None, 'failure': None}
+        commit_staged(part_path, file_path)
+        return {'ok': True, 'message': f"Downloaded {file_path.name} successfully",
+                'sha256': sha256 or expected.get('sha256'), 'failure': None}
@@ -14,6 +14,10 @@ from typing import Optional, List
 from IPython.display import HTML, display, clear_output
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.http_client import get_http_client
+from scripts.download_state import open_state_store, DB_FILENAME
+
 class TrinityLauncher:
     def __init__(self, project_root: Path):
         self.project_root = project_root
@@ -46,6 +50,23 @@ class TrinityLauncher:
             
         return True
     
+    def report_download_state(self, webui_choice: str):
+        """Warn about assets that never finished downloading for this WebUI"""
+        store = open_state_store(self.project_root / DB_FILENAME)
+        if store is None:
+            return
+        try:
+            summary = store.summary(webui_choice)
+            incomplete = [row for status in ('error', 'pending', 'downloading')
+                          for row in store.query(status=status, webui=webui_choice)]
+        finally:
+            store.close()
+        done = summary.get('success', {}).get('count', 0)
+        self.add_output_line(f"📦 Assets ready: {done}, incomplete: {len(incomplete)}", "info")
+        for row in incomplete[:10]:
+            detail = f" ({row['error']})" if row['error'] else ""
+            self.add_output_line(f"⚠️ {row['name']} is {row['status']}{detail}", "warning")
+    
     def construct_launch_args(self, config: dict) -> List[str]:
         """Construct launch arguments ensuring --share is present"""
         custom_args = config.get('custom_args', '')
@@ -93,14 +114,13 @@ class TrinityLauncher:
             
             # Fallback to GitHub
             base_url = "https://raw.githubusercontent.com/remphanstar/TrinityUI/main/HTML"
-            response = requests.get(f"{base_url}/trinity-launch-output.html", timeout=10)
-            if response.status_code == 200:
-                print("🎨 Loaded Trinity styling from GitHub repository")
-                return response.text
-            else:
-                print(f"⚠️ Failed to load styling from GitHub: {response.status_code}")
-                return self.get_fallback_html()
+            content = get_http_client().get_text(f"{base_url}/trinity-launch-output.html")
+            print("🎨 Loaded Trinity styling from GitHub repository")
+            return content
                 
+        except requests.HTTPError as e:
+            print(f"⚠️ Failed to load styling from GitHub: {e.response.status_code}")
+            return self.get_fallback_html()
         except Exception as e:
             print(f"⚠️ Error loading Trinity styling: {e}")
             return self.get_fallback_html()
@@ -269,6 +289,7 @@ class TrinityLauncher:
         self.add_output_line(f"🔧 Launch arguments: {' '.join(args_list)}", "info")
         self.add_output_line("📡 Initializing and waiting for Gradio public URL...", "info")
         self.add_output_line("🎨 Auto-scroll enabled - latest output will appear automatically", "info")
+        self.report_download_state(webui_choice)
         
         # Set environment with matplotlib fix
         env = os.environ.copy()
@@ -0,0 +1,204 @@
+"""
+TrinityUI Venv Deduplication
+Replaces byte-identical files across WebUI venvs (torch's bundled CUDA libraries, numpy, ...) with hardlinks;
+candidates are narrowed by size, then a partial hash, then a full hash, and hashes are cached per inode
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from stat import S_ISREG
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.venv_layers import BASE_VENV_ROOT
+
+WEBUI_ROOT = Path('/content')
+DEDUPE_ENABLED = os.environ.get('TRINITY_VENV_DEDUPE', '1') != '0'
+DEDUPE_CACHE_FILE = Path(os.environ.get('TRINITY_DEDUPE_CACHE', '/content/.trinity_dedupe_cache.json'))
+# Small files reclaim little and dominate the scan; wheels' large payloads are what repeat across venvs
+DEDUPE_MIN_SIZE = int(os.environ.get('TRINITY_DEDUPE_MIN_SIZE', str(64 * 1024)))
+DEDUPE_WORKERS = 8
+PARTIAL_HASH_BYTES = 64 * 1024
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def default_roots() -> List[Path]:
+    """Every WebUI venv and shared base venv"""
+    return sorted(path for path in WEBUI_ROOT.glob('*/venv') if path.is_dir()) + \
+        sorted(path for path in BASE_VENV_ROOT.glob('py*') if path.is_dir())
+
+
+def partial_hash(path: Path, size: int) -> str:
+    """Hash of the first and last PARTIAL_HASH_BYTES; enough to split most same-size files apart"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(PARTIAL_HASH_BYTES))
+        if size > 2 * PARTIAL_HASH_BYTES:
+            f.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+    return digest.hexdigest()
+
+
+def full_hash(path: Path) -> str:
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VenvDeduper:
+    """Hashes are cached by (device, inode) together with size and mtime, so unchanged files are never
+    read twice; after linking, every path of a group shares the keeper's inode and cache entry."""
+
+    def __init__(self, cache_file: Path = DEDUPE_CACHE_FILE, min_size: int = DEDUPE_MIN_SIZE,
+                 max_workers: int = DEDUPE_WORKERS):
+        self.cache_file = Path(cache_file)
+        self.min_size = min_size
+        self.max_workers = max_workers
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            self._cache = json.loads(self.cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self._cache = {}
+
+    def _save(self, live_keys: Iterable[str]):
+        live_keys = set(live_keys)
+        cache = {key: entry for key, entry in self._cache.items() if key in live_keys}
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_name(self.cache_file.name + '.tmp')
+            tmp_path.write_text(json.dumps(cache), encoding='utf-8')
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            pass
+
+    def _hash(self, kind: str, path: Path, stat: os.stat_result) -> Tuple[str, Optional[str]]:
+        """(inode key, cached or computed `kind` hash); None if the file could not be read"""
+        key = f"{stat.st_dev}:{stat.st_ino}"
+        with self._lock:
+            entry = self._cache.get(key)
+            if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+                entry = self._cache[key] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+            if kind in entry:
+                return key, entry[kind]
+        try:
+            value = partial_hash(path, stat.st_size) if kind == 'partial' else full_hash(path)
+        except OSError:
+            return key, None
+        with self._lock:
+            entry[kind] = value
+        return key, value
+
+    def scan(self, roots: Iterable[Path]) -> Dict[Tuple[int, int, int], Dict[int, List[Tuple[Path, os.stat_result]]]]:
+        """{(device, size, mode): {inode: [(path, stat), ...]}} for regular files of at least min_size"""
+        groups = defaultdict(lambda: defaultdict(list))
+        for root in roots:
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = Path(dirpath) / filename
+                    try:
+                        stat = path.lstat()
+                    except OSError:
+                        continue
+                    if stat.st_size >= self.min_size and S_ISREG(stat.st_mode):
+                        groups[(stat.st_dev, stat.st_size, stat.st_mode)][stat.st_ino].append((path, stat))
+        return groups
+
+    def _split(self, kind: str, groups: List[Dict[int, List[Tuple[Path, os.stat_result]]]],
+               pool: ThreadPoolExecutor) -> List[Dict[int, List[Tuple[Path, os.stat_result]]]]:
+        """Split candidate groups by `kind` hash; only sub-groups with several inodes remain"""
+        # One representative path per inode: every link of an inode has the same content
+        items = [(index, inode, paths) for index, group in enumerate(groups) for inode, paths in group.items()]
+        hashes = pool.map(lambda item: self._hash(kind, *item[2][0])[1], items)
+        buckets = defaultdict(dict)
+        for (index, inode, paths), value in zip(items, hashes):
+            if value is not None:
+                buckets[(index, value)][inode] = paths
+        return [bucket for bucket in buckets.values() if len(bucket) > 1]
+
+    @staticmethod
+    def _link(keeper: Path, path: Path) -> bool:
+        """Atomically replace path with a hardlink to keeper"""
+        tmp_path = path.with_name(f".{path.name}.trinity-link")
+        try:
+            tmp_path.unlink(missing_ok=True)
+            os.link(keeper, tmp_path)
+            os.replace(tmp_path, path)
+            return True
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+    def run(self, roots: Optional[Iterable[Path]] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Hardlink identical files under roots (default: every venv).
+
+        Returns {'files', 'candidates', 'linked', 'bytes_reclaimed', 'seconds'}. bytes_reclaimed only
+        counts inodes whose every link was replaced, i.e. whose data blocks were actually freed.
+        """
+        start = time.perf_counter()
+        self._load()
+        roots = [Path(root) for root in (roots if roots is not None else default_roots())]
+        groups = self.scan(roots)
+        report = {'files': sum(len(paths) for inodes in groups.values() for paths in inodes.values()),
+                  'candidates': 0, 'linked': 0, 'bytes_reclaimed': 0}
+
+        candidates = [inodes for inodes in groups.values() if len(inodes) > 1]
+        report['candidates'] = sum(len(inodes) for inodes in candidates)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="TrinityDedupe") as pool:
+            identical_groups = self._split('full', self._split('partial', candidates, pool), pool)
+        for identical in identical_groups:
+            # Keep the inode with the most links, so the fewest paths change
+            keeper_inode = max(identical, key=lambda inode: len(identical[inode]))
+            keeper = identical[keeper_inode][0][0]
+            for inode, paths in identical.items():
+                if inode == keeper_inode:
+                    continue
+                linked = sum(dry_run or self._link(keeper, path) for path, _ in paths)
+                report['linked'] += linked
+                if linked == paths[0][1].st_nlink:
+                    report['bytes_reclaimed'] += paths[0][1].st_size
+
+        live_keys = [f"{stat.st_dev}:{stat.st_ino}" for inodes in groups.values()
+                     for paths in inodes.values() for _, stat in paths[:1]]
+        self._save(live_keys)
+        report['seconds'] = time.perf_counter() - start
+        return report
+
+
+def dedupe_venvs(roots: Optional[Iterable[Path]] = None, log=print) -> Optional[Dict[str, Any]]:
+    """Post-install hook: dedupe every venv unless TRINITY_VENV_DEDUPE=0, logging one summary line"""
+    if not DEDUPE_ENABLED:
+        return None
+    report = VenvDeduper().run(roots)
+    log(f"Venv dedupe: {report['linked']} file(s) hardlinked, "
+        f"{report['bytes_reclaimed'] / 1024 ** 2:.0f} MB reclaimed in {report['seconds']:.1f}s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hardlink identical files across WebUI venvs")
+    parser.add_argument("roots", nargs='*', type=Path, help="Directories to dedupe (default: every venv)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be linked without changing files")
+    parser.add_argument("--min-size", type=int, default=DEDUPE_MIN_SIZE, help="Ignore files smaller than this")
+    args = parser.parse_args()
+
+    report = VenvDeduper(min_size=args.min_size).run(args.roots or None, dry_run=args.dry_run)
+    verb = "would be" if args.dry_run else "were"
+    print(f"📊 {report['files']} files scanned, {report['candidates']} size-matched candidates")
+    print(f"🔗 {report['linked']} files {verb} hardlinked, "
+          f"{report['bytes_reclaimed'] / 1024 ** 2:.1f} MB reclaimed in {report['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+TrinityUI Venv Layers
+Shared base venvs holding one torch stack per Python version, attached below each WebUI venv's own
+site-packages through a .pth file, so WebUIs with the same stack install it (and store it) once
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.install_planner import LAYER_PTH_FILENAME, site_packages_dirs, installed_distributions
+
+BASE_VENV_ROOT = Path(os.environ.get('TRINITY_BASE_VENVS', '/content/.trinity_base_venvs'))
+VENV_LAYERS_ENABLED = os.environ.get('TRINITY_VENV_LAYERS', '1') != '0'
+LAYER_MARKER = '.trinity-layer.json'
+
+
+def layer_key(python_version: str, stack: Iterable[str]) -> str:
+    """Directory name of the base venv for a Python version and its torch-stack install commands"""
+    digest = hashlib.sha256(json.dumps([python_version, list(stack)]).encode('utf-8')).hexdigest()
+    return f"py{python_version}-{digest[:12]}"
+
+
+def base_venv_path(python_version: str, stack: Iterable[str], root: Path = BASE_VENV_ROOT) -> Path:
+    return Path(root) / layer_key(python_version, stack)
+
+
+@contextmanager
+def locked(base_path: Path):
+    """Hold a base venv exclusively while it is created or filled; flock on a fresh descriptor also
+    excludes other threads, so parallel installers in one process wait for each other too"""
+    base_path = Path(base_path)
+    base_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(base_path.parent / f".{base_path.name}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def ensure_base_venv(base_path: Path, python: Path) -> bool:
+    """Create the base venv with the given interpreter unless it exists; True when it is usable"""
+    base_path = Path(base_path)
+    with locked(base_path):
+        if (base_path / 'bin' / 'python').exists():
+            return True
+        result = subprocess.run([str(python), '-m', 'venv', str(base_path)], capture_output=True, text=True)
+        return result.returncode == 0
+
+
+def attach_base_layer(venv_path: Path, base_path: Path) -> Path:
+    """Put base_path's site-packages on venv_path's sys.path, after the venv's own packages.
+
+    Packages installed in the venv itself shadow the base's, so a WebUI can still pin its own version
+    of anything; pip sees the base's packages as installed and leaves them alone.
+    """
+    own = site_packages_dirs(venv_path, layers=False)
+    if not own:
+        raise FileNotFoundError(f"No site-packages in {venv_path}")
+    pth_path = own[0] / LAYER_PTH_FILENAME
+    lines = []
+    for path in site_packages_dirs(base_path, layers=False):
+        # lib64 is usually a symlink to lib
+        if str(path.resolve()) not in lines:
+            lines.append(str(path.resolve()))
+    pth_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return pth_path
+
+
+def attached_layers(venv_path: Path) -> List[Path]:
+    """Base venvs named in venv_path's layer .pth file, whether they exist yet or not"""
+    layers = []
+    for site_packages in site_packages_dirs(venv_path, layers=False):
+        try:
+            lines = (site_packages / LAYER_PTH_FILENAME).read_text(encoding='utf-8').splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            line = line.strip()
+            # <base>/lib/pythonX.Y/site-packages
+            if line and not line.startswith(('#', 'import')) and Path(line).parents[2] not in layers:
+                layers.append(Path(line).parents[2])
+    return layers
+
+
+def layer_stack(base_path: Path) -> Optional[List[str]]:
+    """The install commands base_path was populated with, or None if it is not populated"""
+    try:
+        return json.loads((Path(base_path) / LAYER_MARKER).read_text(encoding='utf-8'))['stack']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def layer_populated(base_path: Path, stack: Iterable[str]) -> bool:
+    """True once `stack` has been installed into base_path successfully"""
+    return layer_stack(base_path) == list(stack)
+
+
+def mark_populated(base_path: Path, stack: Iterable[str]):
+    marker = {'stack': list(stack), 'time': time.time()}
+    (Path(base_path) / LAYER_MARKER).write_text(json.dumps(marker), encoding='utf-8')
+
+
+def describe_layers(root: Path = BASE_VENV_ROOT) -> List[Dict[str, Any]]:
+    """{'path', 'stack', 'packages'} for every base venv under root"""
+    layers = []
+    for base_path in sorted(Path(root).glob('py*')):
+        if not base_path.is_dir():
+            continue
+        stack = layer_stack(base_path)
+        layers.append({'path': str(base_path), 'stack': stack, 'packages': installed_distributions(base_path)})
+    return layers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect TrinityUI's shared base venvs")
+    parser.add_argument("venv", nargs='?', type=Path, help="Show the base layers attached to this venv instead")
+    args = parser.parse_args()
+
+    if args.venv:
+        for base_path in attached_layers(args.venv):
+            print(f"{base_path} {'(missing)' if not base_path.exists() else ''}")
+        return
+    for layer in describe_layers():
+        state = f"{len(layer['packages'])} packages" if layer['stack'] is not None else "not populated"
+        print(f"{layer['path']}: {state}")
+        for command in layer['stack'] or []:
+            print(f"    {command}")
+
+
+if __name__ == "__main__":
+    main()
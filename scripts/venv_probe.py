@@ -0,0 +1,123 @@
+"""
+TrinityUI Venv Probe
+Reports a venv's package versions from dist-info metadata without starting its interpreter,
+cached until site-packages changes; importing packages is a separate, optional deep check
+"""
+import argparse
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.install_planner import installed_distributions, site_packages_dirs, canonicalize_name
+
+DEFAULT_PACKAGES = ('torch', 'torchvision', 'torchaudio', 'xformers', 'transformers', 'safetensors')
+CACHE_FILENAME = '.trinity-probe.json'
+DEEP_CHECK_TIMEOUT = 180
+
+# Run inside the venv: import every module in one interpreter and report what each one says
+DEEP_CHECK_SCRIPT = """
+import importlib, json, sys
+results = {}
+for name in sys.argv[1:]:
+    try:
+        module = importlib.import_module(name)
+        results[name] = {'ok': True, 'version': str(getattr(module, '__version__', ''))}
+    except Exception as e:
+        results[name] = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+print(json.dumps(results))
+"""
+
+_cache: Dict[str, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+def site_packages_key(venv_path: Path) -> List[int]:
+    """mtimes of the venv's site-packages and its base layers'; installing, upgrading or removing a package
+    changes them"""
+    return [path.stat().st_mtime_ns for path in site_packages_dirs(venv_path)]
+
+
+def _load_cached(venv_path: Path, key: List[int]) -> Dict[str, Any]:
+    with _cache_lock:
+        entry = _cache.get(str(venv_path))
+    if entry is None:
+        try:
+            entry = json.loads((venv_path / CACHE_FILENAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            entry = {}
+    return entry if entry.get('key') == key else {}
+
+
+def _store_cached(venv_path: Path, entry: Dict[str, Any]):
+    with _cache_lock:
+        _cache[str(venv_path)] = entry
+    try:
+        tmp_path = venv_path / f"{CACHE_FILENAME}.tmp"
+        tmp_path.write_text(json.dumps(entry), encoding='utf-8')
+        tmp_path.replace(venv_path / CACHE_FILENAME)
+    except OSError:
+        pass
+
+
+def deep_check(venv_path: Path, modules: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Import modules in one venv interpreter: {'module': {'ok', 'version' | 'error'}}"""
+    modules = list(modules)
+    try:
+        result = subprocess.run([str(venv_path / 'bin' / 'python'), '-c', DEEP_CHECK_SCRIPT, *modules],
+                                capture_output=True, text=True, timeout=DEEP_CHECK_TIMEOUT)
+        return json.loads(result.stdout)
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        return {name: {'ok': False, 'error': f"Probe failed: {e}"} for name in modules}
+
+
+def probe_venv(venv_path: Path, packages: Optional[Iterable[str]] = DEFAULT_PACKAGES,
+               deep: bool = False) -> Dict[str, Any]:
+    """{'venv', 'packages': {name: version | None}, 'imports'?, 'cached'} for a venv.
+
+    packages=None reports every installed distribution. Versions come from dist-info metadata and are
+    cached until site-packages changes; with deep=True the packages are also imported once (torch
+    included, so this takes seconds) and that result is cached the same way.
+    """
+    venv_path = Path(venv_path)
+    key = site_packages_key(venv_path)
+    entry = _load_cached(venv_path, key)
+    cached = bool(entry)
+    if not entry:
+        entry = {'key': key, 'distributions': installed_distributions(venv_path), 'imports': {}}
+
+    names = [canonicalize_name(name) for name in packages] if packages is not None \
+        else sorted(entry['distributions'])
+    result = {'venv': str(venv_path),
+              'packages': {name: entry['distributions'].get(name) for name in names},
+              'cached': cached}
+
+    if deep:
+        modules = [name.replace('-', '_') for name in names if entry['distributions'].get(name)]
+        missing = [module for module in modules if module not in entry['imports']]
+        if missing:
+            entry['imports'].update(deep_check(venv_path, missing))
+            cached = False
+        result['imports'] = {module: entry['imports'][module] for module in modules}
+    if not cached:
+        _store_cached(venv_path, entry)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report package versions installed in a venv as JSON")
+    parser.add_argument("venv", type=Path, help="Path to the venv")
+    parser.add_argument("packages", nargs='*', help=f"Packages to report (default: {' '.join(DEFAULT_PACKAGES)})")
+    parser.add_argument("--all", action="store_true", help="Report every installed distribution")
+    parser.add_argument("--deep", action="store_true", help="Also import each package inside the venv")
+    args = parser.parse_args()
+
+    packages = None if args.all else (args.packages or DEFAULT_PACKAGES)
+    print(json.dumps(probe_venv(args.venv, packages, deep=args.deep), indent=2))
+
+
+if __name__ == "__main__":
+    main()
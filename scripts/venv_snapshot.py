@@ -0,0 +1,302 @@
+"""
+TrinityUI Venv Snapshots
+Packs a fully installed WebUI venv into a compressed tar archive with a manifest of its spec hash and
+Python build, and restores it (possibly under a different root) when the spec matches again; the shared
+base layers a venv is attached to are archived and restored alongside it
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.venv_layers import attached_layers, layer_stack, locked
+
+# Drive survives runtime resets; without it snapshots at least survive re-running the installer
+DRIVE_SNAPSHOT_DIR = Path('/content/drive/MyDrive/TrinityUI/venv_snapshots')
+SNAPSHOT_DIR = Path(os.environ.get('TRINITY_VENV_SNAPSHOT_DIR', str(
+    DRIVE_SNAPSHOT_DIR if DRIVE_SNAPSHOT_DIR.parent.parent.is_dir() else '/content/.trinity_venv_snapshots')))
+VENV_SNAPSHOTS_ENABLED = os.environ.get('TRINITY_VENV_SNAPSHOTS', '1') != '0'
+# Snapshots kept per WebUI; older specs are deleted after a new snapshot is written
+SNAPSHOT_KEEP = int(os.environ.get('TRINITY_VENV_SNAPSHOT_KEEP', '1'))
+MARKER_FILENAME = '.trinity-snapshot.json'
+# Files that describe one venv instance rather than its contents
+EXCLUDED_FILES = (MARKER_FILENAME, '.trinity-probe.json')
+# Only text files this small are scanned for the old venv root
+RELOCATE_MAX_BYTES = 2 * 1024 * 1024
+
+# (program, archive suffix, tar --use-compress-program); tar adds -d itself when extracting
+COMPRESSORS = [
+    ('zstd', '.tar.zst', 'zstd -T0 -3'),
+    ('pigz', '.tar.gz', 'pigz'),
+    ('gzip', '.tar.gz', 'gzip -1'),
+]
+
+# Run with the venv's interpreter (or a base interpreter): the build a venv's bin/python points at
+PYTHON_BUILD_SCRIPT = """
+import json, os, platform, sys
+print(json.dumps({'version': sys.version, 'executable': os.path.realpath(getattr(sys, '_base_executable', sys.executable)),
+                  'machine': platform.machine()}))
+"""
+
+
+def spec_hash(spec: Dict[str, Any], requirements: Iterable[str] = ()) -> str:
+    """Hash of everything that decides a venv's contents: the WebUI's install spec and requirements text"""
+    material = json.dumps({'spec': spec, 'requirements': list(requirements)}, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def python_build(python: Path) -> Optional[Dict[str, str]]:
+    try:
+        result = subprocess.run([str(python), '-c', PYTHON_BUILD_SCRIPT],
+                                capture_output=True, text=True, timeout=60, check=True)
+        return json.loads(result.stdout)
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def _compressor_for(suffix: str) -> Optional[str]:
+    """First available compress program for an archive suffix (pigz before gzip for .tar.gz)"""
+    for program, program_suffix, command in COMPRESSORS:
+        if program_suffix == suffix and shutil.which(program):
+            return command
+    return None
+
+
+def _snapshot_stem(name: str, key: str) -> str:
+    return f"{name}-{key[:16]}"
+
+
+def read_marker(venv_path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads((Path(venv_path) / MARKER_FILENAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_marker(venv_path: Path, key: str, source: str):
+    marker = {'spec_hash': key, 'source': source, 'time': time.time()}
+    (Path(venv_path) / MARKER_FILENAME).write_text(json.dumps(marker), encoding='utf-8')
+
+
+def snapshot_matches(venv_path: Path, key: str) -> bool:
+    """True if venv_path was restored from (or snapshotted as) a venv of this exact spec"""
+    return read_marker(venv_path).get('spec_hash') == key
+
+
+def list_snapshots(snapshot_dir: Path = SNAPSHOT_DIR, name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Manifests of the snapshots whose archives exist, newest first"""
+    manifests = []
+    for manifest_path in Path(snapshot_dir).glob(f"{name or '*'}-*.json"):
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        if (manifest_path.parent / manifest['archive']).exists():
+            manifests.append(manifest)
+    return sorted(manifests, key=lambda manifest: manifest['created'], reverse=True)
+
+
+def find_snapshot(name: str, key: str, snapshot_dir: Path = SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    return next((manifest for manifest in list_snapshots(snapshot_dir, name) if manifest['spec_hash'] == key), None)
+
+
+def _save_layers(venv_path: Path, snapshot_dir: Path) -> Dict[str, Any]:
+    """Snapshot every base layer venv_path is attached to; {'ok', 'message', 'layers'}"""
+    layers = []
+    for base_path in attached_layers(venv_path):
+        with locked(base_path):
+            stack = layer_stack(base_path)
+            if stack is None:
+                return {'ok': False, 'message': f"Base layer {base_path.name} is not populated", 'layers': None}
+            layer = {'path': str(base_path), 'name': f"base-{base_path.name}", 'spec_hash': spec_hash({'stack': stack})}
+            result = save_snapshot(layer['name'], base_path, layer['spec_hash'], snapshot_dir)
+        if not result['ok']:
+            return {'ok': False, 'message': f"Base layer {base_path.name}: {result['message']}", 'layers': None}
+        layers.append(layer)
+    return {'ok': True, 'message': None, 'layers': layers}
+
+
+def _restore_layers(manifest: Dict[str, Any], snapshot_dir: Path) -> Dict[str, Any]:
+    """Restore the base layers a snapshot was attached to, unless they are already populated;
+    {'ok', 'message', 'restored'}"""
+    restored = 0
+    for layer in manifest.get('layers', []):
+        base_path = Path(layer['path'])
+        with locked(base_path):
+            if layer_stack(base_path) is not None:
+                continue
+            # A base venv left unpopulated is filled by the installer under this same lock; replacing it is safe
+            shutil.rmtree(base_path, ignore_errors=True)
+            result = restore_snapshot(layer['name'], base_path, layer['spec_hash'], snapshot_dir)
+        if not result['ok']:
+            return {'ok': False, 'message': f"Base layer {base_path.name}: {result['message']}", 'restored': restored}
+        restored += 1
+    return {'ok': True, 'message': None, 'restored': restored}
+
+
+def _prune(name: str, keep_key: str, snapshot_dir: Path):
+    for manifest in list_snapshots(snapshot_dir, name)[SNAPSHOT_KEEP:]:
+        if manifest['spec_hash'] != keep_key:
+            (snapshot_dir / manifest['archive']).unlink(missing_ok=True)
+            (snapshot_dir / f"{_snapshot_stem(name, manifest['spec_hash'])}.json").unlink(missing_ok=True)
+
+
+def save_snapshot(name: str, venv_path: Path, key: str, snapshot_dir: Path = SNAPSHOT_DIR) -> Dict[str, Any]:
+    """Archive a finished venv as `<name>-<spec>.tar.zst` (or .tar.gz) plus a JSON manifest.
+
+    Returns {'ok', 'message', 'archive'}. An existing snapshot of the same spec is kept as is. A venv
+    attached to base layers is only snapshotted once each layer has a snapshot too, since the base
+    venvs do not survive a runtime reset.
+    """
+    venv_path, snapshot_dir = Path(venv_path).resolve(), Path(snapshot_dir)
+    layers = _save_layers(venv_path, snapshot_dir)
+    if not layers['ok']:
+        return {'ok': False, 'message': layers['message'], 'archive': None}
+    existing = find_snapshot(name, key, snapshot_dir)
+    # Snapshots made before their venv's layers were archived are replaced
+    if existing and existing.get('layers', []) == layers['layers']:
+        return {'ok': True, 'message': f"Snapshot {existing['archive']} already exists",
+                'archive': snapshot_dir / existing['archive']}
+    build = python_build(venv_path / 'bin' / 'python')
+    if build is None:
+        return {'ok': False, 'message': f"Could not run {venv_path / 'bin' / 'python'}", 'archive': None}
+    program, suffix, command = next(((program, suffix, command) for program, suffix, command in COMPRESSORS
+                                     if shutil.which(program)), (None, None, None))
+    if program is None:
+        return {'ok': False, 'message': "No compressor found (zstd, pigz or gzip)", 'archive': None}
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    stem = _snapshot_stem(name, key)
+    archive = snapshot_dir / f"{stem}{suffix}"
+    partial = archive.with_name(archive.name + '.partial')
+    excludes = [f"--exclude=./{filename}" for filename in EXCLUDED_FILES]
+    start = time.perf_counter()
+    result = subprocess.run(['tar', f"--use-compress-program={command}", *excludes,
+                             '-C', str(venv_path), '-cf', str(partial), '.'],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        partial.unlink(missing_ok=True)
+        return {'ok': False, 'message': f"tar failed: {result.stderr.strip()[-300:]}", 'archive': None}
+    os.replace(partial, archive)
+
+    manifest = {'name': name, 'spec_hash': key, 'python': build, 'venv_root': str(venv_path),
+                'archive': archive.name, 'compressor': program, 'size': archive.stat().st_size,
+                'layers': layers['layers'], 'created': time.time()}
+    manifest_path = snapshot_dir / f"{stem}.json"
+    tmp_path = manifest_path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    os.replace(tmp_path, manifest_path)
+    write_marker(venv_path, key, 'snapshot')
+    _prune(name, key, snapshot_dir)
+    return {'ok': True, 'archive': archive,
+            'message': f"Saved {archive.name} ({manifest['size'] / 1024 ** 2:.0f} MB, {program}) "
+                       f"in {time.perf_counter() - start:.1f}s"}
+
+
+def relocate_venv(venv_path: Path, old_root: str, new_root: Optional[str] = None) -> int:
+    """Rewrite old_root to new_root (default: venv_path) in the shebangs, activate scripts, pyvenv.cfg
+    and .pth/.egg-link files of the venv at venv_path.
+
+    Returns the number of files changed. Binaries (anything with a NUL byte) are left alone.
+    """
+    venv_path = Path(venv_path)
+    old, new = old_root.encode(), str(new_root or venv_path).encode()
+    if old == new:
+        return 0
+    candidates = [venv_path / 'pyvenv.cfg', *(venv_path / 'bin').iterdir()]
+    for site_packages in venv_path.glob('lib*/python*/site-packages'):
+        candidates += [path for path in site_packages.iterdir()
+                       if path.suffix in ('.pth', '.egg-link') or path.name.startswith('__editable__')]
+
+    changed = 0
+    for path in candidates:
+        if path.is_symlink() or not path.is_file() or path.stat().st_size > RELOCATE_MAX_BYTES:
+            continue
+        data = path.read_bytes()
+        if old not in data or b'\0' in data:
+            continue
+        path.write_bytes(data.replace(old, new))
+        changed += 1
+    return changed
+
+
+def restore_snapshot(name: str, venv_path: Path, key: str, snapshot_dir: Path = SNAPSHOT_DIR) -> Dict[str, Any]:
+    """Restore the snapshot of spec `key` to venv_path, which must not exist yet.
+
+    Returns {'ok', 'message'}. The snapshot is only used if the Python build its venv pointed at is
+    still installed and its base layers are populated or restorable; the archive is extracted next to
+    venv_path, relocated, then renamed into place.
+    """
+    venv_path = Path(venv_path).absolute()
+    manifest = find_snapshot(name, key, snapshot_dir)
+    if manifest is None:
+        return {'ok': False, 'message': f"No {name} snapshot for spec {key[:16]}"}
+    if venv_path.exists():
+        return {'ok': False, 'message': f"{venv_path} already exists"}
+    if python_build(Path(manifest['python']['executable'])) != manifest['python']:
+        return {'ok': False, 'message': f"Python build of the snapshot ({manifest['python']['executable']}) "
+                                        f"is not available"}
+    archive = Path(snapshot_dir) / manifest['archive']
+    command = _compressor_for(''.join(archive.suffixes[-2:]))
+    if command is None:
+        return {'ok': False, 'message': f"No decompressor for {archive.name}"}
+
+    start = time.perf_counter()
+    layers = _restore_layers(manifest, Path(snapshot_dir))
+    if not layers['ok']:
+        return {'ok': False, 'message': layers['message']}
+    staging = venv_path.with_name(f".{venv_path.name}.restoring")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    result = subprocess.run(['tar', f"--use-compress-program={command}", '-C', str(staging), '-xf', str(archive)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        shutil.rmtree(staging, ignore_errors=True)
+        return {'ok': False, 'message': f"tar failed: {result.stderr.strip()[-300:]}"}
+    # Scripts are rewritten for the final path before the venv appears there
+    changed = relocate_venv(staging, manifest['venv_root'], str(venv_path))
+    os.rename(staging, venv_path)
+    write_marker(venv_path, key, manifest['archive'])
+    return {'ok': True, 'message': f"Restored {manifest['archive']} in {time.perf_counter() - start:.1f}s"
+                                   + (f", relocated {changed} file(s)" if changed else '')
+                                   + (f", {layers['restored']} base layer(s)" if layers['restored'] else '')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot and restore installed WebUI venvs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List stored snapshots")
+    for command in ("save", "restore"):
+        subparser = subparsers.add_parser(command, help=f"{command.capitalize()} a WebUI's venv")
+        subparser.add_argument("webui", help="WebUI name, e.g. A1111")
+        subparser.add_argument("--venv", type=Path, help="Venv path (default: /content/<webui>/venv)")
+    parser.add_argument("--dir", type=Path, default=SNAPSHOT_DIR, help=f"Snapshot directory (default: {SNAPSHOT_DIR})")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for manifest in list_snapshots(args.dir):
+            print(f"{manifest['archive']:40} {manifest['size'] / 1024 ** 2:8.0f} MB  "
+                  f"Python {manifest['python']['version'].split()[0]}  {time.ctime(manifest['created'])}")
+        return
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from scripts.webui_installer import webui_spec_hash, WEBUI_ROOT
+    venv_path = args.venv or WEBUI_ROOT / args.webui / 'venv'
+    key = webui_spec_hash(args.webui)
+    if args.command == "save":
+        result = save_snapshot(args.webui, venv_path, key, args.dir)
+    else:
+        result = restore_snapshot(args.webui, venv_path, key, args.dir)
+    print(f"{'✅' if result['ok'] else '❌'} {result['message']}")
+    sys.exit(0 if result['ok'] else 1)
+
+
+if __name__ == "__main__":
+    main()
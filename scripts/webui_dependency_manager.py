@@ -8,15 +8,39 @@ import os
 import sys
 import subprocess
 import json
+import tempfile
+import time
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.wheelhouse import get_wheelhouse
+from scripts.install_planner import plan_install, plan_changes, describe_plan, read_plannable_requirements
+from scripts.venv_probe import probe_venv
+from scripts.venv_dedupe import dedupe_venvs
+
+# Packages pinned by the PyTorch steps; everything installed later is resolved against them
+TORCH_STACK_PACKAGES = ('torch', 'torchvision', 'torchaudio', 'xformers')
+TORCH_STACK_VERSIONS_SCRIPT = '''
+import json
+from importlib import metadata
+versions = {}
+for name in %r:
+    try:
+        versions[name] = metadata.version(name)
+    except metadata.PackageNotFoundError:
+        pass
+print(json.dumps(versions))
+''' % (TORCH_STACK_PACKAGES,)
+
 class WebUIDependencyManager:
     def __init__(self, project_root: Path):
         self.project_root = project_root
         self.webui_root = Path('/content')
         self.log_file = project_root / 'trinity_unified.log'
+        # Shared by every venv, so the torch stack is downloaded once per machine
+        self.wheelhouse = get_wheelhouse()
         
         # WebUI-specific requirements
         self.webui_specs = {
@@ -89,6 +113,62 @@ class WebUIDependencyManager:
             pass
         print(f"[{level}] {message}")
     
+    def install_packages(self, venv_pip: Path, args: List[str], timeout: int) -> Tuple[bool, str]:
+        """`pip install args` through the shared wheelhouse; returns (success, stderr of the last pip run)"""
+        last_stderr = ['']
+
+        def run(cmd: List[str]) -> bool:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            last_stderr[0] = result.stderr
+            return result.returncode == 0
+
+        success = self.wheelhouse.install(venv_pip, args, run, log=lambda message: self.log(message, "INFO"))
+        return success, last_stderr[0]
+    
+    def torch_stack_constraints(self, venv_python: Path, specs: Dict) -> List[str]:
+        """Pins for the torch stack as installed (xFormers may have fallen back to an unpinned build)"""
+        pins = {
+            'torch': specs['pytorch_version'],
+            'torchvision': specs['torchvision_version'],
+            'torchaudio': specs['torchaudio_version'],
+            'xformers': specs['xformers_version']
+        }
+        try:
+            result = subprocess.run([str(venv_python), '-c', TORCH_STACK_VERSIONS_SCRIPT],
+                                    capture_output=True, text=True, timeout=30)
+            if result.returncode == 0:
+                pins.update(json.loads(result.stdout))
+        except (subprocess.SubprocessError, ValueError):
+            pass
+        return [f"{name}=={pins[name]}" for name in TORCH_STACK_PACKAGES]
+    
+    def install_additional_packages(self, venv_pip: Path, venv_python: Path, specs: Dict,
+                                    packages: Optional[List[str]] = None) -> bool:
+        """Resolve and install additional packages in one pip run, constrained to the installed torch stack"""
+        packages = specs['additional_packages'] if packages is None else packages
+        constraints = self.torch_stack_constraints(venv_python, specs)
+        self.log(f"Resolving {len(packages)} additional packages in one pass with constraints: "
+                 f"{', '.join(constraints)}", "INFO")
+        
+        with tempfile.NamedTemporaryFile('w', suffix='-constraints.txt', delete=False) as constraints_file:
+            constraints_file.write('\n'.join(constraints) + '\n')
+        try:
+            start = time.perf_counter()
+            success, stderr = self.install_packages(
+                venv_pip,
+                [*packages, '--upgrade', '-c', constraints_file.name, '--extra-index-url', specs['pytorch_index']],
+                timeout=120 * len(packages)
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            os.unlink(constraints_file.name)
+        
+        if success:
+            self.log(f"Installed {', '.join(packages)} in one transaction ({elapsed:.1f}s)", "SUCCESS")
+        else:
+            self.log(f"Failed to install additional packages after {elapsed:.1f}s: {stderr[:300]}", "WARNING")
+        return success
+    
     def validate_webui_environment(self, webui_choice: str) -> Tuple[bool, str]:
         """Validate that WebUI environment exists and is properly set up"""
         if webui_choice not in self.webui_specs:
@@ -129,33 +209,29 @@ class WebUIDependencyManager:
         
         return True, "Environment validation passed"
     
-    def check_current_dependencies(self, webui_choice: str) -> Dict[str, str]:
-        """Check currently installed dependency versions"""
-        webui_path = self.webui_root / webui_choice
-        venv_python = webui_path / 'venv' / 'bin' / 'python'
+    def check_current_dependencies(self, webui_choice: str, deep: bool = False) -> Dict[str, str]:
+        """Check currently installed dependency versions.
         
-        dependencies = {}
+        Versions come from package metadata (cached until the venv changes); deep=True also imports
+        each package in one venv interpreter and reports import failures.
+        """
+        venv_path = self.webui_root / webui_choice / 'venv'
+        packages_to_check = ['torch', 'torchvision', 'xformers', 'transformers', 'safetensors']
         
-        packages_to_check = [
-            ('torch', 'import torch; print(torch.__version__)'),
-            ('torchvision', 'import torchvision; print(torchvision.__version__)'),
-            ('xformers', 'import xformers; print(xformers.__version__)'),
-            ('transformers', 'import transformers; print(transformers.__version__)'),
-            ('safetensors', 'import safetensors; print(safetensors.__version__)')
-        ]
+        try:
+            probe = probe_venv(venv_path, packages_to_check, deep=deep)
+        except OSError:
+            return {package_name: 'Error checking' for package_name in packages_to_check}
         
-        for package_name, check_command in packages_to_check:
-            try:
-                result = subprocess.run(
-                    [str(venv_python), '-c', check_command],
-                    capture_output=True, text=True, timeout=10
-                )
-                if result.returncode == 0:
-                    dependencies[package_name] = result.stdout.strip()
-                else:
-                    dependencies[package_name] = 'Not installed'
-            except Exception:
-                dependencies[package_name] = 'Error checking'
+        dependencies = {}
+        for package_name in packages_to_check:
+            version = probe['packages'][package_name]
+            if version is None:
+                dependencies[package_name] = 'Not installed'
+            elif deep and not probe['imports'][package_name]['ok']:
+                dependencies[package_name] = f"Import failed ({version}): {probe['imports'][package_name]['error']}"
+            else:
+                dependencies[package_name] = version
         
         return dependencies
     
@@ -174,6 +250,33 @@ class WebUIDependencyManager:
         venv_python = webui_path / 'venv' / 'bin' / 'python'
         
         specs = self.webui_specs[webui_choice]
+        torch_requirements = [
+            f"torch=={specs['pytorch_version']}",
+            f"torchvision=={specs['torchvision_version']}",
+            f"torchaudio=={specs['torchaudio_version']}"
+        ]
+        xformers_requirement = f"xformers=={specs['xformers_version']}"
+        requirements_file = next((req_file for req_file in [
+            webui_path / 'requirements_versions.txt',
+            webui_path / 'requirements.txt'
+        ] if req_file.exists()), None)
+        file_requirements = read_plannable_requirements(requirements_file) if requirements_file \
+            else {'requirements': [], 'unplannable': []}
+        
+        # Plan against what is installed, so an unchanged venv is not uninstalled and reinstalled
+        start = time.perf_counter()
+        plan = plan_install(
+            webui_path / 'venv',
+            [*torch_requirements, xformers_requirement, *specs['additional_packages'], *file_requirements['requirements']],
+            remove=specs.get('remove_packages', ()),
+            python_version=specs['python_version']
+        )
+        plan['unplannable'] += file_requirements['unplannable']
+        self.log(f"Install plan ({(time.perf_counter() - start) * 1000:.0f} ms): {describe_plan(plan)}", "INFO")
+        if not plan_changes(plan):
+            self.log(f"All {webui_choice} dependencies already satisfied", "SUCCESS")
+            return True
+        changed = {entry['requirement'] for entry in plan['install'] + plan['upgrade']}
         
         try:
             # Step 1: Upgrade pip and basic tools
@@ -187,84 +290,59 @@ class WebUIDependencyManager:
             if result.returncode != 0:
                 self.log(f"Pip upgrade warning: {result.stderr[:200]}", "WARNING")
             
-            # Step 2: Uninstall conflicting packages
-            self.log("Removing existing PyTorch/xFormers installations", "INFO")
-            uninstall_packages = ['torch', 'torchvision', 'torchaudio', 'xformers']
-            
-            for package in uninstall_packages:
-                uninstall_cmd = [str(venv_pip), 'uninstall', '-y', package]
+            # Step 2: Remove packages the spec excludes
+            if plan['remove']:
+                self.log(f"Removing {', '.join(plan['remove'])}", "INFO")
+                uninstall_cmd = [str(venv_pip), 'uninstall', '-y', *plan['remove']]
                 subprocess.run(uninstall_cmd, capture_output=True, text=True, timeout=60)
             
-            # Step 3: Install PyTorch stack
-            self.log(f"Installing PyTorch {specs['pytorch_version']} for {webui_choice}", "INFO")
-            pytorch_cmd = [
-                str(venv_pip), 'install',
-                f"torch=={specs['pytorch_version']}",
-                f"torchvision=={specs['torchvision_version']}",
-                f"torchaudio=={specs['torchaudio_version']}",
-                '--index-url', specs['pytorch_index'],
-                '--force-reinstall'
-            ]
-            
-            result = subprocess.run(pytorch_cmd, capture_output=True, text=True, timeout=600)
-            
-            if result.returncode != 0:
-                self.log(f"PyTorch installation failed: {result.stderr[:300]}", "ERROR")
-                return False
-            else:
-                self.log("PyTorch installation successful", "SUCCESS")
+            # Step 3: Install the PyTorch packages that are missing or at another version (pip replaces those)
+            torch_changes = [requirement for requirement in torch_requirements if requirement in changed]
+            if torch_changes:
+                self.log(f"Installing {', '.join(torch_changes)} for {webui_choice}", "INFO")
+                success, stderr = self.install_packages(
+                    venv_pip, [*torch_changes, '--index-url', specs['pytorch_index']], timeout=600
+                )
+                
+                if not success:
+                    self.log(f"PyTorch installation failed: {stderr[:300]}", "ERROR")
+                    return False
+                else:
+                    self.log("PyTorch installation successful", "SUCCESS")
             
             # Step 4: Install xFormers
-            self.log(f"Installing xFormers {specs['xformers_version']} for {webui_choice}", "INFO")
-            xformers_cmd = [
-                str(venv_pip), 'install', 
-                f"xformers=={specs['xformers_version']}",
-                '--force-reinstall'
-            ]
-            
-            result = subprocess.run(xformers_cmd, capture_output=True, text=True, timeout=300)
-            
-            if result.returncode != 0:
-                self.log(f"xFormers installation failed: {result.stderr[:300]}", "ERROR")
-                # Try without version specification
-                self.log("Trying xFormers installation without version pinning", "INFO")
-                fallback_cmd = [str(venv_pip), 'install', 'xformers', '--force-reinstall']
-                result = subprocess.run(fallback_cmd, capture_output=True, text=True, timeout=300)
+            if xformers_requirement in changed:
+                self.log(f"Installing xFormers {specs['xformers_version']} for {webui_choice}", "INFO")
+                success, stderr = self.install_packages(venv_pip, [xformers_requirement], timeout=300)
                 
-                if result.returncode != 0:
-                    self.log("xFormers fallback installation also failed", "ERROR")
-                    return False
+                if not success:
+                    self.log(f"xFormers installation failed: {stderr[:300]}", "ERROR")
+                    # Try without version specification
+                    self.log("Trying xFormers installation without version pinning", "INFO")
+                    success, stderr = self.install_packages(venv_pip, ['xformers'], timeout=300)
+                    
+                    if not success:
+                        self.log("xFormers fallback installation also failed", "ERROR")
+                        return False
+                
+                self.log("xFormers installation successful", "SUCCESS")
             
-            self.log("xFormers installation successful", "SUCCESS")
+            # Step 5: Install additional packages (one resolve, so none can downgrade another or the torch stack)
+            additional_changes = [package for package in specs['additional_packages'] if package in changed]
+            if additional_changes:
+                self.log("Installing additional packages", "INFO")
+                self.install_additional_packages(venv_pip, venv_python, specs, additional_changes)
             
-            # Step 5: Install additional packages
-            self.log("Installing additional packages", "INFO")
-            for package in specs['additional_packages']:
-                package_cmd = [str(venv_pip), 'install', package, '--upgrade']
-                result = subprocess.run(package_cmd, capture_output=True, text=True, timeout=120)
+            # Step 6: Install WebUI requirements if any of them changed
+            if requirements_file and (file_requirements['unplannable']
+                                      or changed.intersection(file_requirements['requirements'])):
+                self.log(f"Installing from {requirements_file.name}", "INFO")
+                success, stderr = self.install_packages(venv_pip, ['-r', str(requirements_file)], timeout=600)
                 
-                if result.returncode == 0:
-                    self.log(f"Successfully installed {package}", "SUCCESS")
+                if success:
+                    self.log(f"Successfully installed from {requirements_file.name}", "SUCCESS")
                 else:
-                    self.log(f"Failed to install {package}: {result.stderr[:100]}", "WARNING")
-            
-            # Step 6: Install WebUI requirements if they exist
-            requirements_files = [
-                webui_path / 'requirements_versions.txt',
-                webui_path / 'requirements.txt'
-            ]
-            
-            for req_file in requirements_files:
-                if req_file.exists():
-                    self.log(f"Installing from {req_file.name}", "INFO")
-                    req_cmd = [str(venv_pip), 'install', '-r', str(req_file)]
-                    result = subprocess.run(req_cmd, capture_output=True, text=True, timeout=600)
-                    
-                    if result.returncode == 0:
-                        self.log(f"Successfully installed from {req_file.name}", "SUCCESS")
-                    else:
-                        self.log(f"Warning installing from {req_file.name}: {result.stderr[:200]}", "WARNING")
-                    break
+                    self.log(f"Warning installing from {requirements_file.name}: {stderr[:200]}", "WARNING")
             
             # Step 7: Verify installation
             self.log("Verifying dependency installation", "INFO")
@@ -285,6 +363,7 @@ print(f"xFormers CUDA: {hasattr(xformers.ops, 'memory_efficient_attention')}")
             if result.returncode == 0:
                 self.log("Dependency verification successful", "SUCCESS")
                 self.log(f"Verification output:\n{result.stdout}", "INFO")
+                dedupe_venvs(log=lambda message: self.log(message, "INFO"))
                 return True
             else:
                 self.log(f"Dependency verification failed: {result.stderr}", "ERROR")
@@ -297,8 +376,8 @@ print(f"xFormers CUDA: {hasattr(xformers.ops, 'memory_efficient_attention')}")
             self.log(f"Dependency installation failed with exception: {e}", "ERROR")
             return False
     
-    def create_dependency_report(self, webui_choice: str) -> str:
-        """Create detailed dependency report"""
+    def create_dependency_report(self, webui_choice: str, deep: bool = False) -> str:
+        """Create detailed dependency report (deep=True also checks that each package imports)"""
         report = []
         report.append("=" * 70)
         report.append(f"TRINITY WEBUI DEPENDENCY REPORT - {webui_choice}")
@@ -322,17 +401,17 @@ print(f"xFormers CUDA: {hasattr(xformers.ops, 'memory_efficient_attention')}")
         
         # Current dependencies
         if is_valid:
-            current_deps = self.check_current_dependencies(webui_choice)
+            current_deps = self.check_current_dependencies(webui_choice, deep=deep)
             report.append("CURRENT INSTALLATIONS:")
             for package, version in current_deps.items():
-                status = "✅" if version not in ['Not installed', 'Error checking'] else "❌"
+                status = "✅" if version not in ['Not installed', 'Error checking'] and \
+                    not version.startswith('Import failed') else "❌"
                 report.append(f"  {package}: {status} {version}")
             report.append("")
         
         # Recommendations
         report.append("RECOMMENDATIONS:")
         if is_valid and webui_choice in self.webui_specs:
-            current_deps = self.check_current_dependencies(webui_choice)
             specs = self.webui_specs[webui_choice]
             
             needs_update = False
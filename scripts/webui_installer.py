@@ -4,12 +4,34 @@ import sys
 import subprocess
 import json
 import re
+import shlex
+import shutil
+import tempfile
 from pathlib import Path
 from typing import Dict, Any
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.bandwidth_budget import get_bandwidth_budget, PRIORITY_CRITICAL, PRIORITY_NORMAL
+from scripts.wheelhouse import get_wheelhouse, filename_from_url
+from scripts.pip_resolution_cache import PipResolutionCache, PIP_REPORT_REFRESH, read_requirements
+from scripts.venv_snapshot import spec_hash, snapshot_matches, save_snapshot, VENV_SNAPSHOTS_ENABLED
+from scripts.venv_layers import (base_venv_path, ensure_base_venv, attach_base_layer, attached_layers,
+                                 layer_populated, mark_populated, locked, VENV_LAYERS_ENABLED)
+from scripts.install_planner import (installed_distributions, canonicalize_name, plan_install,
+                                     read_plannable_requirements)
+from scripts.venv_dedupe import dedupe_venvs
+from scripts.pip_lock import (lock_path, parse_lock, lock_from_report, lock_header, diff_locks, describe_diff,
+                              write_lock, PIP_LOCKS_ENABLED)
+
 PROJECT_ROOT = Path.cwd()
 WEBUI_ROOT = Path('/content')
-PIP_CACHE_DIR = WEBUI_ROOT / '.pip_cache'
+
+# Wheels on the critical path of every WebUI install (matched against the wheel file name)
+TORCH_STACK_PREFIXES = ('torch-', 'torchvision-', 'torchaudio-', 'xformers-', 'triton-', 'nvidia_')
+# post_install commands installing any of these go into the shared base layer
+BASE_LAYER_PACKAGES = ('torch', 'torchvision', 'torchaudio', 'xformers')
+# Installer tooling every venv brings along, left out of locks as `pip freeze` leaves it out
+UNLOCKED_PACKAGES = ('pip', 'setuptools', 'wheel', 'distribute')
 
 WEBUI_CONFIGS = {
     "A1111": {
@@ -59,35 +81,235 @@ def run_command_with_live_output(command, cwd):
         log_message(f"❌ Command exception: {e}")
         return False
 
-def fast_pip_install(venv_pip_path, requirements_file_path, cwd):
-    """Fast pip install with aria2c acceleration fallback"""
+def is_torch_stack_url(url):
+    return url.rsplit('/', 1)[-1].lower().startswith(TORCH_STACK_PREFIXES)
+
+def download_into_wheelhouse(downloads, wheelhouse):
+    """aria2c-download {url: sha256 or None} into the wheelhouse; aria2c verifies each known hash"""
+    urls = sorted(downloads, key=lambda url: not is_torch_stack_url(url))
+    # Torch-stack wheels are queued first and raise this consumer's share of the bandwidth budget
+    priority = PRIORITY_CRITICAL if is_torch_stack_url(urls[0]) else PRIORITY_NORMAL
+    wheelhouse.incoming_dir.mkdir(parents=True, exist_ok=True)
+    download_dir = Path(tempfile.mkdtemp(prefix='aria2c-', dir=wheelhouse.incoming_dir))
+    url_file = wheelhouse.incoming_dir / f"{download_dir.name}.txt"
+    lines = []
+    for url in urls:
+        lines += [url, f"  out={filename_from_url(url)}"]
+        if downloads[url]:
+            lines.append(f"  checksum=sha-256={downloads[url]}")
+    url_file.write_text("\n".join(lines) + "\n")
+    try:
+        with get_bandwidth_budget().lease("pip-wheels", priority) as lease:
+            budget_args = ' '.join(lease.aria2c_args(concurrent_downloads=os.cpu_count() or 4))
+            aria_cmd = f"aria2c -c -k 1M {budget_args} --dir=\"{download_dir}\" -i \"{url_file}\""
+            if not run_command_with_live_output(aria_cmd, cwd=PROJECT_ROOT):
+                return False
+        hashes = {filename_from_url(url): sha256 for url, sha256 in downloads.items() if sha256}
+        wheelhouse.import_dir(download_dir, hashes)
+        return True
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+        url_file.unlink(missing_ok=True)
+
+def fast_pip_install(venv_pip_path, requirements_file_path, cwd, refresh_resolution=PIP_REPORT_REFRESH):
+    """Fast pip install from the shared wheelhouse, with aria2c filling in whatever it lacks"""
+    wheelhouse = get_wheelhouse()
+    install_args = ['-r', str(requirements_file_path)]
+    run = lambda cmd: run_command_with_live_output(shlex.join(cmd), cwd=cwd)
+
+    # Packages a base layer provides are never downloaded for the WebUI's own layer
+    venv_path = Path(venv_pip_path).parent.parent
+    layered = {name for base_path in attached_layers(venv_path) for name in installed_distributions(base_path)}
+    # The report is made with --ignore-installed, so it also lists what the venv already has. The install
+    # below runs without --upgrade: pip keeps a requested package whose installed version matches its
+    # specifier, and any installed version of a dependency, so neither is worth downloading
+    installed = installed_distributions(venv_path)
+    plan = plan_install(venv_path, read_plannable_requirements(requirements_file_path)['requirements'])
+    requested = {entry['name'] for key in ('install', 'upgrade') for entry in plan[key]}
+    satisfied = {entry['name'] for entry in plan['satisfied']}
+
     log_message("Phase 1: Calculating dependencies...")
-    pip_resolve_cmd = f"\"{venv_pip_path}\" install --dry-run --report - -r \"{requirements_file_path}\""
-    result = subprocess.run(pip_resolve_cmd, shell=True, cwd=cwd, capture_output=True, text=True)
+    # With --find-links, files the wheelhouse already has are reported as file:// URLs
+    resolution = PipResolutionCache().resolve(venv_pip_path, requirements_file_path,
+                                              wheelhouse.find_links_args(), cwd, refresh=refresh_resolution)
     
-    if result.returncode != 0:
-        log_message(f"❌ Failed to resolve dependencies. Falling back to standard pip install...")
-        return run_command_with_live_output(f"\"{venv_pip_path}\" install -r \"{requirements_file_path}\"", cwd=cwd)
+    if resolution['report'] is None:
+        log_message(f"❌ Failed to resolve dependencies ({resolution['error']}). Falling back to standard pip install...")
+        return wheelhouse.install(venv_pip_path, install_args, run, log_message)
+    if resolution['cached']:
+        log_message("Using cached dependency resolution")
         
     try:
-        report = json.loads(result.stdout)
-        urls_to_download = [part['download_info']['url'] for part in report.get('install', [])]
+        report = resolution['report']
+        downloads = {}
+        for part in report.get('install', []):
+            download_info = part['download_info']
+            name = canonicalize_name(part['metadata']['name'])
+            if name in layered or name in satisfied or (name not in requested and name in installed):
+                continue
+            if not download_info['url'].startswith('file:'):
+                hashes = download_info.get('archive_info', {}).get('hashes', {})
+                downloads[download_info['url']] = hashes.get('sha256')
     except Exception as e:
         log_message(f"❌ Failed to parse pip report. Falling back. Error: {e}")
-        return run_command_with_live_output(f"\"{venv_pip_path}\" install -r \"{requirements_file_path}\"", cwd=cwd)
+        return wheelhouse.install(venv_pip_path, install_args, run, log_message)
 
-    if urls_to_download:
-        log_message(f"Phase 2: Downloading {len(urls_to_download)} packages with aria2c...")
-        url_file = PIP_CACHE_DIR / "urls.txt"
-        url_file.write_text("\n".join(urls_to_download))
-        aria_cmd = f"aria2c -c -x 16 -s 16 -k 1M -j $(nproc) --dir=\"{PIP_CACHE_DIR}\" -i \"{url_file}\""
-        if not run_command_with_live_output(aria_cmd, cwd=PROJECT_ROOT):
+    downloads = {url: sha256 for url, sha256 in downloads.items()
+                 if not wheelhouse.has(filename_from_url(url), sha256)}
+    if downloads:
+        log_message(f"Phase 2: Downloading {len(downloads)} packages into the wheelhouse with aria2c...")
+        if not download_into_wheelhouse(downloads, wheelhouse):
             log_message("❌ aria2c download failed. Falling back.")
-            return run_command_with_live_output(f"\"{venv_pip_path}\" install -r \"{requirements_file_path}\"", cwd=cwd)
+            return wheelhouse.install(venv_pip_path, install_args, run, log_message)
     
-    log_message("Phase 3: Installing packages from local cache...")
-    pip_offline_cmd = f"\"{venv_pip_path}\" install --no-index --find-links=\"{PIP_CACHE_DIR}\" -r \"{requirements_file_path}\""
-    return run_command_with_live_output(pip_offline_cmd, cwd=cwd)
+    log_message("Phase 3: Installing packages from the wheelhouse...")
+    if run(wheelhouse.offline_install_cmd(venv_pip_path, install_args)):
+        return True
+    log_message("⚠️ Offline install from the wheelhouse failed. Falling back.")
+    return wheelhouse.install(venv_pip_path, install_args, run, log_message)
+
+def webui_spec_hash(webui_choice):
+    """Spec hash of a WebUI venv: its install config plus the cloned repo's requirements (with includes)"""
+    config = WEBUI_CONFIGS[webui_choice]
+    reqs_file_path = WEBUI_ROOT / webui_choice / config['reqs_file']
+    requirements = read_requirements(reqs_file_path)[0] if reqs_file_path.exists() else []
+    return spec_hash(config, requirements)
+
+def base_layer_commands(config):
+    """post_install commands that install the torch stack, in order"""
+    commands = []
+    for cmd in config.get('post_install', []):
+        args = shlex.split(cmd)
+        packages = [re.split(r'[<>=!~\[;]', arg, 1)[0].lower() for arg in args[2:] if not arg.startswith('-')]
+        if args[:2] == ['pip', 'install'] and any(package in BASE_LAYER_PACKAGES for package in packages):
+            commands.append(cmd)
+    return commands
+
+def webui_base_layer(webui_choice):
+    """Shared base venv for a WebUI's Python version and torch stack, or None if it installs no torch stack"""
+    config = WEBUI_CONFIGS[webui_choice]
+    stack = base_layer_commands(config)
+    return base_venv_path(config['python_version'], stack) if stack else None
+
+def ensure_base_layer(webui_choice, venv_path):
+    """Attach the WebUI's base layer to venv_path and install its torch stack there unless already done"""
+    stack = base_layer_commands(WEBUI_CONFIGS[webui_choice])
+    base_path = webui_base_layer(webui_choice)
+    if not ensure_base_venv(base_path, Path(os.path.realpath(venv_path / 'bin' / 'python'))):
+        log_message(f"❌ Could not create base venv {base_path}")
+        return False
+    # Re-attach in case the spec's torch stack changed since the venv was created
+    if attached_layers(venv_path) != [base_path]:
+        attach_base_layer(venv_path, base_path)
+    with locked(base_path):
+        if layer_populated(base_path, stack):
+            log_message(f"Torch stack already installed in base layer {base_path.name}")
+            return True
+        log_message(f"Installing torch stack into base layer {base_path.name}...")
+        base_pip = base_path / 'bin' / 'pip'
+        run = lambda command: run_command_with_live_output(shlex.join(command), cwd=base_path)
+        for cmd in stack:
+            if not get_wheelhouse().install(base_pip, shlex.split(cmd)[2:], run, log_message):
+                log_message(f"❌ Base layer command failed: {cmd}")
+                return False
+        mark_populated(base_path, stack)
+    return True
+
+def post_install_requirements(config):
+    """(requirements, index args) of the post_install pip commands, to resolve them with the requirements file"""
+    requirements, index_args = [], []
+    for cmd in config.get('post_install', []):
+        args = shlex.split(cmd)
+        if args[:2] != ['pip', 'install']:
+            continue
+        args = iter(args[2:])
+        for arg in args:
+            if arg in ('--index-url', '-i', '--extra-index-url'):
+                # Each command's index only adds to PyPI once everything is resolved together
+                url = next(args, None)
+                if url and url not in index_args:
+                    index_args += ['--extra-index-url', url]
+            elif not arg.startswith('-'):
+                requirements.append(arg)
+    return requirements, index_args
+
+def resolve_webui_lock(webui_choice, write=True, from_venv=False):
+    """Resolve a WebUI's requirements and post_install packages together into its lock.
+
+    With from_venv the lock pins exactly what the venv has installed instead, so it describes the
+    install that just ran; those pins are looked up with --no-deps and never re-resolved.
+    Returns {'ok', 'message', 'diff'}; diff compares against the current lock, which is only
+    rewritten when write is set.
+    """
+    config = WEBUI_CONFIGS[webui_choice]
+    tool_path = WEBUI_ROOT / webui_choice
+    venv_pip = tool_path / 'venv' / 'bin' / 'pip'
+    reqs_file_path = tool_path / config['reqs_file']
+    if not venv_pip.exists() or not reqs_file_path.exists():
+        return {'ok': False, 'message': f"{webui_choice} needs its repository and venv to resolve a lock", 'diff': None}
+    requirements, index_args = post_install_requirements(config)
+    if from_venv:
+        installed = installed_distributions(tool_path / 'venv')
+        with tempfile.TemporaryDirectory(prefix='trinity-lock-') as tmp:
+            pinned_file = Path(tmp) / 'installed.txt'
+            pinned_file.write_text(''.join(f"{name}=={version}\n" for name, version in sorted(installed.items())
+                                           if name not in UNLOCKED_PACKAGES))
+            resolution = PipResolutionCache().resolve(venv_pip, pinned_file, ['--no-deps', *index_args],
+                                                      tool_path, refresh=False)
+    else:
+        resolution = PipResolutionCache().resolve(venv_pip, reqs_file_path, [*requirements, *index_args],
+                                                  tool_path, refresh=True)
+    if resolution['report'] is None:
+        return {'ok': False, 'message': f"Resolution failed: {resolution['error']}", 'diff': None}
+    lock = lock_from_report(resolution['report'],
+                            lock_header(webui_choice, webui_spec_hash(webui_choice), config['python_version']))
+    if lock['unlockable']:
+        return {'ok': False, 'diff': None,
+                'message': f"No sha256 for {', '.join(lock['unlockable'])}; {webui_choice} cannot be locked"}
+    path = lock_path(webui_choice)
+    diff = diff_locks(parse_lock(path), lock)
+    if write:
+        write_lock(path, lock['text'])
+    return {'ok': True, 'diff': diff, 'message': f"Locked {len(lock['packages'])} packages in {path.name}"}
+
+def install_from_lock(webui_choice, venv_pip, cwd):
+    """Install the WebUI's lock with --require-hashes --no-deps: no resolver, every file hash-checked.
+
+    Returns False when there is no lock for the current spec or the install fails, so the caller
+    resolves instead.
+    """
+    path = lock_path(webui_choice)
+    lock = parse_lock(path)
+    if lock is None or not lock['packages']:
+        return False
+    if lock['header'].get('spec') != webui_spec_hash(webui_choice):
+        log_message(f"⚠️ {path.name} was made for another {webui_choice} spec, resolving instead")
+        return False
+
+    installed = installed_distributions(Path(venv_pip).parent.parent)
+    pending = [entry for entry in lock['packages'].values()
+               if installed.get(canonicalize_name(entry['name'])) != entry['version']]
+    log_message(f"Installing from {path.name}: {len(pending)} of {len(lock['packages'])} locked packages needed")
+    if not pending:
+        return True
+
+    wheelhouse = get_wheelhouse()
+    downloads = {entry['url']: entry['sha256'] for entry in pending
+                 if not wheelhouse.has(filename_from_url(entry['url']), entry['sha256'])}
+    if downloads and not download_into_wheelhouse(downloads, wheelhouse):
+        log_message("⚠️ aria2c download of locked files failed")
+    run = lambda cmd: run_command_with_live_output(shlex.join(cmd), cwd=cwd)
+    with tempfile.TemporaryDirectory(prefix='trinity-lock-') as tmp:
+        pinned_file, url_file = Path(tmp) / 'pinned.txt', Path(tmp) / 'urls.txt'
+        pinned_file.write_text(''.join(f"{entry['name']}=={entry['version']} --hash=sha256:{entry['sha256']}\n"
+                                       for entry in pending))
+        url_file.write_text(''.join(f"{entry['name']} @ {entry['url']} --hash=sha256:{entry['sha256']}\n"
+                                    for entry in pending))
+        if run(wheelhouse.offline_install_cmd(venv_pip, ['--require-hashes', '--no-deps', '-r', str(pinned_file)])):
+            return True
+        # The locked URLs themselves, still without a resolver or index lookups
+        log_message("⚠️ Offline install from the lock failed, installing the locked URLs")
+        return run([str(venv_pip), 'install', '--require-hashes', '--no-deps', '-r', str(url_file)])
 
 def inject_matplotlib_fix(tool_path, launch_files):
     """Inject matplotlib backend fix into launch files"""
@@ -189,7 +411,7 @@ def inject_matplotlib_fix(tool_path, launch_files):
             except:
                 log_message(f"❌ Could not clean up {launch_file}")
 
-def install_webui_dependencies(webui_choice: str) -> bool:
+def install_webui_dependencies(webui_choice: str, refresh_resolution: bool = PIP_REPORT_REFRESH) -> bool:
     """Install dependencies for a specific WebUI"""
     if webui_choice not in WEBUI_CONFIGS:
         log_message(f"❌ Unknown WebUI choice: {webui_choice}")
@@ -214,28 +436,73 @@ def install_webui_dependencies(webui_choice: str) -> bool:
     
     log_message(f"--- Installing dependencies for {webui_choice} ---")
     
+    # Venvs created with a base layer get the torch stack there, shared with same-stack WebUIs
+    layered = VENV_LAYERS_ENABLED and bool(attached_layers(venv_path))
+    if layered and not ensure_base_layer(webui_choice, venv_path):
+        return False
+    stack = base_layer_commands(config) if layered else []
+    
+    # A venv restored from a snapshot of this exact spec already has everything installed
+    spec_key = webui_spec_hash(webui_choice)
+    if snapshot_matches(venv_path, spec_key):
+        log_message(f"✅ {webui_choice} venv matches its snapshot spec, skipping package installs")
+        if "launch_files" in config:
+            inject_matplotlib_fix(tool_path, config["launch_files"])
+        return True
+    
+    # A lock made for this spec installs exact, hash-checked files without resolving anything
+    lock_installed = PIP_LOCKS_ENABLED and install_from_lock(webui_choice, venv_pip, tool_path)
+    
     # Install from requirements file
     reqs_file_path = tool_path / config['reqs_file']
-    if reqs_file_path.exists():
+    if lock_installed:
+        log_message(f"✅ Installed {webui_choice} from {lock_path(webui_choice).name}")
+    elif reqs_file_path.exists():
         log_message(f"Installing from {config['reqs_file']}...")
-        if not fast_pip_install(venv_pip, reqs_file_path, cwd=tool_path):
+        if not fast_pip_install(venv_pip, reqs_file_path, cwd=tool_path, refresh_resolution=refresh_resolution):
             log_message(f"❌ Failed to install requirements for {webui_choice}")
             return False
     else:
         log_message(f"⚠️ Requirements file {config['reqs_file']} not found, skipping")
     
     # Run post-install commands
-    if "post_install" in config:
+    post_install_ok = True
+    if "post_install" in config and not lock_installed:
         log_message("Running post-install compatibility fixes...")
+        run = lambda command: run_command_with_live_output(shlex.join(command), cwd=tool_path)
         for cmd in config['post_install']:
-            full_cmd = cmd.replace("pip", str(venv_pip))
-            if not run_command_with_live_output(full_cmd, cwd=tool_path):
+            if cmd in stack:
+                continue
+            args = shlex.split(cmd)
+            # pip installs go through the wheelhouse, so a second WebUI reuses the first one's torch wheels
+            if args[:2] == ['pip', 'install']:
+                ok = get_wheelhouse().install(venv_pip, args[2:], run, log_message)
+            else:
+                ok = run_command_with_live_output(cmd.replace("pip", str(venv_pip)), cwd=tool_path)
+            if not ok:
+                post_install_ok = False
                 log_message(f"⚠️ Post-install command failed: {cmd}")
     
+    # Pin what this install resolved, so the next one installs the same files without a resolver
+    if PIP_LOCKS_ENABLED and not lock_installed and post_install_ok:
+        lock_result = resolve_webui_lock(webui_choice, from_venv=True)
+        log_message(f"{'🔒' if lock_result['ok'] else '⚠️'} {lock_result['message']}")
+        if lock_result['ok']:
+            log_message(f"Lock changes:\n{describe_diff(lock_result['diff'])}")
+    
     # Apply matplotlib backend fix to launch files
     if "launch_files" in config:
         inject_matplotlib_fix(tool_path, config["launch_files"])
     
+    # Hardlink files this install shares with the other venvs
+    dedupe_venvs(log=log_message)
+    
+    # Only a venv whose every step succeeded is worth restoring later
+    if VENV_SNAPSHOTS_ENABLED and post_install_ok:
+        log_message("Saving venv snapshot...")
+        snapshot = save_snapshot(webui_choice, venv_path, spec_key)
+        log_message(f"{'📦' if snapshot['ok'] else '⚠️'} {snapshot['message']}")
+    
     log_message(f"✅ {webui_choice} dependency installation complete!")
     return True
 
@@ -245,10 +512,12 @@ def main():
     
     parser = argparse.ArgumentParser(description="Install WebUI dependencies")
     parser.add_argument("webui", choices=list(WEBUI_CONFIGS.keys()), help="WebUI to install")
+    parser.add_argument("--refresh-resolution", action="store_true",
+                        help="Ignore cached pip resolution reports and resolve against the index again")
     
     try:
         args = parser.parse_args()
-        success = install_webui_dependencies(args.webui)
+        success = install_webui_dependencies(args.webui, args.refresh_resolution or PIP_REPORT_REFRESH)
         sys.exit(0 if success else 1)
     except SystemExit:
         # If no arguments provided, try to read from config
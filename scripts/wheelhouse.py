@@ -0,0 +1,224 @@
+"""
+TrinityUI Wheelhouse
+Content-addressed store of downloaded wheels shared by every WebUI venv through `--find-links`
+"""
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlparse
+
+WHEELHOUSE_DIR = Path(os.environ.get('TRINITY_WHEELHOUSE', '/content/.trinity_wheelhouse'))
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+WHEEL_FILENAME_RE = re.compile(
+    r'^(?P<name>[^-]+)-(?P<version>[^-]+)(?:-(?P<build>\d[^-]*))?-(?P<py>[^-]+)-(?P<abi>[^-]+)-(?P<plat>[^-]+)\.whl$'
+)
+SDIST_FILENAME_RE = re.compile(r'^(?P<name>.+)-(?P<version>[^-]+)\.(?:tar\.gz|zip)$')
+# Options that only make sense for `pip install` (dropped for `pip wheel`) or that reach the network
+INSTALL_ONLY_OPTIONS = {'--force-reinstall', '--upgrade', '-U', '--no-cache-dir', '--user'}
+INDEX_OPTIONS_WITH_VALUE = {'--index-url', '-i', '--extra-index-url', '--trusted-host', '--cache-dir'}
+
+
+def normalize_project(name: str) -> str:
+    """PEP 503 normalized project name"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def parse_distribution_filename(filename: str) -> Optional[Dict[str, Any]]:
+    """{'project', 'version', 'tags'} for a wheel or sdist file name; sdists have no tags"""
+    match = WHEEL_FILENAME_RE.match(filename)
+    if match:
+        tags = [f"{py}-{abi}-{plat}" for py in match.group('py').split('.')
+                for abi in match.group('abi').split('.') for plat in match.group('plat').split('.')]
+        return {'project': normalize_project(match.group('name')), 'version': match.group('version'), 'tags': tags}
+    match = SDIST_FILENAME_RE.match(filename)
+    if match:
+        return {'project': normalize_project(match.group('name')), 'version': match.group('version'), 'tags': []}
+    return None
+
+
+def filename_from_url(url: str) -> str:
+    """Wheel file name of a package URL (download.pytorch.org escapes the `+` of local versions)"""
+    return unquote(urlparse(url).path.rsplit('/', 1)[-1])
+
+
+def strip_index_options(args: Iterable[str]) -> List[str]:
+    """Drop index/cache options so the remaining `pip install` arguments work with --no-index"""
+    result = []
+    skip_value = False
+    for arg in args:
+        if skip_value:
+            skip_value = False
+            continue
+        if arg in INDEX_OPTIONS_WITH_VALUE:
+            skip_value = True
+            continue
+        if arg.split('=', 1)[0] in INDEX_OPTIONS_WITH_VALUE:
+            continue
+        result.append(arg)
+    return result
+
+
+class Wheelhouse:
+    """Wheels and sdists are stored once under blobs/<sha256> and hard-linked by file name into wheels/,
+    the directory handed to pip; index.json maps each file name to its project, version, tags and hash."""
+
+    def __init__(self, root: Path = WHEELHOUSE_DIR):
+        self.root = Path(root)
+        self.wheels_dir = self.root / 'wheels'
+        self.blobs_dir = self.root / 'blobs'
+        self.incoming_dir = self.root / 'incoming'
+        self.index_path = self.root / 'index.json'
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """Serialize index updates across threads and the parallel venv installers' processes"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.root / 'index.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.index_path.read_text(encoding='utf-8')).get('files', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, files: Dict[str, Dict[str, Any]]):
+        tmp_path = self.index_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'files': files}, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp_path, self.index_path)
+
+    def find_links_args(self) -> List[str]:
+        self.wheels_dir.mkdir(parents=True, exist_ok=True)
+        return ['--find-links', str(self.wheels_dir)]
+
+    def has(self, filename: str, sha256: Optional[str] = None) -> bool:
+        """True if filename is stored (with the given content hash, when one is known)"""
+        entry = self._load_index().get(filename)
+        if not entry or not (self.wheels_dir / filename).exists():
+            return False
+        return not sha256 or entry['sha256'] == sha256
+
+    def lookup(self, project: str, version: Optional[str] = None,
+               tags: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Stored files of a project, optionally narrowed to a version and to compatible tags"""
+        project = normalize_project(project)
+        wanted_tags = set(tags) if tags is not None else None
+        return [dict(entry, filename=filename) for filename, entry in sorted(self._load_index().items())
+                if entry['project'] == project
+                and (version is None or entry['version'] == version)
+                and (wanted_tags is None or not entry['tags'] or wanted_tags.intersection(entry['tags']))]
+
+    def add(self, path: Path, sha256: Optional[str] = None, filename: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Move a downloaded wheel/sdist into the store; returns its index entry, or None if not a distribution"""
+        path = Path(path)
+        filename = filename or unquote(path.name)
+        parsed = parse_distribution_filename(filename)
+        if parsed is None:
+            return None
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+
+        blob_path = self.blobs_dir / sha256[:2] / sha256
+        link_path = self.wheels_dir / filename
+        with self._locked():
+            files = self._load_index()
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            self.wheels_dir.mkdir(parents=True, exist_ok=True)
+            if blob_path.exists():
+                path.unlink()
+            else:
+                # Same filesystem as incoming/, so normally a rename; copy when imported from elsewhere
+                tmp_blob = blob_path.with_name(blob_path.name + '.tmp')
+                shutil.move(str(path), str(tmp_blob))
+                os.replace(tmp_blob, blob_path)
+            if not link_path.exists() or files.get(filename, {}).get('sha256') != sha256:
+                tmp_link = link_path.with_name(f".{filename}.tmp")
+                tmp_link.unlink(missing_ok=True)
+                os.link(blob_path, tmp_link)
+                os.replace(tmp_link, link_path)
+            entry = dict(parsed, sha256=sha256, size=blob_path.stat().st_size,
+                         added=files.get(filename, {}).get('added', time.time()))
+            files[filename] = entry
+            self._save_index(files)
+        return dict(entry, filename=filename)
+
+    def import_dir(self, directory: Path, hashes: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Add every distribution in directory (e.g. aria2c's or `pip wheel`'s output); hashes: filename -> sha256"""
+        hashes = hashes or {}
+        added = []
+        if not Path(directory).is_dir():
+            return added
+        for path in sorted(Path(directory).iterdir()):
+            if path.is_file() and not path.name.endswith(('.aria2', '.part', '.tmp')):
+                entry = self.add(path, hashes.get(unquote(path.name)))
+                if entry:
+                    added.append(entry)
+        return added
+
+    def offline_install_cmd(self, pip: Path, args: Iterable[str]) -> List[str]:
+        """`pip install` that may only use the wheelhouse: zero network bytes when everything is stored"""
+        return [str(pip), 'install', '--no-index', *self.find_links_args(), *strip_index_options(args)]
+
+    def fill_cmd(self, pip: Path, args: Iterable[str], wheel_dir: Path) -> List[str]:
+        """`pip wheel` that downloads (or builds) whatever the install needs into wheel_dir"""
+        args = [arg for arg in args if arg not in INSTALL_ONLY_OPTIONS]
+        return [str(pip), 'wheel', '--wheel-dir', str(wheel_dir), *self.find_links_args(), *args]
+
+    def install(self, pip: Path, args: List[str], run: Callable[[List[str]], bool],
+                log: Callable[[str], None] = print) -> bool:
+        """Install `pip install` args into pip's venv through the wheelhouse.
+
+        Tries the wheelhouse alone first; otherwise fills it with `pip wheel` and installs offline,
+        falling back to a normal online install with --find-links if filling fails. `run` executes a
+        command list and returns True on success, so each installer keeps its own output handling.
+        """
+        if run(self.offline_install_cmd(pip, args)):
+            log("Installed from the shared wheelhouse")
+            return True
+        log("Wheelhouse incomplete; downloading into it")
+        # A private directory per fill, so concurrent installers never import each other's partial files
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+        wheel_dir = Path(tempfile.mkdtemp(prefix='fill-', dir=self.incoming_dir))
+        try:
+            filled = run(self.fill_cmd(pip, args, wheel_dir))
+            if filled:
+                added = self.import_dir(wheel_dir)
+                log(f"Added {len(added)} file(s) to the wheelhouse")
+        finally:
+            shutil.rmtree(wheel_dir, ignore_errors=True)
+        if filled and run(self.offline_install_cmd(pip, args)):
+            return True
+        log("Falling back to an online install")
+        return run([str(pip), 'install', *self.find_links_args(), *args])
+
+
+_wheelhouse: Optional[Wheelhouse] = None
+_wheelhouse_lock = threading.Lock()
+
+
+def get_wheelhouse() -> Wheelhouse:
+    """Process-wide wheelhouse at WHEELHOUSE_DIR"""
+    global _wheelhouse
+    with _wheelhouse_lock:
+        if _wheelhouse is None:
+            _wheelhouse = Wheelhouse()
+        return _wheelhouse